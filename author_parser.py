@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+作者/译者字段解析
+
+把 header.author（如「世亲菩萨造 唐 玄奘译」「隋 阇那崛多共笈多译」）解析为
+人物列表：姓名、朝代、国籍、身份、角色。朝代、角色等词表取自
+docs/data-design.md 1.2 B/C 和 8.1，朝代 ID、角色类型与
+packages/scripts/src/extract-metadata.ts 一致，结果可以直接写入后端的
+persons / text_persons 表。
+
+全部词条编译为一个 Aho–Corasick 自动机，每个作者字段只扫描一遍；
+解析结果按原始字符串缓存，语料中只有约 2200 个不同的作者字段。
+"""
+
+import re
+from collections import namedtuple
+
+# 朝代/地域 -> (朝代 ID, 标准名称)；别名见 docs/data-design.md 8.1 DYNASTY_ALIASES
+DYNASTIES = {
+    '清': ('qing', '清'), '明': ('ming', '明'), '唐': ('tang', '唐'), '宋': ('song', '宋'),
+    '元': ('yuan', '元'), '隋': ('sui', '隋'), '陈': ('chen', '陈'), '梁': ('liang', '梁'),
+    '萧梁': ('liang', '梁'), '吴': ('wu', '吴'), '民国': ('minguo', '民国'),
+    '刘宋': ('song-liu', '刘宋'), '元魏': ('wei-north', '北魏'), '北魏': ('wei-north', '北魏'),
+    '后魏': ('wei-north', '北魏'), '东晋': ('jin-east', '东晋'), '西晋': ('jin-west', '西晋'),
+    '姚秦': ('qin-later', '后秦'), '后秦': ('qin-later', '后秦'), '前秦': ('qin-former', '前秦'),
+    '苻秦': ('qin-former', '前秦'), '符秦': ('qin-former', '前秦'),
+    '乞伏秦': ('qin-west', '西秦'), '西秦': ('qin-west', '西秦'),
+    '后汉': ('han-east', '东汉'), '东汉': ('han-east', '东汉'), '西汉': ('han-west', '西汉'),
+    '北凉': ('liang-north', '北凉'), '萧齐': ('qi-south', '南齐'), '南齐': ('qi-south', '南齐'),
+    '北齐': ('qi-north', '北齐'), '高齐': ('qi-north', '北齐'),
+    '曹魏': ('wei-cao', '曹魏'), '北周': ('zhou-north', '北周'), '宇文周': ('zhou-north', '北周'),
+    '南北朝': ('southern-northern', '南北朝'), '三国': ('three-kingdoms', '三国'),
+    '五代': ('five-dynasties', '五代'), '辽': ('liao', '辽'), '金': ('jin', '金'),
+    '西夏': ('xixia', '西夏'), '晋': ('jin-dynasty', '晋'),
+    '新罗': ('silla', '新罗'), '高丽': ('goryeo', '高丽'), '日本': ('japan', '日本'),
+    '朝鲜': ('joseon', '朝鲜'),
+}
+
+# 国籍/地域（不是朝代，写入 persons.nationality）
+NATIONALITIES = [
+    '天竺', '中天竺', '西天竺', '北天竺', '南天竺', '东天竺', '中印度', '印度',
+    '龟兹', '月支', '月氏', '康居', '安息', '于阗', '罽宾', '西域',
+]
+
+# 角色 -> 角色类型（text_persons.role_type），docs/data-design.md 1.2 C 的 25 种，
+# 另加补、补注、补遗等（与 extract-metadata.ts 的 ROLE_MAP 相同）
+ROLES = {
+    '译': 'translator', '重译': 'translator', '同译': 'translator', '合译': 'translator',
+    '口译': 'translator', '传译': 'translator', '共译': 'translator',
+    '编': 'compiler', '重编': 'compiler', '撰': 'compiler', '集': 'compiler',
+    '辑': 'compiler', '合': 'compiler', '传': 'compiler', '编修': 'compiler', '补遗': 'compiler',
+    '述': 'commentator', '注': 'commentator', '解': 'commentator', '疏': 'commentator',
+    '科': 'commentator', '释': 'commentator', '科注': 'commentator', '补注': 'commentator',
+    '录': 'recorder', '记': 'recorder', '笔受': 'recorder',
+    '造': 'author', '著': 'author', '和': 'author', '作': 'author',
+    '校': 'editor', '订': 'editor', '整理': 'editor', '补': 'editor', '增补': 'editor',
+    '重校': 'editor', '重修': 'editor', '增修': 'editor', '编订': 'editor',
+    '说': 'speaker', '讲': 'speaker', '口述': 'speaker',
+}
+
+# 身份（persons.identity），长词优先
+IDENTITIES = [
+    '三藏法师', '菩萨', '三藏', '法师', '沙门', '比丘尼', '比丘', '居士', '大德',
+    '国师', '尊者', '论师',
+]
+
+# 以朝代字开头的人名，不拆出朝代
+KNOWN_NAMES = ['陈那', '清辩', '清辨', '元晓', '陈沂']
+
+# 共译的连接词，以及并列人名的分隔符
+CO_AUTHOR_SEPARATOR = '共'
+NAME_SEPARATORS = re.compile(r'[．・·、,，]+')
+
+UNNAMED_PATTERN = re.compile(r'^(失译|阙译|佚名)')
+EMPTY_AUTHORS = {'', 'CBETA'}
+
+_TRADITIONAL = str.maketrans('譯編錄註記輯傳後劉東陳吳蕭齊涼國羅麗薩師門禪說講訂釋筆遼補遺',
+                             '译编录注记辑传后刘东陈吴萧齐凉国罗丽萨师门禅说讲订释笔辽补遗')
+
+Person = namedtuple('Person', [
+    'name',         # 人名
+    'dynasty',      # 朝代标准名称，如「后秦」
+    'dynasty_id',   # 朝代 ID，如 'qin-later'
+    'nationality',  # 国籍/地域，如「天竺」
+    'identity',     # 身份，如「菩萨」「三藏」
+    'role',         # 原始角色文字，如「译」
+    'role_type',    # 角色类型，如 'translator'
+])
+
+_DYNASTY, _NATIONALITY, _ROLE, _IDENTITY = 'dynasty', 'nationality', 'role', 'identity'
+
+
+class LexiconMatcher:
+    """Aho–Corasick 自动机：一次扫描找出文本中所有词条的出现位置"""
+
+    def __init__(self, entries):
+        """entries: {词条: 类别}"""
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for word, kind in entries.items():
+            self._add(word, kind)
+        self._build()
+
+    def _add(self, word, kind):
+        state = 0
+        for char in word:
+            nxt = self.goto[state].get(char)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][char] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = nxt
+        self.output[state].append((word, kind))
+
+    def _build(self):
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+
+    def find_all(self, text):
+        """返回 [(起始位置, 结束位置, 词条, 类别), ...]，按结束位置排列"""
+        matches = []
+        state = 0
+        goto, fail, output = self.goto, self.fail, self.output
+        for end, char in enumerate(text, 1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for word, kind in output[state]:
+                matches.append((end - len(word), end, word, kind))
+        return matches
+
+
+def _lexicon():
+    entries = {}
+    for word in DYNASTIES:
+        entries[word] = _DYNASTY
+    for word in NATIONALITIES:
+        entries[word] = _NATIONALITY
+    for word in IDENTITIES:
+        entries[word] = _IDENTITY
+    for word in ROLES:
+        entries[word] = _ROLE
+    return entries
+
+
+class AuthorParser:
+    """作者字段解析器，结果按原始字符串缓存"""
+
+    def __init__(self):
+        self.matcher = LexiconMatcher(_lexicon())
+        self._cache = {}
+
+    def parse(self, author):
+        """
+        解析作者字段，返回 Person 元组
+
+        例如: parse('世亲菩萨造 唐 玄奘译')
+              -> (Person('世亲', None, None, None, '菩萨', '造', 'author'),
+                  Person('玄奘', '唐', 'tang', None, None, '译', 'translator'))
+        """
+        author = (author or '').strip()
+        persons = self._cache.get(author)
+        if persons is None:
+            persons = self._cache[author] = tuple(self._parse(author))
+        return persons
+
+    def parse_many(self, authors):
+        """批量解析，每个不同的作者字段只解析一次"""
+        return [self.parse(author) for author in authors]
+
+    def _parse(self, author):
+        if author in EMPTY_AUTHORS:
+            return []
+        # 繁体字只在匹配时转换，人名保留原文
+        text = author.translate(_TRADITIONAL)
+        if UNNAMED_PATTERN.match(text):
+            return [Person('佚名', None, None, None, None, '译', 'translator')]
+
+        matches = self.matcher.find_all(text)
+        persons = []
+        seen = set()
+        for start, end in self._segments(text, matches):
+            segment_matches = [m for m in matches if m[0] >= start and m[1] <= end]
+            for person in self._parse_segment(author, start, end, segment_matches):
+                key = (person.name, person.role)
+                if key not in seen:
+                    seen.add(key)
+                    persons.append(person)
+        return persons
+
+    @staticmethod
+    def _segments(text, matches):
+        """
+        按空白切分为各人的片段：角色词之后的空白，或「朝代 + 空白」之前的空白
+        返回 [(起始, 结束), ...]
+        """
+        role_ends = {m[1] for m in matches if m[3] == _ROLE}
+        dynasty_starts = {m[0] for m in matches
+                          if m[3] == _DYNASTY and m[1] < len(text) and text[m[1]].isspace()}
+        segments = []
+        start = 0
+        pos = 0
+        length = len(text)
+        while pos < length:
+            if not text[pos].isspace():
+                pos += 1
+                continue
+            ws_end = pos
+            while ws_end < length and text[ws_end].isspace():
+                ws_end += 1
+            if pos in role_ends or ws_end in dynasty_starts:
+                segments.append((start, pos))
+                start = ws_end
+            pos = ws_end
+        segments.append((start, length))
+        return segments
+
+    @staticmethod
+    def _parse_segment(author, begin, stop, matches):
+        """解析 author[begin:stop] 中的一个片段，matches 为该片段内的词条"""
+        # 去掉「(门人)」等附注
+        if author[begin:stop].startswith(('(', '（')):
+            close = max(author.find(')', begin, stop), author.find('）', begin, stop))
+            if close > 0:
+                begin = close + 1
+        while begin < stop and author[begin].isspace():
+            begin += 1
+        while stop > begin and author[stop - 1].isspace():
+            stop -= 1
+        if begin >= stop:
+            return []
+
+        dynasty = dynasty_id = nationality = identity = None
+        role, role_type = '', 'unknown'
+
+        # 1. 开头的朝代（其后必须是空白，且剩余至少两个字）
+        name_start = begin
+        if not author.startswith(tuple(KNOWN_NAMES), begin):
+            for start, end, word, kind in matches:
+                if (kind == _DYNASTY and start == begin and end < stop and author[end].isspace()
+                        and len(author[end:stop].strip()) >= 2):
+                    dynasty_id, dynasty = DYNASTIES[word]
+                    name_start = end
+            while name_start < stop and author[name_start].isspace():
+                name_start += 1
+
+        # 2. 结尾的角色（取最长的词）
+        name_end = stop
+        for start, end, word, kind in matches:
+            if kind == _ROLE and end == stop and start > name_start and len(word) > len(role):
+                role, role_type = word, ROLES[word]
+        if role:
+            name_end = stop - len(role)
+
+        # 3. 国籍和身份（第一个出现的，同一位置取最长的词）
+        removed = {}
+        for start, end, word, kind in matches:
+            if start < name_start or end > name_end:
+                continue
+            if kind == _NATIONALITY and (nationality is None or removed.get('n', (start,))[0] == start):
+                nationality = word
+                removed['n'] = (start, end)
+            elif kind == _IDENTITY and (identity is None or removed.get('i', (start,))[0] == start):
+                identity = word
+                removed['i'] = (start, end)
+
+        names = ''.join(
+            author[pos] for pos in range(name_start, name_end)
+            if not any(start <= pos < end for start, end in removed.values()))
+        names = names.strip()
+        if names.endswith('等'):
+            names = names[:-1]
+
+        # 4. 共译、并列人名拆分为多人
+        if role_type == 'unknown' and dynasty is None and nationality is None:
+            # 只有人名，通常是现代编者
+            role_type = 'editor'
+        persons = []
+        for part in names.split(CO_AUTHOR_SEPARATOR):
+            for name in NAME_SEPARATORS.split(part):
+                name = ''.join(name.split())
+                if name:
+                    persons.append(Person(name, dynasty, dynasty_id, nationality, identity,
+                                          role, role_type))
+        return persons
+
+
+_default_parser = None
+
+
+def _parser():
+    global _default_parser
+    if _default_parser is None:
+        _default_parser = AuthorParser()
+    return _default_parser
+
+
+def parse_author(author):
+    """使用共享解析器解析单个作者字段"""
+    return _parser().parse(author)
+
+
+def parse_authors(authors):
+    """使用共享解析器批量解析"""
+    return _parser().parse_many(authors)
+
+
+def build_person_records(books):
+    """
+    为后端 persons / text_persons 表生成记录
+
+    人物按 (姓名, 朝代 ID) 去重，ID 按首次出现的顺序从 1 开始编号。
+    返回: (persons, text_persons)
+        persons:      [{'id', 'name', 'aliases', 'dynasty_id', 'nationality', 'identity'}, ...]
+        text_persons: [{'text_id', 'person_id', 'role_type', 'role_raw', 'sort_order'}, ...]
+    """
+    books = sorted(books, key=lambda b: b['id'])
+    parsed = parse_authors([book.get('author', '') for book in books])
+
+    persons = []
+    person_ids = {}
+    text_persons = []
+    for book, book_persons in zip(books, parsed):
+        for order, person in enumerate(book_persons):
+            key = (person.name, person.dynasty_id)
+            person_id = person_ids.get(key)
+            if person_id is None:
+                person_id = person_ids[key] = len(persons) + 1
+                persons.append({
+                    'id': person_id,
+                    'name': person.name,
+                    'aliases': None,
+                    'dynasty_id': person.dynasty_id,
+                    'nationality': person.nationality,
+                    'identity': person.identity,
+                })
+            text_persons.append({
+                'text_id': book['id'],
+                'person_id': person_id,
+                'role_type': person.role_type,
+                'role_raw': person.role or None,
+                'sort_order': order,
+            })
+    return persons, text_persons
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+title_query 查询服务的压力测试
+
+按固定比例混合各类查询（经书信息、异译、注疏、组、标题前缀），查询参数从
+分析结果中随机抽取，多个线程各自保持一个连接连续发送请求，统计每个请求的
+延迟分位数（p50 / p90 / p99 / 最大）和吞吐量，结果可写入 JSON 便于多次运行对比。
+
+不指定 --url / --socket 时直接在进程内调用 TitleIndex，测得的是索引本身的
+查询延迟（不含网络和序列化）。
+
+    python bench_query.py --output-dir analysis
+    python bench_query.py --output-dir analysis --url http://127.0.0.1:8765 -c 8 -n 20000
+    python bench_query.py --output-dir analysis --socket /tmp/titles.sock --output bench_query.json
+"""
+
+import argparse
+import http.client
+import json
+import random
+import socket
+import threading
+import time
+from functools import partial
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+from bench_titles import git_commit
+from title_pipeline import DEFAULT_OUTPUT_DIR
+from title_query import QueryError, TitleIndex
+
+# 各类查询所占的比例
+QUERY_MIX = {
+    'text': 30,
+    'translations': 25,
+    'commentaries': 20,
+    'group': 10,
+    'prefix': 15,
+}
+
+# 正式计时前的预热请求数（每个线程）
+WARMUP_REQUESTS = 100
+
+
+def make_requests(index, count, seed=0):
+    """按 QUERY_MIX 生成 count 个 (op, params)，参数取自索引中实际存在的数据"""
+    rng = random.Random(seed)
+    text_ids = list(index.texts)
+    commented = list(index.zhushu_mapping) or text_ids
+    translated = list(index.translation_of) or text_ids
+    group_ids = list(index.group_members)
+    titles = [record['title'] for record in index.texts.values() if record['title']]
+    if not text_ids:
+        raise ValueError('分析结果中没有经书')
+
+    ops = list(QUERY_MIX)
+    weights = [QUERY_MIX[op] for op in ops]
+    requests = []
+    for op in rng.choices(ops, weights, k=count):
+        if op == 'text':
+            params = {'id': rng.choice(text_ids)}
+        elif op == 'translations':
+            params = {'id': rng.choice(translated)}
+        elif op == 'commentaries':
+            params = {'id': rng.choice(commented), 'all': rng.choice(['', '1'])}
+        elif op == 'group':
+            params = {'id': str(rng.choice(group_ids))}
+        else:
+            title = rng.choice(titles)
+            params = {'q': title[:rng.randint(1, min(3, len(title)))]}
+        requests.append((op, params))
+    return requests
+
+
+class InProcessClient:
+    def __init__(self, index):
+        self.index = index
+
+    def send(self, op, params):
+        try:
+            self.index.query(op, params)
+        except QueryError:
+            return False
+        return True
+
+    def close(self):
+        pass
+
+
+class HTTPClient:
+    """保持连接的 HTTP/1.1 客户端"""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.conn = http.client.HTTPConnection(parts.hostname, parts.port or 80)
+
+    def send(self, op, params):
+        self.conn.request('GET', f"/{op}?{urlencode(params)}")
+        response = self.conn.getresponse()
+        response.read()
+        return response.status == 200
+
+    def close(self):
+        self.conn.close()
+
+
+class UnixSocketClient:
+    """每行一个 JSON 请求/响应"""
+
+    def __init__(self, path):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(str(path))
+        self.rfile = self.sock.makefile('rb')
+
+    def send(self, op, params):
+        request = json.dumps({'op': op, **params}, ensure_ascii=False)
+        self.sock.sendall(request.encode('utf-8') + b'\n')
+        return 'error' not in json.loads(self.rfile.readline())
+
+    def close(self):
+        self.rfile.close()
+        self.sock.close()
+
+
+def percentile(sorted_values, p):
+    """最近秩法分位数，sorted_values 已排序"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def run_load(make_client, requests, concurrency=1):
+    """
+    concurrency 个线程分摊 requests，每个线程一个客户端
+    返回 (每个请求的延迟秒数列表, 失败数, 总耗时)
+    """
+    slices = [requests[i::concurrency] for i in range(concurrency)]
+    latencies = [[] for _ in range(concurrency)]
+    failures = [0] * concurrency
+    barrier = threading.Barrier(concurrency + 1)
+
+    def worker(n):
+        client = make_client()
+        try:
+            for op, params in slices[n][:WARMUP_REQUESTS]:
+                client.send(op, params)
+            barrier.wait()
+            timings = latencies[n]
+            clock = time.perf_counter
+            for op, params in slices[n]:
+                start = clock()
+                ok = client.send(op, params)
+                timings.append(clock() - start)
+                if not ok:
+                    failures[n] += 1
+        finally:
+            client.close()
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    return [t for timings in latencies for t in timings], sum(failures), wall
+
+
+def _us(seconds):
+    return round(seconds * 1e6, 1) if seconds is not None else None
+
+
+def summarize(latencies, failures, wall):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'failures': failures,
+        'wall_seconds': round(wall, 4),
+        'requests_per_second': round(len(latencies) / wall, 1) if wall > 0 else None,
+        'p50_us': _us(percentile(latencies, 50)),
+        'p90_us': _us(percentile(latencies, 90)),
+        'p99_us': _us(percentile(latencies, 99)),
+        'max_us': _us(latencies[-1] if latencies else None),
+        'mean_us': _us(sum(latencies) / len(latencies) if latencies else None),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='title_query 查询服务压力测试')
+    parser.add_argument('--output-dir', type=Path, default=DEFAULT_OUTPUT_DIR,
+                        help=f'分析结果目录，用于抽取查询参数（默认 {DEFAULT_OUTPUT_DIR}）')
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--url', help='HTTP 服务地址，如 http://127.0.0.1:8765')
+    target.add_argument('--socket', type=Path, help='Unix socket 路径')
+    parser.add_argument('-n', '--requests', type=int, default=10000, help='请求总数（默认 10000）')
+    parser.add_argument('-c', '--concurrency', type=int, default=1, help='并发连接数（默认 1）')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子（默认 0）')
+    parser.add_argument('--output', type=Path, help='结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    index = TitleIndex.load(args.output_dir)
+    requests = make_requests(index, args.requests, args.seed)
+    if args.url:
+        target_name = args.url
+        make_client = partial(HTTPClient, args.url)
+    elif args.socket:
+        target_name = f"unix:{args.socket}"
+        make_client = partial(UnixSocketClient, args.socket)
+    else:
+        target_name = 'in-process'
+        make_client = partial(InProcessClient, index)
+
+    print(f"压测 {target_name}: {args.requests} 个请求，{args.concurrency} 个连接")
+    summary = summarize(*run_load(make_client, requests, max(1, args.concurrency)))
+    print(f"  吞吐量 {summary['requests_per_second']:,.0f} 请求/秒，失败 {summary['failures']}")
+    print(f"  延迟 p50 {summary['p50_us']} µs  p90 {summary['p90_us']} µs  "
+          f"p99 {summary['p99_us']} µs  最大 {summary['max_us']} µs")
+
+    if args.output:
+        result = {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'git_commit': git_commit(),
+            'target': target_name,
+            'concurrency': args.concurrency,
+            'texts': len(index.texts),
+            'query_mix': QUERY_MIX,
+            **summary,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+标题分析的分阶段性能测试
+
+分别计时：文件扫描、get_text_type 分类、标题标准化、注疏匹配
+（build_sutra_zhushu_mapping）、同经异译分组、作者解析和结果写出，记录吞吐量
+和峰值内存，结果写入 JSON 文件便于多次运行对比。
+
+    python bench_titles.py --data-dir data-simplified
+    python bench_titles.py --synthetic 1 --body-kb 200 --output bench_results.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from author_parser import AuthorParser
+from corpus_scan import list_corpus_files, scan_corpus
+from extract_titles_v2 import (
+    build_sutra_zhushu_mapping,
+    build_translation_groups,
+    extract_source_text,
+    normalize_sutra_title,
+    normalize_title_for_grouping,
+)
+from instrumentation import peak_rss_kb
+from synthetic_corpus import generate_corpus
+from title_classifier import TitleClassifier
+from title_normalizer import clear_cache
+from title_pipeline import ANALYSIS_STAGES, STAGES, AnalysisContext
+
+REPO_ROOT = Path(__file__).resolve().parent
+
+
+def run_stage(name, func, items, nbytes=None, repeat=1):
+    """执行一个阶段 repeat 次，取最快的一次"""
+    best_wall = best_cpu = None
+    result = None
+    for _ in range(repeat):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        result = func()
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        if best_wall is None or wall < best_wall:
+            best_wall, best_cpu = wall, cpu
+
+    stage = {
+        'stage': name,
+        'wall_seconds': round(best_wall, 6),
+        'cpu_seconds': round(best_cpu, 6),
+        'items': items,
+        'items_per_second': round(items / best_wall, 1) if best_wall > 0 else None,
+        'peak_rss_kb': peak_rss_kb(),
+    }
+    if nbytes is not None:
+        stage['bytes'] = nbytes
+        stage['mb_per_second'] = round(nbytes / best_wall / 1e6, 1) if best_wall > 0 else None
+    print(f"  {name:<20} {best_wall:10.4f}s  {stage['items_per_second'] or 0:>12,.0f}/s  "
+          f"峰值内存 {stage['peak_rss_kb'] / 1024:.0f} MB")
+    return stage, result
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def run_benchmark(data_dir, workers=1, repeat=3):
+    """对 data_dir 执行全部阶段，返回结果文档"""
+    files = [p for group in list_corpus_files(data_dir).values() for p in group]
+    corpus_bytes = sum(p.stat().st_size for p in files)
+    print(f"语料: {data_dir}（{len(files)} 个文件，{corpus_bytes / 1e9:.2f} GB）")
+
+    stages = []
+
+    stage, (all_books, errors) = run_stage(
+        'scan', lambda: scan_corpus(data_dir, workers=workers), len(files), corpus_bytes)
+    stage['workers'] = workers
+    stage['errors'] = len(errors)
+    stages.append(stage)
+
+    titles = [book['title'] for book in all_books]
+    # 每次使用新的分类器，避免缓存影响计时
+    stage, classes = run_stage(
+        'get_text_type', lambda: TitleClassifier().classify_many(titles), len(titles),
+        repeat=repeat)
+    stages.append(stage)
+    for book, text_class in zip(all_books, classes):
+        book['text_type'] = text_class.text_type
+        book['suffix'] = text_class.suffix
+
+    def normalize_all():
+        # 清空缓存，计时包含每个标题的首次计算
+        clear_cache()
+        for book in all_books:
+            normalize_title_for_grouping(book['title'], book['text_type'])
+            normalize_sutra_title(book['title'])
+            extract_source_text(book['title'], book['text_type'])
+
+    stages.append(run_stage('normalize', normalize_all, len(all_books), repeat=repeat)[0])
+
+    zhushu_count = sum(1 for book in all_books if book['text_type'] == 'zhushu')
+    stages.append(run_stage('zhushu_mapping', lambda: build_sutra_zhushu_mapping(all_books),
+                            zhushu_count, repeat=repeat)[0])
+
+    jing_count = sum(1 for book in all_books if book['text_type'] == 'jing')
+    stages.append(run_stage('translation_groups', lambda: build_translation_groups(all_books),
+                            jing_count, repeat=repeat)[0])
+
+    authors = [book['author'] for book in all_books]
+    # 每次使用新的解析器，计时包含自动机构建和缓存填充
+    stages.append(run_stage('persons', lambda: AuthorParser().parse_many(authors), len(authors),
+                            repeat=repeat)[0])
+
+    output_dir = Path(tempfile.mkdtemp(prefix='bench-output-'))
+    try:
+        # 与流水线相同，经 set_books 载入列式存储；分类不计入输出阶段
+        ctx = AnalysisContext(data_dir, output_dir, titles_file=output_dir / 'all_titles.txt')
+        ctx.set_books(all_books, errors)
+
+        def write_outputs():
+            # 输出阶段的提示信息不计入结果
+            with contextlib.redirect_stdout(io.StringIO()):
+                for name in ['titles'] + ANALYSIS_STAGES:
+                    STAGES[name](ctx)
+
+        stage, _ = run_stage('output', write_outputs, len(all_books), repeat=1)
+        stage['bytes'] = sum(p.stat().st_size for p in output_dir.iterdir())
+        stages.append(stage)
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'corpus': {'data_dir': str(data_dir), 'files': len(files), 'bytes': corpus_bytes},
+        'stages': stages,
+        'peak_rss_kb': peak_rss_kb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='标题分析分阶段性能测试')
+    parser.add_argument('--data-dir', type=Path, help='要测试的 JSON 语料目录')
+    parser.add_argument('--synthetic', type=float, metavar='SCALE',
+                        help='生成合成语料（SCALE 倍于真实文件数）后测试')
+    parser.add_argument('--body-kb', type=int, default=1800,
+                        help='合成语料的平均正文大小 KB（默认 1800）')
+    parser.add_argument('--keep', action='store_true', help='测试后保留合成语料')
+    parser.add_argument('-j', '--workers', type=int, default=1, help='扫描进程数（默认 1）')
+    parser.add_argument('--repeat', type=int, default=3, help='内存阶段重复次数，取最快（默认 3）')
+    parser.add_argument('--output', type=Path, default=Path('bench_results.json'),
+                        help='结果文件（默认 bench_results.json）')
+    args = parser.parse_args()
+
+    if not args.data_dir and args.synthetic is None:
+        parser.error('需要 --data-dir 或 --synthetic')
+
+    data_dir = args.data_dir
+    synthetic_dir = None
+    if data_dir is None:
+        synthetic_dir = Path(tempfile.mkdtemp(prefix='cbeta-synthetic-'))
+        print(f"正在生成合成语料（{args.synthetic} 倍，平均 {args.body_kb} KB）...")
+        generate_corpus(synthetic_dir, args.synthetic, args.body_kb)
+        data_dir = synthetic_dir
+
+    try:
+        results = run_benchmark(data_dir, workers=args.workers, repeat=args.repeat)
+        if synthetic_dir is not None:
+            results['corpus']['synthetic'] = {'scale': args.synthetic, 'body_kb': args.body_kb}
+    finally:
+        if synthetic_dir is not None and not args.keep:
+            shutil.rmtree(synthetic_dir, ignore_errors=True)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n测试结果已保存到: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
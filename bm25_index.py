@@ -0,0 +1,670 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线构建正文 BM25 倒排索引
+
+后端的 bm25-retriever.ts / bm25-ensemble-retriever.ts 和 text_juans 上的全文索引
+（migrations 0003/0004）在请求时由数据库完成切分和打分。这里在离线阶段逐个
+读取 JSON 语料，按卷切分正文，汉字按字符 n-gram（默认一元 + 二元）切分，
+把倒排表、文档频率和文档长度写成紧凑的二进制段文件，检索时 mmap 打开，
+不需要载入或解析，启动开销只是读取几个文件头。
+
+正文的提取规则与 content_similarity.body_text 相同（跳过注释、异读、行号，
+校勘只取 lem）；卷的切分与 backend/scripts/reimport-juans-final.ts 相同：
+mulu type="卷" 开始新的一卷，第一个卷标记之前的内容为第 0 卷（序），
+没有卷标记的经书整体为第 1 卷。每卷是一篇文档，对应 text_juans 的一行。
+
+索引目录:
+    bm25_manifest.json   段列表、每个段包含的文件及其指纹、全局文档数和总长度
+    <册>-<哈希>.cbbm     每个册目录（如 T/T08）一个段，由一个工作进程独立构建
+
+增量构建：文件指纹（与 header_catalog 相同：commit 记录，或大小 + mtime）
+未变化的段直接沿用，只有包含新增、变化或删除文件的册重新构建。新段写完
+并替换清单后才删除旧段，正在使用旧清单的检索进程不受影响。
+
+段文件格式（整数均为小端，各区按 8 字节对齐）:
+    文件头   8 字节魔数 b'CBBM0001'，uint32 最大 n-gram 长度、文档数、词项数、保留，
+             uint64 文档总长度，随后 8 个 uint64 为下列各区的起始偏移
+    doc_lengths   uint32[文档数]    每篇文档的词项总数（BM25 的 dl）
+    doc_juans     uint32[文档数]    卷号
+    doc_id_offs   uint32[文档数+1]  经书ID在 doc_id_blob 中的偏移
+    doc_id_blob   UTF-8 经书ID依次相连
+    term_keys     uint64[词项数]    词项键，升序；n-gram 各字的码位依次
+                                    放在第 42、21、0 位起的 21 位中（最多 3 字）
+    term_df       uint32[词项数]    文档频率
+    term_offs     uint64[词项数+1]  倒排表在 postings 中的字节偏移
+    postings      每个词项的倒排表为 (文档号差值, 词频) 对的 varint 序列
+                  （LEB128，每字节 7 位，最高位为续位），文档号升序，
+                  第一对的差值为文档号本身
+
+检索时 IDF 取全部段的文档频率之和，平均文档长度取清单中的全局值，
+与单个大索引的打分相同。默认 k1 = 1.2、b = 0.75（与 ParadeDB 相同）。
+
+依赖 numpy（可选依赖，只有使用本模块时才需要安装）。
+
+用法:
+    python bm25_index.py build --data-dir data-simplified --index-dir analysis/bm25 -j 8
+    python bm25_index.py search --index-dir analysis/bm25 "应无所住而生其心" -k 10
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from content_similarity import SKIP_TAGS
+from corpus_io import DEFAULT_PREFETCH_DEPTH, corpus_rel_path, prefetch, read_corpus_bytes
+from corpus_scan import list_corpus_files
+from header_catalog import file_fingerprint, load_file_commits
+from output_writers import atomic_open
+from title_pipeline import DEFAULT_DATA_DIR, DEFAULT_OUTPUT_DIR
+
+try:
+    import numpy as np
+except ImportError:  # 可选依赖
+    np = None
+
+DEFAULT_INDEX_DIR = DEFAULT_OUTPUT_DIR / 'bm25'
+MANIFEST_FILE = 'bm25_manifest.json'
+SEGMENT_SUFFIX = '.cbbm'
+SEGMENT_MAGIC = b'CBBM0001'
+
+# 索引规则的版本，切分或提取规则变化时递增，旧段随之失效
+INDEX_VERSION = 1
+
+# 默认索引一元和二元；最多支持 3 字（键的位数限制）
+DEFAULT_MAX_NGRAM = 2
+MAX_NGRAM = 3
+
+DEFAULT_K1 = 1.2
+DEFAULT_B = 0.75
+DEFAULT_TOP_K = 10
+
+# n-gram 中各字码位在键中的起始位
+_KEY_SHIFTS = (42, 21, 0)
+
+_HEADER = struct.Struct('<8sIIIIQ8Q')
+_ALIGN = 8
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError('BM25 索引需要 numpy: pip install numpy')
+
+
+# ---- 正文与切分 ----
+
+def _is_juan_mulu(node):
+    return node.get('tag') == 'mulu' and (node.get('attrs') or {}).get('type') == '卷'
+
+
+def juan_texts(body):
+    """
+    按卷提取正文纯文本（规则同 content_similarity.body_text）
+    返回 [(卷号, 文本), ...]，省略没有文字的卷
+    """
+    juans = [[0, []]]
+    stack = [body]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            juans[-1][1].append(node)
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+        elif isinstance(node, dict):
+            tag = node.get('tag')
+            if tag == 'mulu':
+                # 目录标签只作为卷的分界，本身的文字不计入正文
+                if _is_juan_mulu(node):
+                    juans.append([len(juans), []])
+                continue
+            if tag in SKIP_TAGS:
+                continue
+            children = node.get('children') or []
+            if tag == 'app':
+                children = [c for c in children if isinstance(c, dict) and c.get('tag') == 'lem'][:1]
+            stack.extend(reversed(children))
+
+    if len(juans) == 1:
+        # 没有卷标记，整体作为第 1 卷
+        juans[0][0] = 1
+    result = []
+    for juan, parts in juans:
+        text = ''.join(parts)
+        if text.strip():
+            result.append((juan, text))
+    return result
+
+
+def _han_mask(codes):
+    """是否汉字（范围与 content_similarity._han_codes 相同）"""
+    return (((codes >= 0x3400) & (codes <= 0x9FFF))
+            | ((codes >= 0xF900) & (codes <= 0xFAFF))
+            | (codes >= 0x20000))
+
+
+def _codes(text):
+    return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+
+
+def ngram_keys(codes, han, sizes):
+    """
+    codes 中长度为 sizes 中各值的 n-gram 的键（uint64 数组）
+    只取全部由汉字组成的 n-gram，不跨越标点和空白
+    """
+    parts = []
+    for n in sizes:
+        m = len(codes) - n + 1
+        if m <= 0:
+            continue
+        valid = han[:m].copy()
+        key = codes[:m] << np.uint64(_KEY_SHIFTS[0])
+        for i in range(1, n):
+            valid &= han[i:i + m]
+            key |= codes[i:i + m] << np.uint64(_KEY_SHIFTS[i])
+        parts.append(key[valid])
+    return np.concatenate(parts) if parts else np.empty(0, dtype=np.uint64)
+
+
+def tokenize(text, max_ngram=DEFAULT_MAX_NGRAM):
+    """正文的全部 1..max_ngram 字 n-gram 的键"""
+    codes = _codes(text)
+    return ngram_keys(codes, _han_mask(codes), range(1, max_ngram + 1))
+
+
+def query_terms(query, max_ngram=DEFAULT_MAX_NGRAM):
+    """
+    查询的词项键（去重）：每段连续汉字取 min(max_ngram, 段长) 字的 n-gram，
+    即二元索引时「应无所住」查询 应无、无所、所住，单字查询取一元
+    """
+    codes = _codes(query)
+    han = _han_mask(codes)
+    keys = []
+    start = None
+    for i in range(len(codes) + 1):
+        if i < len(codes) and han[i]:
+            if start is None:
+                start = i
+            continue
+        if start is not None:
+            n = min(max_ngram, i - start)
+            run = codes[start:i]
+            keys.append(ngram_keys(run, np.ones(len(run), dtype=bool), [n]))
+            start = None
+    if not keys:
+        return np.empty(0, dtype=np.uint64)
+    return np.unique(np.concatenate(keys))
+
+
+def term_text(key):
+    """词项键还原为文字（调试用）"""
+    key = int(key)
+    chars = [(key >> shift) & 0x1FFFFF for shift in _KEY_SHIFTS]
+    return ''.join(chr(c) for c in chars if c)
+
+
+# ---- varint ----
+
+def encode_varints(values):
+    """
+    把非负整数数组编码为 LEB128 varint 字节序列（向量化）
+    返回 (编码后的 uint8 数组, 每个值的字节数)
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    nbytes = np.ones(len(values), dtype=np.int64)
+    for k in range(1, 10):
+        more = values >= np.uint64(1 << (7 * k))
+        if not more.any():
+            break
+        nbytes += more
+    starts = np.cumsum(nbytes) - nbytes
+    out = np.empty(int(nbytes.sum()), dtype=np.uint8)
+    for k in range(int(nbytes.max()) if len(values) else 0):
+        mask = nbytes > k
+        byte = (values[mask] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        byte |= np.where(nbytes[mask] > k + 1, np.uint64(0x80), np.uint64(0))
+        out[starts[mask] + k] = byte
+    return out, nbytes
+
+
+def decode_varints(data):
+    """解码 LEB128 varint 字节序列（uint8 数组），返回 uint64 数组"""
+    data = np.asarray(data, dtype=np.uint8)
+    if not len(data):
+        return np.empty(0, dtype=np.uint64)
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.empty(len(ends), dtype=np.int64)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    # 每个字节在所属 varint 中的位置
+    position = np.arange(len(data)) - np.repeat(starts, ends - starts + 1)
+    parts = (data & 0x7F).astype(np.uint64) << (np.uint64(7) * position.astype(np.uint64))
+    return np.add.reduceat(parts, starts)
+
+
+# ---- 段文件 ----
+
+def _pad(f, offset):
+    padding = -offset % _ALIGN
+    f.write(b'\0' * padding)
+    return offset + padding
+
+
+def write_segment(path, docs, max_ngram):
+    """
+    写出一个段文件
+    docs: [(经书ID, 卷号, 文档长度, 词项键数组, 词频数组), ...]，词项键在文档内不重复
+    返回 (词项数, 文件字节数)
+    """
+    doc_count = len(docs)
+    if doc_count:
+        keys = np.concatenate([doc[3] for doc in docs])
+        tfs = np.concatenate([doc[4] for doc in docs]).astype(np.uint64)
+        doc_ids = np.repeat(np.arange(doc_count, dtype=np.int64), [len(doc[3]) for doc in docs])
+    else:
+        keys = np.empty(0, dtype=np.uint64)
+        tfs = np.empty(0, dtype=np.uint64)
+        doc_ids = np.empty(0, dtype=np.int64)
+
+    # 稳定排序：同一词项内文档号保持升序
+    order = np.argsort(keys, kind='stable')
+    keys, tfs, doc_ids = keys[order], tfs[order], doc_ids[order]
+    terms, term_starts, df = np.unique(keys, return_index=True, return_counts=True)
+
+    deltas = np.empty(len(doc_ids), dtype=np.uint64)
+    if len(doc_ids):
+        deltas[0] = doc_ids[0]
+        deltas[1:] = np.diff(doc_ids).astype(np.uint64)
+        deltas[term_starts] = doc_ids[term_starts].astype(np.uint64)
+    pairs = np.empty(2 * len(doc_ids), dtype=np.uint64)
+    pairs[0::2] = deltas
+    pairs[1::2] = tfs
+    postings, nbytes = encode_varints(pairs)
+    pair_offsets = (np.cumsum(nbytes) - nbytes)[0::2]
+    term_offsets = np.append(pair_offsets[term_starts], len(postings)).astype(np.uint64)
+
+    id_blobs = [doc[0].encode('utf-8') for doc in docs]
+    id_offsets = np.zeros(doc_count + 1, dtype=np.uint32)
+    id_offsets[1:] = np.cumsum([len(blob) for blob in id_blobs])
+    sections = [
+        np.array([doc[2] for doc in docs], dtype=np.uint32).tobytes(),
+        np.array([doc[1] for doc in docs], dtype=np.uint32).tobytes(),
+        id_offsets.tobytes(),
+        b''.join(id_blobs),
+        terms.astype(np.uint64).tobytes(),
+        df.astype(np.uint32).tobytes(),
+        term_offsets.tobytes(),
+        postings.tobytes(),
+    ]
+    total_length = sum(doc[2] for doc in docs)
+
+    with atomic_open(path, 'wb') as f:
+        f.write(b'\0' * _HEADER.size)
+        offset = _pad(f, _HEADER.size)
+        section_offsets = []
+        for data in sections:
+            section_offsets.append(offset)
+            f.write(data)
+            offset = _pad(f, offset + len(data))
+        f.seek(0)
+        f.write(_HEADER.pack(SEGMENT_MAGIC, max_ngram, doc_count, len(terms), 0, total_length,
+                             *section_offsets))
+    return len(terms), offset
+
+
+class BM25Segment:
+    """mmap 打开的段文件；各区直接映射为 numpy 数组，不复制"""
+
+    def __init__(self, path):
+        _require_numpy()
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        fields = _HEADER.unpack_from(self._mmap, 0)
+        if fields[0] != SEGMENT_MAGIC:
+            raise ValueError(f"不是 BM25 段文件: {self.path}")
+        (_, self.max_ngram, self.doc_count, self.term_count, _, self.total_length) = fields[:6]
+        offsets = fields[6:]
+
+        def view(dtype, count, offset):
+            return np.frombuffer(self._mmap, dtype=dtype, count=count, offset=offset)
+
+        self.doc_lengths = view(np.uint32, self.doc_count, offsets[0])
+        self.doc_juans = view(np.uint32, self.doc_count, offsets[1])
+        self._id_offsets = view(np.uint32, self.doc_count + 1, offsets[2])
+        self._id_blob = offsets[3]
+        self.term_keys = view(np.uint64, self.term_count, offsets[4])
+        self.term_df = view(np.uint32, self.term_count, offsets[5])
+        self._term_offsets = view(np.uint64, self.term_count + 1, offsets[6])
+        self._postings = offsets[7]
+
+    def close(self):
+        # 先释放映射到文件的数组，mmap 才能关闭
+        self.doc_lengths = self.doc_juans = self._id_offsets = None
+        self.term_keys = self.term_df = self._term_offsets = None
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def text_id(self, doc):
+        start = self._id_blob + int(self._id_offsets[doc])
+        end = self._id_blob + int(self._id_offsets[doc + 1])
+        return self._mmap[start:end].decode('utf-8')
+
+    def find_terms(self, keys):
+        """词项键 → 词项序号，不存在的为 -1"""
+        if not self.term_count:
+            return np.full(len(keys), -1, dtype=np.int64)
+        index = np.searchsorted(self.term_keys, keys)
+        clipped = np.minimum(index, self.term_count - 1)
+        return np.where(self.term_keys[clipped] == keys, clipped, -1)
+
+    def postings(self, term):
+        """词项的倒排表，返回 (文档号数组, 词频数组)"""
+        start = self._postings + int(self._term_offsets[term])
+        end = self._postings + int(self._term_offsets[term + 1])
+        values = decode_varints(np.frombuffer(self._mmap, dtype=np.uint8, count=end - start,
+                                              offset=start))
+        return np.cumsum(values[0::2]), values[1::2]
+
+
+# ---- 构建 ----
+
+def file_documents(path, max_ngram, prefetched=None):
+    """
+    读取单个文件并切分为各卷文档
+    返回 (docs, error)，docs 为 write_segment 的文档列表
+    """
+    try:
+        data = json.loads(read_corpus_bytes(path, prefetched))
+        text_id = data.get('id') or Path(path).name.split('.')[0]
+        docs = []
+        for juan, text in juan_texts(data.get('body', [])):
+            keys = tokenize(text, max_ngram)
+            if not len(keys):
+                continue
+            terms, counts = np.unique(keys, return_counts=True)
+            docs.append((text_id, juan, len(keys), terms, counts))
+        return docs, None
+    except Exception as e:
+        return [], f"{type(e).__name__}: {e}"
+
+
+def _build_segment(task):
+    """工作进程：读取一个册目录的全部文件，写出段文件，返回段的描述"""
+    shard, files, segment_path, max_ngram, prefetch_depth = task
+    paths = [path for path, _, _ in files]
+    if prefetch_depth > 0:
+        # 正文需要完整读取，预读整个文件
+        loaded = prefetch(paths, depth=prefetch_depth)
+    else:
+        loaded = ((path, None) for path in paths)
+
+    docs = []
+    errors = []
+    fingerprints = {}
+    for (path, prefetched), (_, rel_path, fingerprint) in zip(loaded, files):
+        file_docs, error = file_documents(path, max_ngram, prefetched)
+        if error is not None:
+            errors.append({'path': path, 'error': error})
+            # 读取失败的文件不记录指纹，下次重新构建该段
+            fingerprints[rel_path] = None
+            continue
+        docs.extend(file_docs)
+        fingerprints[rel_path] = fingerprint
+
+    terms, size = write_segment(segment_path, docs, max_ngram)
+    segment = {
+        'file': Path(segment_path).name,
+        'docs': len(docs),
+        'length': sum(doc[2] for doc in docs),
+        'terms': terms,
+        'bytes': size,
+        'files': fingerprints,
+    }
+    return shard, segment, errors
+
+
+def _shard_of(rel_path):
+    """段按册目录划分：T/T08/T08n0235.json → T/T08"""
+    return rel_path.rsplit('/', 1)[0] if '/' in rel_path else '.'
+
+
+def _segment_name(shard, fingerprints, max_ngram):
+    digest = hashlib.sha1(json.dumps([max_ngram, sorted(fingerprints.items())]).encode('utf-8'))
+    return f"{shard.replace('/', '_')}-{digest.hexdigest()[:12]}{SEGMENT_SUFFIX}"
+
+
+def load_manifest(index_dir):
+    """读取索引清单；不存在或版本不符时返回 None"""
+    try:
+        with open(Path(index_dir) / MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != INDEX_VERSION:
+        return None
+    return manifest
+
+
+def build_index(data_dir, index_dir=DEFAULT_INDEX_DIR, workers=1, max_ngram=DEFAULT_MAX_NGRAM,
+                full=False, prefetch_depth=DEFAULT_PREFETCH_DEPTH):
+    """
+    构建或增量更新索引
+
+    full: 忽略已有的段，全部重新构建
+    返回: (manifest, errors, counts)
+        counts: {'built': 段数, 'reused': 段数, 'deleted': 段文件数, 'files': 重新读取的文件数}
+    """
+    _require_numpy()
+    if not 1 <= max_ngram <= MAX_NGRAM:
+        raise ValueError(f"n-gram 长度必须在 1 到 {MAX_NGRAM} 之间: {max_ngram}")
+    if not workers:
+        workers = os.cpu_count() or 1
+    index_dir = Path(index_dir)
+    index_dir.mkdir(parents=True, exist_ok=True)
+
+    commit_fingerprints = load_file_commits(data_dir)
+    shards = defaultdict(list)
+    for files in list_corpus_files(data_dir).values():
+        for path in files:
+            rel_path = corpus_rel_path(path, data_dir)
+            # 索引规则的版本也计入指纹
+            fingerprint = f"v{INDEX_VERSION}:{file_fingerprint(path, commit_fingerprints, rel_path)}"
+            shards[_shard_of(rel_path)].append((str(path), rel_path, fingerprint))
+
+    previous = None if full else load_manifest(index_dir)
+    if previous is not None and previous.get('max_ngram') != max_ngram:
+        previous = None
+    old_segments = previous['segments'] if previous else {}
+
+    segments = {}
+    tasks = []
+    for shard in sorted(shards):
+        files = shards[shard]
+        fingerprints = {rel_path: fingerprint for _, rel_path, fingerprint in files}
+        old = old_segments.get(shard)
+        if old is not None and old['files'] == fingerprints and (index_dir / old['file']).exists():
+            segments[shard] = old
+            continue
+        segment_path = index_dir / _segment_name(shard, fingerprints, max_ngram)
+        tasks.append((shard, files, str(segment_path), max_ngram, prefetch_depth))
+
+    counts = {'built': len(tasks), 'reused': len(segments), 'deleted': 0,
+              'files': sum(len(task[1]) for task in tasks)}
+    errors = []
+    # 大的册先开始，减少最后只剩一个进程在工作的时间
+    tasks.sort(key=lambda task: -len(task[1]))
+    if workers == 1 or len(tasks) <= 1:
+        results = map(_build_segment, tasks)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = executor.map(_build_segment, tasks)
+    try:
+        for shard, segment, shard_errors in results:
+            segments[shard] = segment
+            errors.extend(shard_errors)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    segments = dict(sorted(segments.items()))
+    manifest = {
+        'version': INDEX_VERSION,
+        'max_ngram': max_ngram,
+        'docs': sum(segment['docs'] for segment in segments.values()),
+        'total_length': sum(segment['length'] for segment in segments.values()),
+        'terms': sum(segment['terms'] for segment in segments.values()),
+        'bytes': sum(segment['bytes'] for segment in segments.values()),
+        'segments': segments,
+    }
+    with atomic_open(index_dir / MANIFEST_FILE) as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    # 清单替换后再删除不再使用的段
+    used = {segment['file'] for segment in segments.values()}
+    for path in index_dir.glob('*' + SEGMENT_SUFFIX):
+        if path.name not in used:
+            path.unlink()
+            counts['deleted'] += 1
+
+    errors.sort(key=lambda x: x['path'])
+    return manifest, errors, counts
+
+
+# ---- 检索 ----
+
+class BM25Index:
+    """按清单打开全部段，跨段计算全局 IDF 和平均文档长度"""
+
+    def __init__(self, index_dir=DEFAULT_INDEX_DIR):
+        _require_numpy()
+        self.index_dir = Path(index_dir)
+        manifest = load_manifest(self.index_dir)
+        if manifest is None:
+            raise FileNotFoundError(f"找不到索引清单 {MANIFEST_FILE}（或版本不符）: {self.index_dir}")
+        self.max_ngram = manifest['max_ngram']
+        self.doc_count = manifest['docs']
+        self.avg_length = manifest['total_length'] / self.doc_count if self.doc_count else 0.0
+        self.segments = [BM25Segment(self.index_dir / segment['file'])
+                         for segment in manifest['segments'].values()]
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def search(self, query, top_k=DEFAULT_TOP_K, k1=DEFAULT_K1, b=DEFAULT_B):
+        """
+        BM25 检索
+        返回: [{'text_id', 'juan', 'score'}, ...]，按得分降序，同分按经书ID和卷号
+        """
+        keys = query_terms(query, self.max_ngram)
+        if not len(keys) or not self.doc_count:
+            return []
+
+        found = [segment.find_terms(keys) for segment in self.segments]
+        df = np.zeros(len(keys), dtype=np.float64)
+        for segment, terms in zip(self.segments, found):
+            present = terms >= 0
+            df[present] += segment.term_df[terms[present]]
+        idf = np.log1p((self.doc_count - df + 0.5) / (df + 0.5))
+
+        candidates = []
+        for segment, terms in zip(self.segments, found):
+            if not (terms >= 0).any():
+                continue
+            scores = np.zeros(segment.doc_count, dtype=np.float64)
+            norm = k1 * (1 - b + b * segment.doc_lengths.astype(np.float64) / self.avg_length)
+            for q, term in enumerate(terms):
+                if term < 0:
+                    continue
+                docs, tfs = segment.postings(term)
+                tfs = tfs.astype(np.float64)
+                # 同一词项在一个文档中只出现一次，可以直接按下标累加
+                scores[docs] += idf[q] * tfs * (k1 + 1) / (tfs + norm[docs])
+            hits = np.flatnonzero(scores > 0)
+            if len(hits) > top_k:
+                # 保留得分不低于第 k 名的全部文档：同分的文档要到合并后按经书ID和卷号
+                # 排序才能决定取舍；结果按六位小数比较，阈值放宽 1e-6 以包含取整后同分的文档
+                kth = np.partition(scores[hits], len(hits) - top_k)[len(hits) - top_k]
+                hits = hits[scores[hits] >= kth - 1e-6]
+            candidates.extend((float(scores[doc]), segment, int(doc)) for doc in hits)
+
+        results = [{'text_id': segment.text_id(doc), 'juan': int(segment.doc_juans[doc]),
+                    'score': round(score, 6)}
+                   for score, segment, doc in candidates]
+        results.sort(key=lambda r: (-r['score'], r['text_id'], r['juan']))
+        return results[:top_k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='离线构建正文 BM25 倒排索引')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = sub.add_parser('build', help='构建或增量更新索引')
+    build_parser.add_argument('--data-dir', type=Path, default=DEFAULT_DATA_DIR,
+                              help='JSON 语料目录或 .cbpack 归档')
+    build_parser.add_argument('--index-dir', type=Path, default=DEFAULT_INDEX_DIR,
+                              help=f'索引目录（默认 {DEFAULT_INDEX_DIR}）')
+    build_parser.add_argument('-j', '--workers', type=int, default=1,
+                              help='构建进程数，1 为串行，0 为使用全部 CPU（默认 1）')
+    build_parser.add_argument('--max-ngram', type=int, default=DEFAULT_MAX_NGRAM, metavar='N',
+                              help=f'索引 1..N 字的 n-gram（默认 {DEFAULT_MAX_NGRAM}，最大 {MAX_NGRAM}）')
+    build_parser.add_argument('--prefetch', type=int, default=DEFAULT_PREFETCH_DEPTH, metavar='N',
+                              help=f'每个进程同时预读的文件数，0 为不预读（默认 {DEFAULT_PREFETCH_DEPTH}）')
+    build_parser.add_argument('--full', action='store_true', help='忽略已有的段，全部重新构建')
+
+    search_parser = sub.add_parser('search', help='检索并输出得分最高的卷')
+    search_parser.add_argument('query', help='查询文字')
+    search_parser.add_argument('--index-dir', type=Path, default=DEFAULT_INDEX_DIR,
+                               help=f'索引目录（默认 {DEFAULT_INDEX_DIR}）')
+    search_parser.add_argument('-k', '--top-k', type=int, default=DEFAULT_TOP_K,
+                               help=f'返回条数（默认 {DEFAULT_TOP_K}）')
+    search_parser.add_argument('--k1', type=float, default=DEFAULT_K1, help=f'BM25 k1（默认 {DEFAULT_K1}）')
+    search_parser.add_argument('--b', type=float, default=DEFAULT_B, help=f'BM25 b（默认 {DEFAULT_B}）')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        manifest, errors, counts = build_index(args.data_dir, args.index_dir, args.workers,
+                                               args.max_ngram, args.full, args.prefetch)
+        print(f"重新构建 {counts['built']} 个段（{counts['files']} 个文件），沿用 {counts['reused']} 个，"
+              f"删除 {counts['deleted']} 个旧段，用时 {time.perf_counter() - start:.2f}s")
+        print(f"文档（卷）{manifest['docs']:,} 篇，词项总长度 {manifest['total_length']:,}，"
+              f"索引大小 {manifest['bytes'] / 1e6:.1f} MB")
+        if errors:
+            print(f"读取失败 {len(errors)} 个文件:")
+            for err in errors:
+                print(f"  - {err['path']}: {err['error']}")
+        print(f"索引已保存到: {args.index_dir}")
+        return
+
+    with BM25Index(args.index_dir) as index:
+        start = time.perf_counter()
+        results = index.search(args.query, args.top_k, args.k1, args.b)
+        elapsed = time.perf_counter() - start
+        for rank, result in enumerate(results, 1):
+            print(f"{rank:3d}. {result['text_id']} 第{result['juan']}卷  {result['score']:.4f}")
+        print(f"共 {len(results)} 条，用时 {elapsed * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+经书记录的列式存储
+
+扫描得到的每部经书原本是一个 dict，其中作者、出处等字符串大量重复；
+分组、注疏映射等中间结果又各自持有这些 dict。这里把记录按列保存：
+字符串列经过 intern 去重，文本类型保存为一个字节的类型码。
+BookRecord 只是 (存储, 下标) 的轻量视图，按 dict 的方式读取字段，
+所以分组等结构实际上只持有下标，现有分析函数无需修改。
+"""
+
+import sys
+from array import array
+from collections.abc import Mapping, Sequence
+
+# 文本类型及其类型码
+TEXT_TYPES = ('jing', 'lun', 'zhushu', 'other', 'unknown')
+TYPE_CODES = {text_type: code for code, text_type in enumerate(TEXT_TYPES)}
+
+# 字符串列
+STRING_FIELDS = ('id', 'title', 'author', 'source', 'suffix')
+FIELDS = ('id', 'title', 'author', 'source', 'text_type', 'suffix')
+
+
+class BookRecord(Mapping):
+    """单部经书的只读视图，字段与扫描得到的 dict 相同"""
+
+    __slots__ = ('_store', '_index')
+
+    def __init__(self, store, index):
+        self._store = store
+        self._index = index
+
+    def __getitem__(self, key):
+        store = self._store
+        if key == 'text_type':
+            return TEXT_TYPES[store.type_codes[self._index]]
+        column = store.columns.get(key)
+        if column is None:
+            raise KeyError(key)
+        return column[self._index]
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self):
+        return len(FIELDS)
+
+    @property
+    def index(self):
+        return self._index
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return f"BookRecord({self.to_dict()!r})"
+
+
+class BookStore(Sequence):
+    """
+    经书记录的列式存储
+
+    可以像 list 一样迭代和下标访问，得到 BookRecord。
+    """
+
+    def __init__(self):
+        self.columns = {field: [] for field in STRING_FIELDS}
+        self.type_codes = array('B')
+
+    @classmethod
+    def from_books(cls, books, classes=None):
+        """
+        由扫描得到的 dict 列表构建
+        classes: 可选，与 books 对应的 TitleClass 列表；省略时使用 dict 中的 text_type、suffix
+        """
+        store = cls()
+        if classes is None:
+            for book in books:
+                store.append(book, book.get('text_type', 'unknown'), book.get('suffix'))
+        else:
+            for book, text_class in zip(books, classes):
+                store.append(book, text_class.text_type, text_class.suffix)
+        return store
+
+    def append(self, info, text_type, suffix=None):
+        columns = self.columns
+        for field in ('id', 'title', 'author', 'source'):
+            value = info.get(field, '')
+            columns[field].append(sys.intern(value) if isinstance(value, str) else value)
+        columns['suffix'].append(sys.intern(suffix) if suffix else suffix)
+        self.type_codes.append(TYPE_CODES[text_type])
+
+    def __len__(self):
+        return len(self.type_codes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [BookRecord(self, i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('BookStore index out of range')
+        return BookRecord(self, index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield BookRecord(self, i)
+
+    def records(self, indices):
+        """按下标数组取记录"""
+        return [BookRecord(self, i) for i in indices]
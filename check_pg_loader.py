@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+pg_loader 的数据库检查
+
+在一个临时 PostgreSQL 实例（或 --database-url 指定的空数据库）中按
+packages/backend/src/db/schema.ts 建立 texts / text_relations /
+translation_groups / translation_group_texts 表，然后用分析结果依次检查：
+
+    1. diff 载入：表中的行与预期一致（跳过不存在的经文、不足两部的异译组）
+    2. 再次 diff 载入：没有删除、插入或更新任何行
+    3. 去掉一行再 diff 载入，然后恢复：只删除、插入这一行
+    4. replace 载入：删除并重新插入全部行，结果不变
+    5. 其他来源（seed-relations.ts 等）的行始终不受影响
+
+不指定 --database-url 时用 initdb / pg_ctl 在临时目录中启动实例，结束后删除；
+PostgreSQL 的程序需要在 PATH 中或由 --pg-bin 指定，且不能以 root 运行。
+需要 psycopg。
+
+    python check_pg_loader.py --output-dir analysis
+    python check_pg_loader.py --output-dir analysis --database-url postgres:///pg_loader_check
+"""
+
+import argparse
+import contextlib
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from pg_loader import LOADER_SOURCE, load_analysis_rows, load_to_database, print_load_stats
+from title_pipeline import DEFAULT_OUTPUT_DIR
+
+try:
+    import psycopg
+except ImportError:  # 可选依赖
+    psycopg = None
+
+# schema.ts 中与载入有关的表（只保留用到的列）
+SCHEMA = """
+CREATE TABLE texts (
+    id varchar(32) PRIMARY KEY,
+    title text NOT NULL
+);
+CREATE TABLE text_relations (
+    id serial PRIMARY KEY,
+    source_text_id varchar(32) NOT NULL REFERENCES texts(id),
+    target_text_id varchar(32) NOT NULL REFERENCES texts(id),
+    relation_type varchar(32) NOT NULL,
+    relation_subtype varchar(32),
+    confidence integer,
+    source varchar(64)
+);
+CREATE TABLE translation_groups (
+    id serial PRIMARY KEY,
+    base_title text NOT NULL,
+    source varchar(64)
+);
+CREATE TABLE translation_group_texts (
+    id serial PRIMARY KEY,
+    group_id integer NOT NULL REFERENCES translation_groups(id),
+    text_id varchar(32) NOT NULL REFERENCES texts(id),
+    sort_order integer NOT NULL DEFAULT 0
+);
+"""
+
+# 每隔多少部经文留一部不写入 texts，用来检查跳过不存在的经文
+MISSING_EVERY = 20
+
+# 其他来源的行，载入前后都应保持不变
+OTHER_SOURCE = 'manual'
+
+
+class CheckFailed(Exception):
+    pass
+
+
+def _row_key(row):
+    # NULL 排在最后，与 ORDER BY 的默认顺序相同
+    return tuple((value is None, '' if value is None else value) for value in row)
+
+
+def check(condition, message):
+    if not condition:
+        raise CheckFailed(message)
+
+
+@contextlib.contextmanager
+def temporary_cluster(pg_bin=None):
+    """在临时目录中 initdb 并启动 PostgreSQL，只监听目录中的 Unix socket，返回连接串"""
+    def program(name):
+        path = shutil.which(name, path=str(pg_bin) if pg_bin else None)
+        if path is None:
+            raise FileNotFoundError(f"找不到 PostgreSQL 程序 {name}，请用 --pg-bin 指定所在目录")
+        return path
+
+    with tempfile.TemporaryDirectory(prefix='pg_loader_check_') as tmp:
+        data_dir = Path(tmp) / 'data'
+        subprocess.run([program('initdb'), '-D', str(data_dir), '-U', 'postgres', '-A', 'trust',
+                        '-E', 'UTF8', '--no-locale'], check=True, stdout=subprocess.DEVNULL)
+        subprocess.run([program('pg_ctl'), '-D', str(data_dir), '-l', str(Path(tmp) / 'server.log'),
+                        '-o', f"-k {tmp} -c listen_addresses=''", '-w', 'start'],
+                       check=True, stdout=subprocess.DEVNULL)
+        try:
+            yield f"postgres:///postgres?host={tmp}&user=postgres"
+        finally:
+            subprocess.run([program('pg_ctl'), '-D', str(data_dir), '-m', 'fast', 'stop'],
+                           check=False, stdout=subprocess.DEVNULL)
+
+
+def referenced_texts(table_rows):
+    ids = set()
+    for row in table_rows['text_relations']:
+        ids.update(row[:2])
+    for row in table_rows['translation_groups']:
+        ids.add(row[1])
+    return sorted(ids)
+
+
+def expected_rows(table_rows, existing):
+    """按 pg_loader 的规则，载入后 text_relations 和 translation_group_texts 应有的行"""
+    relations = sorted((row for row in table_rows['text_relations']
+                        if row[0] in existing and row[1] in existing), key=_row_key)
+    members = {}
+    for base_title, text_id, order in table_rows['translation_groups']:
+        if text_id in existing:
+            members.setdefault(base_title, []).append((base_title, text_id, order))
+    translations = sorted((row for rows in members.values() if len(rows) >= 2 for row in rows),
+                          key=_row_key)
+    return relations, translations
+
+
+def snapshot(conn):
+    """本工具载入的行，以及其他来源的行"""
+    relations = conn.execute(
+        "SELECT source_text_id, target_text_id, relation_type, relation_subtype, confidence"
+        "  FROM text_relations WHERE source = %s", (LOADER_SOURCE,)).fetchall()
+    translations = conn.execute(
+        "SELECT g.base_title, gt.text_id, gt.sort_order"
+        "  FROM translation_group_texts gt JOIN translation_groups g ON g.id = gt.group_id"
+        " WHERE g.source = %s", (LOADER_SOURCE,)).fetchall()
+    others = conn.execute(
+        "SELECT source_text_id, target_text_id, relation_type FROM text_relations"
+        " WHERE source IS DISTINCT FROM %s", (LOADER_SOURCE,)).fetchall()
+    return tuple(sorted(rows, key=_row_key) for rows in (relations, translations, others))
+
+
+def prepare_database(conn, table_rows):
+    """建表并写入经文，返回写入的经文 ID 集合"""
+    ids = referenced_texts(table_rows)
+    existing = set(ids) - set(ids[::MISSING_EVERY])
+    conn.execute(SCHEMA)
+    with conn.cursor() as cur:
+        with cur.copy("COPY texts (id, title) FROM STDIN") as copy:
+            for text_id in sorted(existing):
+                copy.write_row((text_id, text_id))
+    if len(existing) >= 2:
+        a, b = sorted(existing)[:2]
+        conn.execute("INSERT INTO text_relations (source_text_id, target_text_id, relation_type, source)"
+                     " VALUES (%s, %s, 'related', %s)", (a, b, OTHER_SOURCE))
+    return existing
+
+
+def load(table_rows, database_url, mode):
+    results = load_to_database(table_rows, database_url, mode)
+    print_load_stats(results)
+    return results
+
+
+def changed(results):
+    """除 staged / skipped 外各项统计的合计"""
+    return {table: sum(count for name, count in stats.items() if name not in ('staged', 'skipped'))
+            for table, stats in results.items()}
+
+
+def run_checks(table_rows, database_url):
+    if psycopg is None:
+        raise ImportError('检查需要 psycopg: pip install "psycopg[binary]"')
+    with psycopg.connect(database_url, autocommit=True) as conn:
+        existing = prepare_database(conn, table_rows)
+        relations, translations = expected_rows(table_rows, existing)
+        others = snapshot(conn)[2]
+        print(f"经文 {len(existing)} 部，预期 text_relations {len(relations)} 行，"
+              f"translation_group_texts {len(translations)} 行")
+
+        print("\n[1] diff 载入")
+        load(table_rows, database_url, 'diff')
+        check(snapshot(conn) == (relations, translations, others), '载入后的行与预期不一致')
+
+        print("\n[2] 再次 diff 载入")
+        results = load(table_rows, database_url, 'diff')
+        check(not any(changed(results).values()), f"重复载入改写了数据: {results}")
+        check(snapshot(conn) == (relations, translations, others), '重复载入后的行发生变化')
+
+        if relations:
+            print("\n[3] 去掉一行后 diff 载入，再恢复")
+            dropped = relations[0]
+            reduced = dict(table_rows, text_relations=[row for row in table_rows['text_relations']
+                                                       if row != dropped])
+            results = load(reduced, database_url, 'diff')
+            check(results['text_relations']['deleted'] == 1 and results['text_relations']['inserted'] == 0,
+                  f"去掉一行后应只删除一行: {results['text_relations']}")
+            results = load(table_rows, database_url, 'diff')
+            check(results['text_relations']['deleted'] == 0 and results['text_relations']['inserted'] == 1,
+                  f"恢复后应只插入一行: {results['text_relations']}")
+            check(snapshot(conn) == (relations, translations, others), '恢复后的行与预期不一致')
+
+        print("\n[4] replace 载入")
+        results = load(table_rows, database_url, 'replace')
+        for table, expected in (('text_relations', relations), ('translation_groups', translations)):
+            stats = results[table]
+            check(stats['deleted'] == stats['inserted'] == len(expected),
+                  f"{table} 应删除并重新插入 {len(expected)} 行: {stats}")
+        check(snapshot(conn) == (relations, translations, others), 'replace 载入后的行与预期不一致')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='在临时数据库中检查 pg_loader 的 diff / replace 载入')
+    parser.add_argument('--output-dir', type=Path, default=DEFAULT_OUTPUT_DIR,
+                        help=f'extract_titles_v2.py 的输出目录（默认 {DEFAULT_OUTPUT_DIR}）')
+    parser.add_argument('--database-url', default=None,
+                        help='使用已有的空数据库（会在其中建表），默认启动临时实例')
+    parser.add_argument('--pg-bin', type=Path, default=None,
+                        help='initdb / pg_ctl 所在目录（默认在 PATH 中查找）')
+    args = parser.parse_args()
+
+    table_rows = load_analysis_rows(args.output_dir)
+    try:
+        if args.database_url:
+            run_checks(table_rows, args.database_url)
+        else:
+            with temporary_cluster(args.pg_bin) as database_url:
+                run_checks(table_rows, database_url)
+    except CheckFailed as e:
+        print(f"\n检查失败: {e}", file=sys.stderr)
+        sys.exit(1)
+    print("\n检查通过")
+
+
+if __name__ == '__main__':
+    main()
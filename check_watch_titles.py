@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+监视模式增量更新的检查
+
+在临时目录中生成一个带 .file-commits.json 的小语料库，先完整同步一次，
+然后模拟转换过程中的改写：文件内容变化而 commit 记录不变（转换器只在一批
+文件完成后才写 .file-commits.json）。依次检查：
+
+    1. 收到该文件的变化后重新读取，输出中的标题随之更新
+    2. 再次收到同一文件的变化但文件未变时，不重新读取、不重写输出
+    3. 之后 .file-commits.json 更新时完整同步，结果不变
+
+    python check_watch_titles.py
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from corpus_io import COMMITS_FILE
+from title_pipeline import AnalysisContext
+from watch_titles import Changes, TitleWatcher
+
+# (经书ID, 标题, 作者)
+BOOKS = [
+    ('T01n0001', '金刚般若波罗蜜经', '姚秦 鸠摩罗什译'),
+    ('T01n0002', '重刊八大人觉经', '后汉 安世高译'),
+    ('T01n0003', '般若波罗蜜多心经', '唐 玄奘译'),
+]
+
+CHANGED_ID = 'T01n0002'
+CHANGED_TITLE = '佛说八大人觉经'
+
+
+class CheckFailed(Exception):
+    pass
+
+
+def check(condition, message):
+    if not condition:
+        raise CheckFailed(message)
+
+
+def write_book(data_dir, text_id, title, author):
+    path = data_dir / 'T' / text_id[:3] / f"{text_id}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'id': text_id, 'header': {'title': title, 'author': author, 'source': '大正新脩大藏经'},
+                   'body': []}, f, ensure_ascii=False)
+    return path
+
+
+def write_commits(data_dir, processed_at):
+    records = {f"T/{text_id[:3]}/{text_id}.xml": {'commit': 'a' * 40, 'processedAt': processed_at}
+               for text_id, _, _ in BOOKS}
+    with open(data_dir / COMMITS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(records, f)
+
+
+def output_title(output_dir, text_id):
+    with open(output_dir / 'sutra_groups_v2.json', 'r', encoding='utf-8') as f:
+        return json.load(f)[text_id]['title']
+
+
+def sync(title_watcher, changes):
+    # 流水线的提示信息不计入检查输出
+    with contextlib.redirect_stdout(io.StringIO()):
+        return title_watcher.sync(changes)
+
+
+def run_checks(root):
+    data_dir, output_dir = root / 'data', root / 'analysis'
+    paths = {text_id: write_book(data_dir, text_id, title, author) for text_id, title, author in BOOKS}
+    write_commits(data_dir, '2024-01-01T00:00:00Z')
+
+    ctx = AnalysisContext(data_dir, output_dir, titles_file=output_dir / 'all_titles.txt')
+    output_dir.mkdir(parents=True)
+    title_watcher = TitleWatcher(ctx, ['groups'], watcher=None)
+    try:
+        check(sync(title_watcher, Changes(set(), True)), '首次同步应写出输出')
+        check(output_title(output_dir, CHANGED_ID) == BOOKS[1][1], '首次同步的标题不正确')
+
+        print("[1] 改写文件，commit 记录不变")
+        path = write_book(data_dir, CHANGED_ID, CHANGED_TITLE, BOOKS[1][2])
+        # 保证修改时间与改写前不同
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        check(sync(title_watcher, Changes({path}, False)), '改写的文件没有重新读取')
+        title = output_title(output_dir, CHANGED_ID)
+        check(title == CHANGED_TITLE, f"输出中的标题未更新: {title}")
+
+        print("[2] 再次收到同一文件的变化，文件未变")
+        check(not sync(title_watcher, Changes({paths[CHANGED_ID]}, False)), '未变化的文件被重新读取')
+
+        print("[3] .file-commits.json 更新后完整同步")
+        write_commits(data_dir, '2024-01-02T00:00:00Z')
+        sync(title_watcher, Changes(set(), True))
+        title = output_title(output_dir, CHANGED_ID)
+        check(title == CHANGED_TITLE, f"完整同步后的标题不正确: {title}")
+    finally:
+        title_watcher.catalog.close()
+
+
+def main():
+    with tempfile.TemporaryDirectory(prefix='watch_titles_check_') as tmp:
+        try:
+            run_checks(Path(tmp))
+        except CheckFailed as e:
+            print(f"\n检查失败: {e}", file=sys.stderr)
+            sys.exit(1)
+    print("\n检查通过")
+
+
+if __name__ == '__main__':
+    main()
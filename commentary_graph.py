@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+注疏链关系图：注疏 → 注疏 → 经典
+
+build_sutra_zhushu_mapping 只把注疏匹配到经典或论著，子注疏（如
+「金光明经玄义拾遗记」）或者被匹配到经典，或者找不到来源，无法得到
+完整的注疏链。这里在其基础上再做一层：若注疏的来源名称以另一部注疏的
+标题开头，则以该注疏为上级，否则沿用经典匹配的结果。
+
+每部经书的上级链（ancestors）、最终所注的经典（root）、任意层的下级注疏
+（descendants）都预先算好，前端和后端 text_relations 查询时不需要递归。
+解析上级链时使用记忆化，遇到环（理论上不应出现）时标记 cycle 并停止。
+
+链的顶端若是一部没有匹配到经典的注疏（如只有「金光明经玄义」和其
+「拾遗记」、语料中没有「金光明经」），不知道最终所注的经典：
+链上各部注疏（包括顶端的注疏本身）标记 unresolved，root 和 depth 为 None。
+"""
+
+from collections import defaultdict
+
+from title_normalizer import title_forms
+
+# 作为上级注疏标题的最短长度，避免过短的标题误匹配
+MIN_PARENT_TITLE = 3
+
+
+def find_commentary_parents(all_books, zhushu_mapping):
+    """
+    确定每部注疏的直接上级
+
+    zhushu_mapping: build_sutra_zhushu_mapping 的结果（注疏 → 经典/论著）
+    返回: {注疏ID: 上级ID}
+    """
+    # 同名注疏取 ID 最小的一部
+    zhushu_titles = {}
+    for book in all_books:
+        if book['text_type'] == 'zhushu':
+            zhushu_titles.setdefault(book['title'], book['id'])
+
+    parents = {}
+    for source_id, data in zhushu_mapping.items():
+        for zhushu in data['zhushus']:
+            parents[zhushu['id']] = source_id
+
+    for book in all_books:
+        if book['text_type'] != 'zhushu':
+            continue
+        source = title_forms(book['title'], 'zhushu').source
+        if not source:
+            continue
+        # 来源名称最长的、属于另一部注疏的前缀
+        for end in range(len(source), MIN_PARENT_TITLE - 1, -1):
+            parent_id = zhushu_titles.get(source[:end])
+            if parent_id is not None and source[:end] != book['title'] and parent_id != book['id']:
+                parents[book['id']] = parent_id
+                break
+    return parents
+
+
+class CommentaryGraph:
+    """注疏链关系图及其预先计算的传递闭包"""
+
+    def __init__(self, parents, titles=None, suffixes=None, text_types=None):
+        self.parents = parents
+        self.titles = titles or {}
+        self.suffixes = suffixes or {}
+        # 用于判断链的顶端是否为未匹配到经典的注疏
+        self.text_types = text_types or {}
+        self.ancestors = {}
+        self.cycles = []
+        self._in_cycle = set()
+        self._resolve()
+
+        self.descendants = defaultdict(list)
+        for node in sorted(self.ancestors):
+            for ancestor in self.ancestors[node]:
+                self.descendants[ancestor].append(node)
+
+    def _resolve(self):
+        """计算每个节点的上级链（由近到远），记忆化，检测环"""
+        parents = self.parents
+        ancestors = self.ancestors
+        for start in sorted(parents):
+            if start in ancestors:
+                continue
+            path = []
+            position = {}
+            node = start
+            while node in parents and node not in ancestors and node not in position:
+                position[node] = len(path)
+                path.append(node)
+                node = parents[node]
+
+            if node in position:
+                # 环上每个节点的上级链依次经过其余节点
+                cycle = path[position[node]:]
+                self.cycles.append(sorted(cycle))
+                self._in_cycle.update(cycle)
+                for i, member in enumerate(cycle):
+                    ancestors[member] = cycle[i + 1:] + cycle[:i]
+                path = path[:position[node]]
+
+            # node 是链的终点：经典（无上级）、已解析的节点或环的入口
+            chain = ancestors.get(node, [])
+            for member in reversed(path):
+                chain = [parents[member]] + chain
+                ancestors[member] = chain
+
+    def unresolved(self, text_id):
+        """链的顶端是没有上级的注疏（未匹配到经典）时为 True，包括该注疏本身"""
+        chain = self.ancestors.get(text_id)
+        top = chain[-1] if chain else text_id
+        return self.text_types.get(top) == 'zhushu' and top not in self.parents
+
+    def root(self, text_id):
+        """注疏最终所注的经典/论著；不是注疏、在环上或 unresolved 时返回 None"""
+        chain = self.ancestors.get(text_id)
+        if not chain or text_id in self._in_cycle or chain[-1] in self._in_cycle:
+            return None
+        if self.unresolved(text_id):
+            return None
+        return chain[-1]
+
+    def records(self):
+        """
+        每部相关经书一条记录（键为经书 ID）:
+            {'title', 'suffix', 'parent', 'root', 'depth', 'ancestors', 'descendants'
+             [, 'cycle'][, 'unresolved']}
+        depth 为到所注经典的层数，经典本身为 0；unresolved 时 root 和 depth 为 None
+        """
+        records = {}
+        for text_id in sorted(set(self.ancestors) | set(self.descendants)):
+            chain = self.ancestors.get(text_id, [])
+            unresolved = self.unresolved(text_id)
+            record = {
+                'title': self.titles.get(text_id, ''),
+                'suffix': self.suffixes.get(text_id) or '',
+                'parent': self.parents.get(text_id),
+                'root': self.root(text_id) if chain else None,
+                'depth': None if unresolved else len(chain),
+                'ancestors': chain,
+                'descendants': self.descendants.get(text_id, []),
+            }
+            if text_id in self._in_cycle:
+                record['cycle'] = True
+            if unresolved:
+                record['unresolved'] = True
+            records[text_id] = record
+        return records
+
+    def closure_pairs(self):
+        """传递闭包: [(上级ID, 下级ID, 层距), ...]，按 (上级, 下级) 排序"""
+        pairs = []
+        for node, chain in self.ancestors.items():
+            for distance, ancestor in enumerate(chain, 1):
+                pairs.append((ancestor, node, distance))
+        pairs.sort()
+        return pairs
+
+
+def build_commentary_graph(all_books, zhushu_mapping):
+    """由经书列表和注疏映射构建 CommentaryGraph"""
+    parents = find_commentary_parents(all_books, zhushu_mapping)
+    nodes = set(parents) | set(parents.values())
+    titles = {}
+    suffixes = {}
+    text_types = {}
+    for book in all_books:
+        if book['id'] in nodes:
+            titles.setdefault(book['id'], book['title'])
+            suffixes.setdefault(book['id'], book['suffix'])
+            text_types.setdefault(book['id'], book['text_type'])
+    return CommentaryGraph(parents, titles, suffixes, text_types)
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基于正文内容的同经异译/近似重复检测（MinHash + LSH）
+
+build_translation_groups 只按标准化标题分组，标题不同的异译本会被漏掉，
+标题很短的不同经书又可能被误并。这里逐个文件读取正文，对去掉标点、
+注释和异读后的汉字做字符 shingle，计算 MinHash 签名，再用 LSH 分桶
+找出候选对并估计 Jaccard 相似度，不需要两两比较全部文本。
+
+每个文件只在工作进程中短暂展开，主进程只保留每部经的签名
+（默认 128 × 4 字节），内存与语料总字数无关。
+
+依赖 numpy（可选依赖，只有使用本模块时才需要安装）。
+"""
+
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+from corpus_io import prefetch, read_corpus_bytes
+from corpus_scan import DEFAULT_CHUNK_FILES, _make_chunks, list_corpus_files
+
+try:
+    import numpy as np
+except ImportError:  # 可选依赖
+    np = None
+
+# 签名长度（哈希函数个数）
+DEFAULT_NUM_PERM = 128
+
+# shingle 长度（字）
+DEFAULT_SHINGLE = 3
+
+# 默认 Jaccard 阈值
+DEFAULT_THRESHOLD = 0.3
+
+# 超过此大小的 LSH 桶视为套语/公共段落，不展开为候选对
+MAX_BUCKET_SIZE = 200
+
+# 每次与全部哈希函数相乘的 shingle 数，限制临时矩阵的内存
+HASH_BLOCK = 8192
+
+# 不计入正文的标签，与 backend/src/embedding/extract-text.ts 一致
+SKIP_TAGS = {
+    'lb', 'pb', 'milestone', 'anchor', '#comment', 'note', 'foreign',
+    't', 'tt', 'rdg', 'a', 'ref', 'g',
+}
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# 单个文件的签名结果
+SignatureResult = namedtuple('SignatureResult', ['path', 'id', 'signature', 'chars', 'error'])
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError('正文相似度需要 numpy: pip install numpy')
+
+
+def body_text(body):
+    """提取正文中的纯文本（跳过注释、异读、行号等），返回字符串"""
+    parts = []
+    stack = [body]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            parts.append(node)
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+        elif isinstance(node, dict):
+            tag = node.get('tag')
+            if tag in SKIP_TAGS:
+                continue
+            children = node.get('children') or []
+            if tag == 'app':
+                # 只保留 lem（校勘正文）
+                children = [c for c in children if isinstance(c, dict) and c.get('tag') == 'lem'][:1]
+            stack.extend(reversed(children))
+    return ''.join(parts)
+
+
+def _han_codes(text):
+    """文本中的汉字码位数组（去掉标点、空白、拉丁字母等）"""
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    keep = (((codes >= 0x3400) & (codes <= 0x9FFF))
+            | ((codes >= 0xF900) & (codes <= 0xFAFF))
+            | (codes >= 0x20000))
+    return codes[keep]
+
+
+class MinHasher:
+    """字符 shingle 的 MinHash 签名计算器，同样参数的实例结果完全相同"""
+
+    def __init__(self, num_perm=DEFAULT_NUM_PERM, shingle=DEFAULT_SHINGLE, seed=1):
+        _require_numpy()
+        self.num_perm = num_perm
+        self.shingle = shingle
+        self.seed = seed
+        rng = np.random.RandomState(seed)
+        # h(x) = (a*x + b) mod p，a、b < 2^32 保证乘积不溢出 64 位
+        self.a = rng.randint(1, _MAX_HASH, size=(num_perm, 1), dtype=np.uint64)
+        self.b = rng.randint(0, _MAX_HASH, size=(num_perm, 1), dtype=np.uint64)
+
+    def shingles(self, text):
+        """文本的 shingle 哈希（32 位，去重）"""
+        codes = _han_codes(text).astype(np.uint64)
+        k = self.shingle
+        if len(codes) < k:
+            return np.empty(0, dtype=np.uint64)
+        n = len(codes) - k + 1
+        h = np.zeros(n, dtype=np.uint64)
+        with np.errstate(over='ignore'):
+            # 多项式滚动哈希（mod 2^64），再用乘法散列压到 32 位
+            for i in range(k):
+                h = h * np.uint64(0x100000001B3) + codes[i:i + n]
+            h = (h * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(32)
+        return np.unique(h)
+
+    def signature(self, text):
+        """文本的 MinHash 签名（uint32 数组）；没有 shingle 时返回 None"""
+        hashes = self.shingles(text)
+        if not len(hashes):
+            return None
+        sig = np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        prime = np.uint64(_MERSENNE_PRIME)
+        for i in range(0, len(hashes), HASH_BLOCK):
+            block = hashes[i:i + HASH_BLOCK][np.newaxis, :]
+            with np.errstate(over='ignore'):
+                values = ((self.a * block + self.b) % prime) & np.uint64(_MAX_HASH)
+            np.minimum(sig, values.min(axis=1), out=sig)
+        return sig.astype(np.uint32)
+
+
+def estimate_jaccard(sig_a, sig_b):
+    """由两个签名估计 Jaccard 相似度"""
+    return float(np.count_nonzero(sig_a == sig_b)) / len(sig_a)
+
+
+def _integrate(func, lo, hi, steps=100):
+    """梯形法数值积分"""
+    width = (hi - lo) / steps
+    total = (func(lo) + func(hi)) / 2 + sum(func(lo + i * width) for i in range(1, steps))
+    return total * width
+
+
+def lsh_params(num_perm, threshold, false_negative_weight=0.7):
+    """
+    选择 (bands, rows)，使误报与漏报概率面积的加权和最小（bands × rows ≤ num_perm）
+
+    候选对随后还会按估计的 Jaccard 过滤，漏报无法补救而误报只多一次比较，
+    所以默认更看重漏报。
+    """
+    best = None
+    for bands in range(1, num_perm + 1):
+        for rows in range(1, num_perm // bands + 1):
+            def hit(s):
+                return 1 - (1 - s ** rows) ** bands
+            false_pos = _integrate(hit, 0.0, threshold)
+            false_neg = _integrate(lambda s: 1 - hit(s), threshold, 1.0)
+            error = (1 - false_negative_weight) * false_pos + false_negative_weight * false_neg
+            if best is None or error < best[0]:
+                best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class LSHIndex:
+    """MinHash 签名的 LSH 分桶索引，可以逐个加入签名"""
+
+    def __init__(self, num_perm=DEFAULT_NUM_PERM, threshold=DEFAULT_THRESHOLD,
+                 max_bucket=MAX_BUCKET_SIZE):
+        self.num_perm = num_perm
+        self.bands, self.rows = lsh_params(num_perm, threshold)
+        self.max_bucket = max_bucket
+        self.keys = []
+        self.signatures = []
+        self.buckets = [{} for _ in range(self.bands)]
+
+    def add(self, key, signature):
+        index = len(self.keys)
+        self.keys.append(key)
+        self.signatures.append(signature)
+        rows = self.rows
+        for band, buckets in enumerate(self.buckets):
+            bucket_key = signature[band * rows:(band + 1) * rows].tobytes()
+            buckets.setdefault(bucket_key, []).append(index)
+
+    def candidate_pairs(self):
+        """至少在一个 band 中落入同一桶的 (i, j) 对，i < j"""
+        pairs = set()
+        for buckets in self.buckets:
+            for members in buckets.values():
+                if 1 < len(members) <= self.max_bucket:
+                    pairs.update(combinations(members, 2))
+        return pairs
+
+    def similar_pairs(self, threshold=DEFAULT_THRESHOLD):
+        """
+        估计 Jaccard 不低于 threshold 的候选对
+        返回: [(key_a, key_b, jaccard), ...]，按 (key_a, key_b) 排序
+        """
+        result = []
+        for i, j in self.candidate_pairs():
+            score = estimate_jaccard(self.signatures[i], self.signatures[j])
+            if score >= threshold:
+                a, b = sorted((self.keys[i], self.keys[j]))
+                result.append((a, b, round(score, 4)))
+        result.sort()
+        return result
+
+
+def text_signature(json_path, hasher, prefetched=None):
+    """读取单个文件并计算签名，返回 SignatureResult"""
+    try:
+        data = json.loads(read_corpus_bytes(json_path, prefetched))
+        text = body_text(data.get('body', []))
+        return SignatureResult(json_path, data.get('id', ''), hasher.signature(text), len(text), None)
+    except Exception as e:
+        return SignatureResult(json_path, '', None, 0, f"{type(e).__name__}: {e}")
+
+
+def _signature_chunk(args):
+    paths, num_perm, shingle, seed = args
+    hasher = MinHasher(num_perm, shingle, seed)
+    # 正文需要完整读取，预读整个文件
+    return [text_signature(path, hasher, prefetched) for path, prefetched in prefetch(paths)]
+
+
+def iter_signatures(canon_files, workers=1, num_perm=DEFAULT_NUM_PERM, shingle=DEFAULT_SHINGLE,
+                    seed=1, chunk_files=DEFAULT_CHUNK_FILES):
+    """逐个产生文件的 SignatureResult，顺序与输入一致"""
+    _require_numpy()
+    if not workers:
+        workers = os.cpu_count() or 1
+
+    tasks = [(chunk, num_perm, shingle, seed) for chunk in _make_chunks(canon_files, chunk_files)]
+    if workers == 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield from _signature_chunk(task)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for results in executor.map(_signature_chunk, tasks):
+            yield from results
+
+
+def find_similar_texts(data_dir, threshold=DEFAULT_THRESHOLD, workers=1, ids=None,
+                       num_perm=DEFAULT_NUM_PERM, shingle=DEFAULT_SHINGLE):
+    """
+    找出正文相似的经书对
+
+    ids: 可选，只比较这些经书 ID
+    返回: (pairs, errors)
+        pairs:  [{'a': 'T08n0235', 'b': 'T08n0236', 'jaccard': 0.42}, ...]
+        errors: [{'path': '...', 'error': '...'}, ...]
+    """
+    index = LSHIndex(num_perm, threshold)
+    errors = []
+    seen = set()
+    for result in iter_signatures(list_corpus_files(data_dir), workers, num_perm, shingle):
+        if result.error is not None:
+            errors.append({'path': result.path, 'error': result.error})
+            continue
+        if result.signature is None or (ids is not None and result.id not in ids):
+            continue
+        if result.id in seen:
+            # 同一 ID 出现在多个文件中时只取第一个
+            continue
+        seen.add(result.id)
+        index.add(result.id, result.signature)
+
+    pairs = [{'a': a, 'b': b, 'jaccard': score} for a, b, score in index.similar_pairs(threshold)]
+    errors.sort(key=lambda x: x['path'])
+    return pairs, errors
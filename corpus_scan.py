@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+语料库标题扫描：支持多进程并行，结果按经书 ID 排序
+
+无论串行还是并行、无论哪个进程先完成，输出顺序都相同；
+单个文件的读取失败会被收集起来返回，而不是打印后丢弃。
+每个进程内由后台线程预读后续文件的开头（见 corpus_io.prefetch），
+I/O 等待与解析重叠。
+"""
+
+import errno
+import os
+import time
+from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+from corpus_io import (DEFAULT_PREFETCH_DEPTH, corpus_suffix, is_archive, json_name, member_path,
+                       open_archive, prefetch)
+from header_reader import DEFAULT_CHUNK_SIZE, read_header
+from tei_header import XML_SUFFIX, read_tei_header
+
+# 每个任务包含的文件数
+DEFAULT_CHUNK_FILES = 64
+
+# 网络存储上的临时性读取错误，重试的次数
+READ_RETRIES = 2
+TRANSIENT_ERRNOS = {errno.EIO, errno.EAGAIN, errno.EINTR, errno.ETIMEDOUT, errno.ESTALE}
+
+# 单个文件的扫描结果
+ScanResult = namedtuple('ScanResult', [
+    'path',        # 文件路径
+    'info',        # 标题信息，失败时为 None
+    'error',       # 错误描述，成功时为 None
+    'elapsed',     # 耗时（秒，含重试）
+    'bytes_read',  # 读取的字节数
+    'retries',     # 重试次数
+    'fallback',    # 是否回退到完整解析
+])
+
+
+def read_title_info(json_path, stats=None, prefetched=None):
+    """读取单个文件（JSON 或 TEI XML）的标题信息，失败时抛出异常"""
+    if str(json_path).endswith(XML_SUFFIX):
+        data = read_tei_header(json_path, stats=stats, prefetched=prefetched)
+    else:
+        data = read_header(json_path, stats=stats, prefetched=prefetched)
+    header = data.get('header', {})
+    return {
+        'id': data.get('id', ''),
+        'title': header.get('title', ''),
+        'author': header.get('author', ''),
+        'source': header.get('source', '')
+    }
+
+
+def list_corpus_files(data_dir, canons=None):
+    """
+    列出语料库中的所有 JSON 文件（含 .json.gz、.json.zst），按藏经目录（T/、X/、J/ ...）分组
+    data_dir 也可以是 .cbpack 归档，此时列出的是归档成员路径；
+    目录中没有 JSON 文件时列出 TEI XML 文件（CBETA 原始发布，见 tei_header.py）
+    canons: 可选，只列出这些藏经目录
+    返回: {'T': [Path, ...], 'X': [...], ...}，组内按路径排序
+    """
+    if is_archive(data_dir):
+        canon_files = _list_archive_files(data_dir)
+    else:
+        canon_files = _list_dir_files(data_dir)
+    if canons is not None:
+        canon_files = {canon: files for canon, files in canon_files.items() if canon in canons}
+    return canon_files
+
+
+def _list_dir_files(data_dir):
+    """列出目录中的语料文件，组内按路径排序"""
+    data_dir = Path(data_dir)
+    found = {}
+    xml_files = {}
+    for json_file in data_dir.rglob('*.*'):
+        suffix = corpus_suffix(json_file.name)
+        if suffix is None and not json_file.name.endswith(XML_SUFFIX):
+            continue
+        rel = json_file.relative_to(data_dir)
+        # 跳过 .file-commits.json 等隐藏文件
+        if any(part.startswith('.') for part in rel.parts):
+            continue
+        if suffix is None:
+            xml_files[rel.as_posix()] = json_file
+            continue
+        # 同一文件同时有压缩和未压缩版本时，只读取未压缩的
+        key = json_name(rel.as_posix())
+        if key in found and suffix != '.json':
+            continue
+        found[key] = json_file
+    if not found:
+        found = xml_files
+
+    canon_files = defaultdict(list)
+    for json_file in found.values():
+        rel = json_file.relative_to(data_dir)
+        canon = rel.parts[0] if len(rel.parts) > 1 else ''
+        canon_files[canon].append(json_file)
+
+    return {canon: sorted(files) for canon, files in sorted(canon_files.items())}
+
+
+def _list_archive_files(archive_path):
+    """列出归档成员，组内按存放顺序（即路径顺序）排列"""
+    canon_files = defaultdict(list)
+    for name in open_archive(archive_path).names():
+        parts = name.split('/')
+        if any(part.startswith('.') for part in parts):
+            continue
+        canon = parts[0] if len(parts) > 1 else ''
+        canon_files[canon].append(member_path(archive_path, name))
+    return {canon: files for canon, files in sorted(canon_files.items())}
+
+
+def scan_file(path, prefetched=None):
+    """
+    扫描单个文件，返回 ScanResult；临时性 I/O 错误会重试
+    prefetched: 可选，预先读取的文件开头，只在第一次尝试时使用
+    """
+    start = time.perf_counter()
+    retries = 0
+    while True:
+        stats = {}
+        try:
+            info, error = read_title_info(path, stats, prefetched), None
+        except OSError as e:
+            if e.errno in TRANSIENT_ERRNOS and retries < READ_RETRIES:
+                retries += 1
+                prefetched = None
+                continue
+            info, error = None, f"{type(e).__name__}: {e}"
+        except Exception as e:
+            info, error = None, f"{type(e).__name__}: {e}"
+        break
+    return ScanResult(path, info, error, time.perf_counter() - start,
+                      stats.get('bytes_read', 0), retries, stats.get('fallback', False))
+
+
+def _scan_chunk(paths, prefetch_depth=0):
+    """扫描一组文件，返回 [ScanResult, ...]；prefetch_depth > 0 时在后台预读"""
+    if prefetch_depth <= 0:
+        return [scan_file(path) for path in paths]
+    return [scan_file(path, prefetched)
+            for path, prefetched in prefetch(paths, DEFAULT_CHUNK_SIZE, prefetch_depth)]
+
+
+def _make_chunks(canon_files, chunk_files):
+    """按藏经目录切分任务，同一任务内的文件都来自同一目录"""
+    chunks = []
+    for files in canon_files.values():
+        for i in range(0, len(files), chunk_files):
+            chunks.append([str(p) for p in files[i:i + chunk_files]])
+    return chunks
+
+
+def scan_files(canon_files, workers=1, chunk_files=DEFAULT_CHUNK_FILES, observer=None,
+               prefetch_depth=DEFAULT_PREFETCH_DEPTH):
+    """
+    扫描按藏经目录分组的文件列表
+
+    observer: 可选回调，在主进程中对每个 ScanResult 调用一次（用于统计）
+    prefetch_depth: 每个进程同时预读的文件数，0 表示不预读
+    返回: [ScanResult, ...]，顺序与输入一致
+    """
+    if not workers:
+        workers = os.cpu_count() or 1
+
+    chunks = _make_chunks(canon_files, chunk_files)
+    scan_chunk = partial(_scan_chunk, prefetch_depth=prefetch_depth)
+
+    if workers == 1 or len(chunks) <= 1:
+        rows = [row for result in map(scan_chunk, chunks) for row in result]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            rows = [row for result in executor.map(scan_chunk, chunks) for row in result]
+
+    if observer is not None:
+        for row in rows:
+            observer(row)
+    return rows
+
+
+def split_scan_results(rows):
+    """
+    将扫描结果拆分为经书列表和错误列表
+
+    返回: (books, errors)
+        books:  按 (id, 路径) 排序的标题信息列表
+        errors: [{'path': '...', 'error': '...'}, ...]，按路径排序
+    """
+    books = []
+    errors = []
+    for row in rows:
+        if row.error is not None:
+            errors.append({'path': row.path, 'error': row.error})
+        else:
+            books.append((row.info['id'], row.path, row.info))
+
+    books.sort(key=lambda x: (x[0], x[1]))
+    errors.sort(key=lambda x: x['path'])
+    return [info for _, _, info in books], errors
+
+
+def scan_corpus(data_dir, workers=1, chunk_files=DEFAULT_CHUNK_FILES, observer=None,
+                prefetch_depth=DEFAULT_PREFETCH_DEPTH):
+    """
+    扫描语料库中所有文件的标题信息
+
+    workers: 进程数，1 表示串行，0 或 None 表示使用全部 CPU
+    返回: (books, errors)，见 split_scan_results
+    """
+    rows = scan_files(list_corpus_files(data_dir), workers, chunk_files, observer, prefetch_depth)
+    return split_scan_results(rows)
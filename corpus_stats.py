@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+语料库统计：重新生成 docs/data-design.md 1.1 / 1.2 中的数字
+
+每个文件的正文只读取、遍历一次，得到该文件的计数；各文件的计数是
+{分类: {键: 数量}}，按任意顺序相加合并，结果都相同。主进程按完成顺序
+逐块合并，不保留各文件的正文，内存只与最大的单个文件有关。
+
+每个文件的计数按指纹（与 header_catalog 相同：commit 记录，或大小 + mtime）
+缓存在 SQLite 中，再次运行时只重新统计新增和变化的文件。
+
+统计的分类:
+    totals       文件数、字符数、中文字符数、段落/行/页标记、特殊字符、陀罗尼等
+    canons       各藏经的文件数          canon_chars  各藏经的中文字符数
+    dynasties    作者字段中的朝代/地域（每个文件计一次）
+    authors      不同的作者字段
+    tags         各元素的出现次数
+    p_types / note_types / lg_types / byline_types / mulu_types / langs
+                 段落、注释、偈颂、署名、目录的类型和语言属性
+
+用法:
+    python corpus_stats.py --data-dir data-simplified -j 8
+    python corpus_stats.py --markdown stats.md --update-doc docs/data-design.md
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+from author_parser import parse_author
+from corpus_io import DEFAULT_PREFETCH_DEPTH, corpus_rel_path, prefetch, read_corpus_bytes
+from corpus_scan import DEFAULT_CHUNK_FILES, list_corpus_files
+from header_catalog import file_fingerprint, load_file_commits
+from output_writers import atomic_open
+from title_pipeline import DEFAULT_DATA_DIR, DEFAULT_OUTPUT_DIR, REPO_ROOT
+
+STATS_FILE = 'corpus_stats.json'
+CACHE_FILE = '.corpus-stats.sqlite'
+DEFAULT_DOC = REPO_ROOT / 'docs' / 'data-design.md'
+
+# 每个文件计数的版本，统计规则变化时递增，旧缓存随之失效
+STATS_VERSION = 1
+
+# 汉字（与 content_similarity._han_codes 的范围相同）
+_HAN = re.compile('[\u3400-\u9fff\uf900-\ufaff\U00020000-\U0010ffff]+')
+
+# 按元素的哪个属性统计类型：标签 → (分类, 属性名, 属性缺失时的键)
+_TYPED_TAGS = {
+    'p': ('p_types', 'cb:type', None),
+    'note': ('note_types', 'type', None),
+    'lg': ('lg_types', 'type', 'regular'),
+    'byline': ('byline_types', 'cb:type', None),
+    'mulu': ('mulu_types', 'type', '其他'),
+}
+
+DHARANI_TYPES = {'dharani', 'mantra'}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_stats (
+    path TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    stats TEXT NOT NULL
+)
+"""
+
+
+def _is_dharani(node, attrs):
+    """与 extract-metadata.ts 的 hasDharani 相同的判断"""
+    if attrs.get('cb:type') in DHARANI_TYPES:
+        return True
+    return node.get('tag') == 'div' and attrs.get('type') in DHARANI_TYPES
+
+
+def count_document(data, canon):
+    """统计一个已解析的 JSON 文档，返回 {分类: Counter}"""
+    stats = defaultdict(Counter)
+    totals = stats['totals']
+    tags = stats['tags']
+    chars = cjk = dharani = 0
+
+    stack = [data.get('body', [])]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            chars += len(node)
+            cjk += sum(map(len, _HAN.findall(node)))
+        elif isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, dict):
+            tag = node.get('tag')
+            attrs = node.get('attrs') or {}
+            tags[tag] += 1
+            typed = _TYPED_TAGS.get(tag)
+            if typed is not None:
+                section, attr, default = typed
+                value = attrs.get(attr, default)
+                if value:
+                    stats[section][value] += 1
+            if 'lang' in attrs:
+                stats['langs'][attrs['lang']] += 1
+            if _is_dharani(node, attrs):
+                dharani += 1
+            stack.extend(node.get('children') or [])
+
+    totals['files'] = 1
+    totals['chars'] = chars
+    totals['cjk_chars'] = cjk
+    totals['paragraphs'] = tags['p']
+    totals['line_breaks'] = tags['lb']
+    totals['page_breaks'] = tags['pb']
+    totals['gaiji'] = tags['g']
+    totals['dharani'] = dharani
+    totals['dharani_files'] = 1 if dharani else 0
+    stats['canons'][canon] = 1
+    stats['canon_chars'][canon] = cjk
+
+    author = (data.get('header') or {}).get('author') or ''
+    if author:
+        stats['authors'][author] = 1
+        places = {person.dynasty or person.nationality for person in parse_author(author)}
+        for place in places - {None}:
+            stats['dynasties'][place] += 1
+    return stats
+
+
+def merge_stats(total, part):
+    """把 part 加到 total 上（原地修改并返回 total）；加法满足结合律和交换律"""
+    for section, counter in part.items():
+        total.setdefault(section, Counter()).update(counter)
+    return total
+
+
+def count_file(path, canon, prefetched=None):
+    """读取并统计单个文件，返回 (path, stats, error)"""
+    try:
+        data = json.loads(read_corpus_bytes(path, prefetched))
+        return path, count_document(data, canon), None
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+
+
+def _count_chunk(task, prefetch_depth=0):
+    canon, paths = task
+    if prefetch_depth <= 0:
+        return [count_file(path, canon) for path in paths]
+    # 正文需要完整读取，预读整个文件
+    return [count_file(path, canon, prefetched)
+            for path, prefetched in prefetch(paths, depth=prefetch_depth)]
+
+
+def iter_file_stats(canon_files, workers=1, chunk_files=DEFAULT_CHUNK_FILES,
+                    prefetch_depth=DEFAULT_PREFETCH_DEPTH):
+    """逐块产生 [(path, stats, error), ...]，顺序与输入一致"""
+    if not workers:
+        workers = os.cpu_count() or 1
+
+    tasks = [(canon, [str(p) for p in files[i:i + chunk_files]])
+             for canon, files in canon_files.items()
+             for i in range(0, len(files), chunk_files)]
+    count_chunk = partial(_count_chunk, prefetch_depth=prefetch_depth)
+    if workers == 1 or len(tasks) <= 1:
+        yield from map(count_chunk, tasks)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(count_chunk, tasks)
+
+
+class StatsCache:
+    """每个文件的计数，按文件指纹缓存"""
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.execute(_SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def known(self):
+        return dict(self.conn.execute('SELECT path, fingerprint FROM file_stats'))
+
+    def cached(self, rel_paths):
+        """逐个产生 rel_paths 中各文件缓存的计数"""
+        rel_paths = set(rel_paths)
+        for rel_path, stats in self.conn.execute('SELECT path, stats FROM file_stats'):
+            if rel_path in rel_paths:
+                yield {section: Counter(counter) for section, counter in json.loads(stats).items()}
+
+    def store(self, rows):
+        """rows: [(相对路径, 指纹, 计数), ...]"""
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO file_stats VALUES (?, ?, ?)',
+                [(rel_path, fingerprint, json.dumps(stats, ensure_ascii=False))
+                 for rel_path, fingerprint, stats in rows])
+
+    def remove(self, rel_paths):
+        with self.conn:
+            self.conn.executemany('DELETE FROM file_stats WHERE path = ?', [(p,) for p in rel_paths])
+
+
+def collect_stats(data_dir, cache_path=None, workers=1, prefetch_depth=DEFAULT_PREFETCH_DEPTH):
+    """
+    统计整个语料库
+
+    指定 cache_path 时只重新统计新增和变化的文件
+    返回: (stats, errors, counts)
+        stats:  {分类: Counter}
+        errors: 读取失败的文件，按路径排序
+        counts: {'counted': n, 'cached': n, 'deleted': n}
+    """
+    canon_files = list_corpus_files(data_dir)
+    total = {}
+    errors = []
+    counts = {'counted': 0, 'cached': 0, 'deleted': 0}
+
+    if cache_path is None:
+        for results in iter_file_stats(canon_files, workers, prefetch_depth=prefetch_depth):
+            for path, stats, error in results:
+                if error is not None:
+                    errors.append({'path': path, 'error': error})
+                else:
+                    merge_stats(total, stats)
+                    counts['counted'] += 1
+        errors.sort(key=lambda x: x['path'])
+        return total, errors, counts
+
+    commit_fingerprints = load_file_commits(data_dir)
+    with StatsCache(cache_path) as cache:
+        known = cache.known()
+        current = {}
+        pending = defaultdict(list)
+        unchanged = []
+        for canon, files in canon_files.items():
+            for path in files:
+                rel_path = corpus_rel_path(path, data_dir)
+                # 统计规则的版本也计入指纹
+                fingerprint = f"v{STATS_VERSION}:{file_fingerprint(path, commit_fingerprints, rel_path)}"
+                current[rel_path] = fingerprint
+                if known.get(rel_path) == fingerprint:
+                    unchanged.append(rel_path)
+                else:
+                    pending[canon].append(path)
+
+        deleted = [rel_path for rel_path in known if rel_path not in current]
+        cache.remove(deleted)
+        counts['deleted'] = len(deleted)
+
+        for stats in cache.cached(unchanged):
+            merge_stats(total, stats)
+            counts['cached'] += 1
+
+        for results in iter_file_stats(pending, workers, prefetch_depth=prefetch_depth):
+            rows = []
+            for path, stats, error in results:
+                rel_path = corpus_rel_path(path, data_dir)
+                if error is not None:
+                    errors.append({'path': path, 'error': error})
+                    continue
+                merge_stats(total, stats)
+                rows.append((rel_path, current[rel_path], stats))
+                counts['counted'] += 1
+            # 读取失败的文件不写入缓存，下次重新统计
+            cache.remove([corpus_rel_path(path, data_dir) for path, stats, _ in results if stats is None])
+            cache.store(rows)
+
+    errors.sort(key=lambda x: x['path'])
+    return total, errors, counts
+
+
+def stats_summary(stats):
+    """整理为输出格式：totals 加上不同作者字段、藏经种类数，各分类按数量降序"""
+    totals = dict(stats.get('totals', Counter()))
+    totals['canons'] = len(stats.get('canons', ()))
+    totals['unique_authors'] = len(stats.get('authors', ()))
+    summary = {'totals': totals}
+    for section in sorted(stats):
+        if section in ('totals', 'authors'):
+            continue
+        summary[section] = dict(sorted(stats[section].items(), key=lambda kv: (-kv[1], str(kv[0]))))
+    return summary
+
+
+def write_stats(summary, path):
+    with atomic_open(path) as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+
+
+# ---- docs/data-design.md ----
+
+def _yi(n):
+    return f"{n / 1e8:.2f} 亿"
+
+
+# data-design.md 1.1 数据规模表：指标 → 数值
+DOC_METRICS = {
+    '藏经种类': lambda t: f"{t['canons']} 种",
+    'XML/JSON 文件数': lambda t: f"{t['files']:,} 个",
+    '大正藏文件数': lambda t: f"{t['taisho_files']:,} 个",
+    '总字符数': lambda t: _yi(t['chars']),
+    '中文字符数': lambda t: _yi(t['cjk_chars']),
+    '唯一作者字段': lambda t: f"{t['unique_authors']:,} 种",
+    '特殊字符引用': lambda t: f"{t['gaiji']:,} 处",
+    '段落 (p) 总数': lambda t: f"{t['paragraphs']:,} 个",
+    '行标记 (lb) 总数': lambda t: f"{t['line_breaks']:,} 个",
+    '页标记 (pb) 总数': lambda t: f"{t['page_breaks']:,} 个",
+    '含陀罗尼经典': lambda t: f"{t['dharani_files']:,} 个",
+    '陀罗尼标记': lambda t: f"{t['dharani']:,} 处",
+}
+
+# 生成的 Markdown 中的分布表：分类 → (标题, 键的列名)
+MARKDOWN_TABLES = [
+    ('canons', '藏经维度', '代码'),
+    ('canon_chars', '各藏经中文字符数', '代码'),
+    ('dynasties', '朝代/地域维度', '朝代'),
+    ('mulu_types', 'mulu 目录类型分布', '类型'),
+    ('lg_types', '偈颂类型 (lg)', '类型'),
+    ('note_types', '注释类型 (note)', '类型'),
+    ('byline_types', 'byline 署名类型', '类型'),
+    ('langs', '语言维度', '语言代码'),
+    ('p_types', '段落类型维度', 'cb:type'),
+    ('tags', '元素出现次数', '标签'),
+]
+
+
+def _doc_totals(summary):
+    totals = dict(summary['totals'])
+    totals['taisho_files'] = summary.get('canons', {}).get('T', 0)
+    return totals
+
+
+def markdown_tables(summary, limit=50):
+    """与 data-design.md 相同格式的统计表"""
+    totals = _doc_totals(summary)
+    lines = ['### 数据规模', '', '| 指标 | 数值 |', '|------|------|']
+    lines += [f"| {label} | {fmt(totals)} |" for label, fmt in DOC_METRICS.items()]
+    for section, title, key_name in MARKDOWN_TABLES:
+        counter = summary.get(section)
+        if not counter:
+            continue
+        lines += ['', f"#### {title} ({len(counter)}种)", '',
+                  f"| {key_name} | 出现次数 |", '|------|---------|']
+        for key, count in list(counter.items())[:limit]:
+            lines.append(f"| {key} | {count:,} |")
+    return '\n'.join(lines) + '\n'
+
+
+def update_design_doc(doc_path, summary):
+    """就地更新 data-design.md 中 1.1 数据规模表的数值，返回更新的行数"""
+    totals = _doc_totals(summary)
+    doc_path = Path(doc_path)
+    lines = doc_path.read_text(encoding='utf-8').split('\n')
+    updated = 0
+    for i, line in enumerate(lines):
+        cells = [cell.strip() for cell in line.strip().strip('|').split('|')]
+        if len(cells) != 2 or cells[0] not in DOC_METRICS:
+            continue
+        value = DOC_METRICS[cells[0]](totals)
+        if cells[1] != value:
+            lines[i] = f"| {cells[0]} | {value} |"
+            updated += 1
+    with atomic_open(doc_path) as f:
+        f.write('\n'.join(lines))
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description='语料库统计（重新生成 docs/data-design.md 中的数字）')
+    parser.add_argument('--data-dir', type=Path, default=DEFAULT_DATA_DIR, help='JSON 语料目录或 .cbpack 归档')
+    parser.add_argument('--output-dir', type=Path, default=DEFAULT_OUTPUT_DIR,
+                        help=f'统计结果目录，写出 {STATS_FILE}（默认 {DEFAULT_OUTPUT_DIR}）')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help='统计进程数，1 为串行，0 为使用全部 CPU（默认 1）')
+    parser.add_argument('--prefetch', type=int, default=DEFAULT_PREFETCH_DEPTH, metavar='N',
+                        help=f'每个进程同时预读的文件数，0 为不预读（默认 {DEFAULT_PREFETCH_DEPTH}）')
+    parser.add_argument('--cache', type=Path, default=None,
+                        help=f'每个文件计数的缓存（默认 输出目录/{CACHE_FILE}）')
+    parser.add_argument('--no-cache', action='store_true', help='不使用缓存，重新统计全部文件')
+    parser.add_argument('--markdown', type=Path, default=None, metavar='PATH', help='另写出 Markdown 统计表')
+    parser.add_argument('--update-doc', type=Path, nargs='?', const=DEFAULT_DOC, default=None, metavar='PATH',
+                        help=f'更新设计文档 1.1 数据规模表中的数值（默认 {DEFAULT_DOC}）')
+    args = parser.parse_args()
+
+    cache_path = None if args.no_cache else (args.cache or args.output_dir / CACHE_FILE)
+    stats, errors, counts = collect_stats(args.data_dir, cache_path, args.workers, args.prefetch)
+    print(f"重新统计 {counts['counted']} 个文件，使用缓存 {counts['cached']} 个，删除 {counts['deleted']} 个")
+    if errors:
+        print(f"读取失败 {len(errors)} 个文件:")
+        for err in errors:
+            print(f"  - {err['path']}: {err['error']}")
+
+    summary = stats_summary(stats)
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    stats_file = args.output_dir / STATS_FILE
+    write_stats(summary, stats_file)
+    print(f"统计结果已保存到: {stats_file}")
+
+    if args.markdown:
+        with atomic_open(args.markdown) as f:
+            f.write(markdown_tables(summary))
+        print(f"统计表已保存到: {args.markdown}")
+    if args.update_doc:
+        updated = update_design_doc(args.update_doc, summary)
+        print(f"已更新 {args.update_doc} 中的 {updated} 项")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+持久化的增量标题目录（SQLite）
+
+把每个文件提取出的 header 记录保存在本地 SQLite 文件中。
+每个文件的指纹取自 data-simplified/.file-commits.json 中记录的
+commit 和 processedAt；没有记录的文件使用 文件大小 + mtime。
+再次运行时只重新读取新增、变化的文件，并删除已不存在的文件。
+
+转换器只在一批文件转换完成后才写 .file-commits.json，转换过程中被改写的
+文件 commit 记录不变。所以 update()（监视模式收到变化的文件）在 commit
+记录之外还比较大小和 mtime，改写后的文件总会重新读取。
+"""
+
+import json
+import sqlite3
+from collections import defaultdict
+from pathlib import Path
+
+from corpus_io import (COMMITS_FILE, DEFAULT_PREFETCH_DEPTH, corpus_file_stat, corpus_rel_path, is_archive, json_name,
+                       member_path, open_archive, read_corpus_bytes)
+from corpus_scan import DEFAULT_CHUNK_FILES, list_corpus_files, scan_files, split_scan_results
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS headers (
+    path TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    author TEXT NOT NULL,
+    source TEXT NOT NULL
+)
+"""
+
+
+def load_file_commits(data_dir):
+    """
+    读取 .file-commits.json，返回 {JSON相对路径: 指纹}
+    记录中的键是 XML 相对路径（如 T/T01/T01n0001.xml）
+    data_dir 为归档时读取归档中的同名成员
+    """
+    try:
+        if is_archive(data_dir):
+            if COMMITS_FILE not in open_archive(data_dir):
+                return {}
+            records = json.loads(read_corpus_bytes(member_path(data_dir, COMMITS_FILE)))
+        else:
+            commits_file = Path(data_dir) / COMMITS_FILE
+            if not commits_file.exists():
+                return {}
+            with open(commits_file, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    fingerprints = {}
+    for rel_path, record in records.items():
+        commit = record.get('commit', '')
+        if not commit:
+            continue
+        json_rel = rel_path[:-4] + '.json' if rel_path.endswith('.xml') else rel_path
+        # processedAt 随重新转换而变化，可以识别转换器升级导致的重写
+        fingerprints[json_rel] = f"commit:{commit}@{record.get('processedAt', '')}"
+    return fingerprints
+
+
+def file_fingerprint(path, commit_fingerprints, rel_path, with_stat=False):
+    """
+    计算文件指纹：优先使用 commit 记录，否则使用大小和修改时间
+    压缩文件按去掉压缩后缀的 .json 路径查找 commit 记录
+    with_stat: 有 commit 记录时也附加大小和修改时间，用于已知被改写的文件
+    """
+    fingerprint = commit_fingerprints.get(json_name(rel_path))
+    if fingerprint and not with_stat:
+        return fingerprint
+    size, mtime_ns = corpus_file_stat(path)
+    stat = f"stat:{size}:{mtime_ns}"
+    return f"{fingerprint}|{stat}" if fingerprint else stat
+
+
+class HeaderCatalog:
+    """标题信息目录，按文件指纹增量更新"""
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.execute(_SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def refresh(self, data_dir, workers=1, chunk_files=DEFAULT_CHUNK_FILES, observer=None,
+                prefetch_depth=DEFAULT_PREFETCH_DEPTH):
+        """
+        与语料库同步：只重新读取新增和变化的文件，删除已不存在的文件
+
+        返回: (errors, stats)
+            errors: 本次读取失败的文件（不写入目录，下次会重试）
+            stats:  {'added': n, 'changed': n, 'deleted': n, 'unchanged': n}
+        """
+        commit_fingerprints = load_file_commits(data_dir)
+        known = dict(self.conn.execute('SELECT path, fingerprint FROM headers'))
+
+        current, pending, stats = self._compare(
+            data_dir, list_corpus_files(data_dir), known, commit_fingerprints)
+        deleted = [rel_path for rel_path in known if rel_path not in current]
+        stats['deleted'] = len(deleted)
+
+        errors = self._apply(data_dir, pending, deleted, current,
+                             workers, chunk_files, observer, prefetch_depth)
+        return errors, stats
+
+    def update(self, data_dir, paths, workers=1, chunk_files=DEFAULT_CHUNK_FILES, observer=None,
+               prefetch_depth=DEFAULT_PREFETCH_DEPTH):
+        """
+        只同步指定的文件（如监视到的变化），不遍历整个语料库
+        存在的文件按指纹（含大小和修改时间，见模块说明）判断是否重新读取，
+        已不存在的文件从目录中删除
+
+        返回: (errors, stats)，同 refresh
+        """
+        commit_fingerprints = load_file_commits(data_dir)
+        known = dict(self.conn.execute('SELECT path, fingerprint FROM headers'))
+
+        existing = defaultdict(list)
+        deleted = []
+        for path in sorted(set(paths)):
+            rel_path = corpus_rel_path(path, data_dir)
+            if Path(path).exists():
+                parts = rel_path.split('/')
+                existing[parts[0] if len(parts) > 1 else ''].append(path)
+            elif rel_path in known:
+                deleted.append(rel_path)
+
+        current, pending, stats = self._compare(data_dir, existing, known, commit_fingerprints,
+                                                with_stat=True)
+        stats['deleted'] = len(deleted)
+
+        errors = self._apply(data_dir, pending, deleted, current,
+                             workers, chunk_files, observer, prefetch_depth)
+        return errors, stats
+
+    def _compare(self, data_dir, canon_files, known, commit_fingerprints, with_stat=False):
+        """计算文件指纹并与目录中的记录比较，返回 (指纹, 需要读取的文件, 统计)"""
+        current = {}
+        pending = defaultdict(list)
+        stats = {'added': 0, 'changed': 0, 'deleted': 0, 'unchanged': 0}
+
+        for canon, files in canon_files.items():
+            for path in files:
+                rel_path = corpus_rel_path(path, data_dir)
+                fingerprint = file_fingerprint(path, commit_fingerprints, rel_path, with_stat)
+                current[rel_path] = fingerprint
+                old = known.get(rel_path)
+                if old == fingerprint:
+                    stats['unchanged'] += 1
+                    continue
+                stats['added' if old is None else 'changed'] += 1
+                pending[canon].append(path)
+        return current, pending, stats
+
+    def _apply(self, data_dir, pending, deleted, current, workers, chunk_files, observer,
+               prefetch_depth):
+        """读取待更新的文件并写入目录，删除已不存在的文件，返回读取失败的文件"""
+        rows = (scan_files(pending, workers, chunk_files, observer, prefetch_depth)
+                if pending else [])
+
+        errors = []
+        with self.conn:
+            self.conn.executemany('DELETE FROM headers WHERE path = ?',
+                                  [(rel_path,) for rel_path in deleted])
+            for row in rows:
+                rel_path = corpus_rel_path(row.path, data_dir)
+                if row.error is not None:
+                    # 读取失败的文件从目录中移除，保证下次重新读取
+                    self.conn.execute('DELETE FROM headers WHERE path = ?', (rel_path,))
+                    errors.append({'path': row.path, 'error': row.error})
+                    continue
+                info = row.info
+                self.conn.execute(
+                    'INSERT OR REPLACE INTO headers VALUES (?, ?, ?, ?, ?, ?)',
+                    (rel_path, current[rel_path], info['id'], info['title'],
+                     info['author'] or '', info['source'] or ''))
+
+        errors.sort(key=lambda x: x['path'])
+        return errors
+
+    def books(self):
+        """返回目录中的全部标题信息，按 (id, 路径) 排序"""
+        rows = self.conn.execute(
+            'SELECT path, id, title, author, source FROM headers ORDER BY id, path')
+        return [
+            {'id': id_, 'title': title, 'author': author, 'source': source}
+            for _, id_, title, author, source in rows
+        ]
+
+
+def load_books(data_dir, catalog_path=None, workers=1, observer=None,
+               prefetch_depth=DEFAULT_PREFETCH_DEPTH):
+    """
+    获取语料库的全部标题信息
+
+    指定 catalog_path 时通过目录增量更新，否则完整扫描。
+    observer: 对每个实际读取的文件调用一次，见 scan_files
+    prefetch_depth: 每个扫描进程同时预读的文件数，0 表示不预读
+    返回: (books, errors)
+    """
+    if catalog_path is None:
+        rows = scan_files(list_corpus_files(data_dir), workers, observer=observer,
+                          prefetch_depth=prefetch_depth)
+        return split_scan_results(rows)
+
+    with HeaderCatalog(catalog_path) as catalog:
+        errors, stats = catalog.refresh(data_dir, workers, observer=observer,
+                                       prefetch_depth=prefetch_depth)
+        print(f"标题目录: 新增 {stats['added']}，变化 {stats['changed']}，"
+              f"删除 {stats['deleted']}，未变 {stats['unchanged']}")
+        return catalog.books(), errors
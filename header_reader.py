@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+只读取 JSON 头部的流式读取器
+
+batch-convert 输出的 JSON 结构为 {"id", "header", "body", "meta"}，
+标题扫描只需要 id 和 header，却要对平均 2MB 的文件做完整 json.load。
+这里按固定大小分块读取，逐个解析顶层键，拿到 id 和 header 后立即停止；
+只有当这两个键出现在 body 之后时，才回退到完整解析。
+压缩文件在读取时以流的方式解压，同样读到头部即停止。
+"""
+
+import codecs
+import io
+import json
+
+from corpus_io import open_corpus_file
+
+# 每次读取的块大小
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# 头部缓冲上限：超过后不再增量解析，直接回退到完整解析
+MAX_HEADER_BYTES = 4 * 1024 * 1024
+
+# 默认需要的顶层键
+HEADER_KEYS = ('id', 'header')
+
+_WHITESPACE = ' \t\n\r'
+_decoder = json.JSONDecoder()
+
+
+class _Fallback(Exception):
+    """遇到无法增量处理的结构，需要完整解析"""
+
+
+class _ChunkBuffer:
+    """对二进制流做增量 UTF-8 解码的文本缓冲区"""
+
+    def __init__(self, stream, chunk_size):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.text = ''
+        self.pos = 0
+        self.eof = False
+        self.bytes_read = 0
+
+    def fill(self):
+        """读取下一块；已到文件末尾时返回 False"""
+        if self.eof:
+            return False
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            self.text += self.decoder.decode(b'', final=True)
+            return False
+        self.bytes_read += len(chunk)
+        if self.bytes_read > MAX_HEADER_BYTES:
+            raise _Fallback()
+        # 丢弃已消费的部分，保持缓冲区只包含未解析内容
+        self.text = self.text[self.pos:] + self.decoder.decode(chunk)
+        self.pos = 0
+        return True
+
+    def skip_ws(self):
+        while True:
+            text, pos = self.text, self.pos
+            while pos < len(text) and text[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(text) or not self.fill():
+                return
+
+    def peek(self):
+        self.skip_ws()
+        if self.pos >= len(self.text):
+            raise ValueError('JSON 数据意外结束')
+        return self.text[self.pos]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f'位置 {self.pos} 处应为 {char!r}')
+        self.pos += 1
+
+    def decode_value(self):
+        """解码当前位置的一个完整 JSON 值，数据不足时继续读取"""
+        self.skip_ws()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # 数字可能被块边界截断，确认其后还有分隔符
+            if end >= len(self.text) and not self.eof:
+                if self.fill():
+                    continue
+            self.pos = end
+            return value
+
+
+def read_header_stream(stream, keys=HEADER_KEYS, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    从二进制流中增量读取顶层的指定键
+
+    返回只包含 keys 中各键的字典；所有键找到后立即停止读取。
+    遇到其他顶层键（如 body）时抛出 _Fallback，由调用方完整解析。
+    """
+    wanted = set(keys)
+    result = {}
+    buf = _ChunkBuffer(stream, chunk_size)
+
+    buf.expect('{')
+    if buf.peek() == '}':
+        return result
+
+    while True:
+        key = buf.decode_value()
+        if not isinstance(key, str):
+            raise ValueError('JSON 对象的键必须是字符串')
+        buf.expect(':')
+
+        if key not in wanted:
+            # 需要的键在正文之后，增量解析已无优势
+            raise _Fallback()
+
+        result[key] = buf.decode_value()
+        if wanted.issubset(result):
+            return result
+
+        sep = buf.peek()
+        buf.pos += 1
+        if sep == '}':
+            return result
+        if sep != ',':
+            raise ValueError(f'位置 {buf.pos} 处应为 "," 或 "}}"')
+
+
+def read_header(json_path, keys=HEADER_KEYS, chunk_size=DEFAULT_CHUNK_SIZE, stats=None,
+                prefetched=None):
+    """
+    读取 JSON 文件的头部字段（默认 id 和 header）
+
+    例如: read_header('T/T08/T08n0235.json')
+          -> {'id': 'T08n0235', 'header': {'title': '金刚般若波罗蜜经', ...}}
+
+    也可以是 .json.gz、.json.zst 文件或归档成员，见 corpus_io。
+    stats: 可选字典，写入 bytes_read（从存储读取的字节数）和 fallback（是否完整解析）
+    prefetched: 可选，corpus_io.prefetch 预先读取的开头数据
+    """
+    with open_corpus_file(json_path, prefetched) as f:
+        try:
+            result = read_header_stream(f, keys, chunk_size)
+            if stats is not None:
+                stats['bytes_read'] = f.raw_bytes
+                stats['fallback'] = False
+            return result
+        except _Fallback:
+            pass
+
+    # 回退：完整解析后只保留需要的键
+    with open_corpus_file(json_path, prefetched) as f:
+        data = json.load(io.TextIOWrapper(f, encoding='utf-8'))
+        if stats is not None:
+            stats['bytes_read'] = f.raw_bytes
+            stats['fallback'] = True
+    return {key: data[key] for key in keys if key in data}
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分析流水线的分阶段度量
+
+启用后记录每个阶段的墙钟时间、CPU 时间、读取字节数、文件吞吐量和峰值内存，
+并统计重试次数、解析失败、完整解析回退和最慢的文件；可以对单个阶段做
+cProfile 或 tracemalloc 采样。结果输出为 JSON 文档和一张简短的汇总表。
+
+通过 --metrics PATH 或环境变量 CBETA_METRICS 启用（值为 1 时写入
+输出目录下的 run_metrics.json）。未启用时所有调用都是空操作。
+"""
+
+import cProfile
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+METRICS_ENV = 'CBETA_METRICS'
+DEFAULT_METRICS_FILE = 'run_metrics.json'
+
+# 记录的最慢文件数
+SLOWEST_FILES = 10
+
+# tracemalloc 输出的分配位置数
+TRACEMALLOC_TOP = 20
+
+
+def peak_rss_kb():
+    """当前进程及已结束子进程的峰值常驻内存（KB）"""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    if sys.platform == 'darwin':
+        # macOS 的单位是字节
+        own, children = own // 1024, children // 1024
+    return max(own, children)
+
+
+def _cpu_seconds():
+    """本进程和已回收子进程的 CPU 时间"""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def _io_read_bytes():
+    """/proc/self/io 中本进程实际从存储读取的字节数，不可用时返回 None"""
+    try:
+        with open('/proc/self/io', 'r') as f:
+            for line in f:
+                if line.startswith('read_bytes:'):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def metrics_path_from_env(output_dir):
+    """根据 CBETA_METRICS 环境变量确定度量文件路径，未设置时返回 None"""
+    value = os.environ.get(METRICS_ENV, '').strip()
+    if not value or value == '0':
+        return None
+    if value == '1':
+        return Path(output_dir) / DEFAULT_METRICS_FILE
+    return Path(value)
+
+
+class RunMetrics:
+    """一次运行的度量收集器"""
+
+    def __init__(self, path=None, profile_stage=None, trace_memory_stage=None):
+        self.path = Path(path) if path else None
+        self.enabled = self.path is not None
+        self.profile_stage = profile_stage
+        self.trace_memory_stage = trace_memory_stage
+        self.stages = []
+        self.counters = {'files_read': 0, 'bytes_read': 0, 'retries': 0,
+                         'parse_failures': 0, 'fallbacks': 0}
+        self.failures = []
+        self.slowest = []
+        self._current = None
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        """记录一个阶段；未启用时不做任何事"""
+        if not self.enabled:
+            yield
+            return
+
+        record = {'stage': name, 'files': 0, 'bytes_read': 0}
+        self._current = record
+        profiler = cProfile.Profile() if name == self.profile_stage else None
+        trace = name == self.trace_memory_stage
+
+        if trace:
+            tracemalloc.start()
+        io_start = _io_read_bytes()
+        wall_start = time.perf_counter()
+        cpu_start = _cpu_seconds()
+        if profiler:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler:
+                profiler.disable()
+            wall = time.perf_counter() - wall_start
+            record['wall_seconds'] = round(wall, 6)
+            record['cpu_seconds'] = round(_cpu_seconds() - cpu_start, 6)
+            record['peak_rss_kb'] = peak_rss_kb()
+            io_end = _io_read_bytes()
+            if io_start is not None and io_end is not None:
+                # 只含本进程，扫描子进程的读取量见 bytes_read
+                record['io_read_bytes'] = io_end - io_start
+            if record['files']:
+                record['files_per_second'] = round(record['files'] / wall, 1) if wall > 0 else None
+            if profiler:
+                record['profile'] = str(self._dump_profile(name, profiler))
+            if trace:
+                record['tracemalloc'] = self._tracemalloc_top()
+                tracemalloc.stop()
+            self.stages.append(record)
+            self._current = None
+
+    def observe_scan(self, result):
+        """scan_files 的回调：累计每个文件的读取统计"""
+        if not self.enabled:
+            return
+        counters = self.counters
+        counters['files_read'] += 1
+        counters['bytes_read'] += result.bytes_read
+        counters['retries'] += result.retries
+        if result.fallback:
+            counters['fallbacks'] += 1
+        if result.error is not None:
+            counters['parse_failures'] += 1
+            self.failures.append({'path': str(result.path), 'error': result.error})
+        if self._current is not None:
+            self._current['files'] += 1
+            self._current['bytes_read'] += result.bytes_read
+
+        self.slowest.append((result.elapsed, str(result.path)))
+        if len(self.slowest) > SLOWEST_FILES * 4:
+            self._trim_slowest()
+
+    def _trim_slowest(self):
+        self.slowest.sort(reverse=True)
+        del self.slowest[SLOWEST_FILES:]
+
+    def _dump_profile(self, name, profiler):
+        profile_path = self.path.with_name(f"{self.path.stem}.{name}.prof")
+        profiler.dump_stats(str(profile_path))
+        return profile_path
+
+    def _tracemalloc_top(self):
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            'current_kb': current // 1024,
+            'peak_kb': peak // 1024,
+            'top': [
+                {'location': str(stat.traceback[0]), 'size_kb': stat.size // 1024,
+                 'count': stat.count}
+                for stat in snapshot.statistics('lineno')[:TRACEMALLOC_TOP]
+            ]
+        }
+
+    def document(self):
+        """度量结果文档"""
+        self._trim_slowest()
+        return {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'total_wall_seconds': round(time.perf_counter() - self._started, 6),
+            'peak_rss_kb': peak_rss_kb(),
+            'counters': dict(self.counters),
+            'stages': self.stages,
+            'slowest_files': [
+                {'path': path, 'seconds': round(elapsed, 6)} for elapsed, path in self.slowest
+            ],
+            'failures': self.failures,
+        }
+
+    def summary_table(self):
+        """简短的汇总表"""
+        lines = [f"{'阶段':<16}{'墙钟(s)':>10}{'CPU(s)':>10}{'文件':>8}{'文件/s':>10}"
+                 f"{'读取(MB)':>10}{'峰值(MB)':>10}"]
+        for record in self.stages:
+            lines.append(
+                f"{record['stage']:<16}{record['wall_seconds']:>10.3f}{record['cpu_seconds']:>10.3f}"
+                f"{record['files']:>8}{record.get('files_per_second') or 0:>10.0f}"
+                f"{record['bytes_read'] / 1e6:>10.1f}{record['peak_rss_kb'] / 1024:>10.0f}")
+        counters = self.counters
+        lines.append(f"重试 {counters['retries']}，解析失败 {counters['parse_failures']}，"
+                     f"完整解析回退 {counters['fallbacks']}")
+        return '\n'.join(lines)
+
+    def write(self):
+        """写出 JSON 文档并打印汇总表；未启用时不做任何事"""
+        if not self.enabled:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(self.document(), f, ensure_ascii=False, indent=2)
+        print("\n" + self.summary_table())
+        print(f"度量结果已保存到: {self.path}")
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分析结果的输出格式
+
+所有输出都先写入同目录下的临时文件，完成后再 rename，
+读取方不会看到写了一半的文件。按键值对流式写出（每次只序列化一条记录，
+不在内存中拼出整个文件），支持三种格式：
+
+    json     与 json.dump(..., ensure_ascii=False, indent=2) 逐字节一致
+    ndjson   每行一条 {"key": ..., "value": ...}
+    indexed  带索引的二进制文件（.cbrx），可按键直接读取单条记录
+
+indexed 格式（整数均为小端）:
+    文件头  8 字节魔数 b'CBRX0001'，uint32 记录数，uint64 索引起始偏移
+    记录区  每条记录的值为紧凑 JSON（UTF-8），依次存放
+    索引区  按键排序，每项为 uint16 键长度、键（UTF-8）、
+            uint64 记录偏移、uint32 记录长度
+值使用 JSON 而不是 msgpack，TypeScript 端只需 JSON.parse 即可读取。
+
+records 可以是字典或 (键, 值) 迭代器。title_pipeline 传入的分组、注疏映射、
+同经异译是各阶段共用的完整中间结果（每条记录要看过全部经书才能确定），
+所以流式的只是写出这一侧。
+"""
+
+import bisect
+import json
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+from pathlib import Path
+
+INDEXED_MAGIC = b'CBRX0001'
+WRITE_BUFFER_SIZE = 1 << 20
+_HEADER = struct.Struct('<8sIQ')
+_ENTRY = struct.Struct('<QI')
+_KEY_LEN = struct.Struct('<H')
+
+# 格式名 → 文件扩展名
+FORMAT_SUFFIXES = {
+    'json': '.json',
+    'ndjson': '.ndjson',
+    'indexed': '.cbrx',
+}
+
+
+@contextmanager
+def atomic_open(path, mode='w', encoding='utf-8'):
+    """写入临时文件，成功后原子替换目标文件；出错时删除临时文件"""
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.tmp-{os.getpid()}")
+    # 报告由大量小块写入组成，使用较大的缓冲区减少系统调用
+    if 'b' in mode:
+        f = open(tmp_path, mode, buffering=WRITE_BUFFER_SIZE)
+    else:
+        f = open(tmp_path, mode, encoding=encoding, buffering=WRITE_BUFFER_SIZE)
+    try:
+        yield f
+        f.flush()
+        os.fsync(f.fileno())
+        f.close()
+        os.replace(tmp_path, path)
+    except BaseException:
+        f.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def _items(records):
+    return records.items() if isinstance(records, dict) else records
+
+
+def write_pretty_json(records, path):
+    """
+    流式写出 JSON 对象，输出与 json.dump(dict(records), indent=2) 相同
+    records: 字典或 (键, 值) 迭代器
+    """
+    with atomic_open(path) as f:
+        first = True
+        for key, value in _items(records):
+            f.write('{\n  ' if first else ',\n  ')
+            first = False
+            f.write(json.dumps(key, ensure_ascii=False))
+            f.write(': ')
+            f.write(json.dumps(value, ensure_ascii=False, indent=2).replace('\n', '\n  '))
+        f.write('{}' if first else '\n}')
+
+
+def write_ndjson(records, path):
+    """每行写出一条 {"key": 键, "value": 值}"""
+    with atomic_open(path) as f:
+        for key, value in _items(records):
+            f.write(json.dumps({'key': key, 'value': value}, ensure_ascii=False))
+            f.write('\n')
+
+
+def write_indexed(records, path):
+    """写出带键索引的二进制文件，格式见模块说明"""
+    entries = []
+    with atomic_open(path, 'wb') as f:
+        f.write(_HEADER.pack(INDEXED_MAGIC, 0, 0))
+        offset = _HEADER.size
+        for key, value in _items(records):
+            data = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            f.write(data)
+            entries.append((str(key).encode('utf-8'), offset, len(data)))
+            offset += len(data)
+
+        entries.sort()
+        for key, record_offset, length in entries:
+            f.write(_KEY_LEN.pack(len(key)))
+            f.write(key)
+            f.write(_ENTRY.pack(record_offset, length))
+
+        f.seek(0)
+        f.write(_HEADER.pack(INDEXED_MAGIC, len(entries), offset))
+
+
+WRITERS = {
+    'json': write_pretty_json,
+    'ndjson': write_ndjson,
+    'indexed': write_indexed,
+}
+
+
+def find_records(base_path):
+    """base_path（不含扩展名）已写出的文件，按 json、ndjson、indexed 的顺序取第一个，都没有时为 None"""
+    for suffix in FORMAT_SUFFIXES.values():
+        path = Path(base_path).with_suffix(suffix)
+        if path.exists():
+            return path
+    return None
+
+
+def read_records(path):
+    """读取任一输出格式的文件，返回 {键: 值}（indexed 格式的键为字符串，按键排序）"""
+    path = Path(path)
+    if path.suffix == FORMAT_SUFFIXES['indexed']:
+        with IndexedRecordReader(path) as reader:
+            return {key: reader.get(key) for key in reader.keys()}
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.suffix == FORMAT_SUFFIXES['ndjson']:
+            items = (json.loads(line) for line in f if line.strip())
+            return {item['key']: item['value'] for item in items}
+        return json.load(f)
+
+
+def write_records(records, base_path, formats=('json',)):
+    """
+    以多种格式写出同一份记录，base_path 不含扩展名
+    返回写出的文件路径列表
+    """
+    if len(formats) > 1 and not isinstance(records, dict):
+        records = list(records)
+    paths = []
+    for fmt in formats:
+        if fmt not in WRITERS:
+            raise ValueError(f"未知的输出格式: {fmt}")
+        path = Path(base_path).with_suffix(FORMAT_SUFFIXES[fmt])
+        WRITERS[fmt](records, path)
+        paths.append(path)
+    return paths
+
+
+class IndexedRecordReader:
+    """按键读取 indexed 格式文件中的单条记录，不加载整个文件"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, count, index_offset = _HEADER.unpack_from(self._mmap, 0)
+        if magic != INDEXED_MAGIC:
+            raise ValueError(f"不是 indexed 格式文件: {self.path}")
+
+        self._keys = []
+        self._spans = []
+        pos = index_offset
+        for _ in range(count):
+            (key_len,) = _KEY_LEN.unpack_from(self._mmap, pos)
+            pos += _KEY_LEN.size
+            self._keys.append(self._mmap[pos:pos + key_len].decode('utf-8'))
+            pos += key_len
+            self._spans.append(_ENTRY.unpack_from(self._mmap, pos))
+            pos += _ENTRY.size
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return self._find(key) is not None
+
+    def keys(self):
+        return list(self._keys)
+
+    def _find(self, key):
+        # 索引按 UTF-8 字节排序，与 Python 字符串的码位顺序一致
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return self._spans[i]
+        return None
+
+    def get(self, key, default=None):
+        """读取单条记录，键不存在时返回 default"""
+        span = self._find(key)
+        if span is None:
+            return default
+        offset, length = span
+        return json.loads(self._mmap[offset:offset + length].decode('utf-8'))
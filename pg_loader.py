@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+把分析结果批量载入后端数据库（PostgreSQL）
+
+注疏映射写入 text_relations（relation_type = 'commentary'，有注疏链时隔层的
+上级为 'commentary_chain'），同经异译写入
+translation_groups / translation_group_texts，表结构见
+packages/backend/src/db/schema.ts。数据先用 COPY 写入临时的暂存表，
+再由几条集合语句在同一事务中与正式表比较：
+
+    diff     只删除已不存在的行、插入新增的行、更新变化的排序，
+             重复运行时未变化的行不会被改写（默认）
+    replace  删除本工具此前载入的全部行后重新插入
+
+本工具写入的行以 source = 'analysis:titles' 标记，seed-relations.ts 等其他
+来源的行不受影响。与 seed-relations.ts 相同，数据库中不存在的经文会被跳过，
+有效经文少于两部的异译组不载入。
+
+依赖 psycopg 3（可选依赖，只有连接数据库时才需要安装）；--sql-script
+可以不连接数据库，生成等价的 psql 脚本。check_pg_loader.py 在临时数据库中
+检查 diff / replace 两种模式的载入结果。
+
+用法:
+    python pg_loader.py --output-dir analysis
+    python pg_loader.py --output-dir analysis --mode replace --database-url postgres:///cbeta
+    python pg_loader.py --output-dir analysis --sql-script load.sql && psql -d cbeta -f load.sql
+"""
+
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+from commentary_graph import CommentaryGraph
+
+try:
+    import psycopg
+except ImportError:  # 可选依赖
+    psycopg = None
+
+DEFAULT_DATABASE_URL = os.environ.get('DATABASE_URL', 'postgres:///cbeta?host=/var/run/postgresql')
+
+# 本工具写入的行的 source 值
+LOADER_SOURCE = 'analysis:titles'
+
+LOAD_MODES = ('diff', 'replace')
+
+_SOURCE = "'" + LOADER_SOURCE + "'"
+
+_RELATION_COLUMNS = ('source_text_id', 'target_text_id', 'relation_type', 'relation_subtype',
+                     'confidence')
+_TRANSLATION_COLUMNS = ('base_title', 'text_id', 'sort_order')
+
+
+def _require_psycopg():
+    if psycopg is None:
+        raise ImportError('载入数据库需要 psycopg: pip install "psycopg[binary]"')
+
+
+# ---- 暂存表和比较语句 ----
+# 每项为 (统计名称, SQL)，统计名称为 None 的语句不计入结果
+
+_RELATIONS_STAGE = """
+CREATE TEMP TABLE stage_relations (
+    source_text_id varchar(32) NOT NULL,
+    target_text_id varchar(32) NOT NULL,
+    relation_type varchar(32) NOT NULL,
+    relation_subtype varchar(32),
+    confidence integer
+) ON COMMIT DROP
+"""
+
+_RELATIONS_PREPARE = [
+    # 外键：只保留数据库中存在的经文
+    ('skipped', """
+DELETE FROM stage_relations s
+ WHERE NOT EXISTS (SELECT 1 FROM texts t WHERE t.id = s.source_text_id)
+    OR NOT EXISTS (SELECT 1 FROM texts t WHERE t.id = s.target_text_id)
+"""),
+    (None, 'ANALYZE stage_relations'),
+]
+
+_RELATIONS_DIFF = [
+    ('deleted', f"""
+DELETE FROM text_relations r
+ WHERE r.source = {_SOURCE}
+   AND NOT EXISTS (
+       SELECT 1 FROM stage_relations s
+        WHERE s.source_text_id = r.source_text_id
+          AND s.target_text_id = r.target_text_id
+          AND s.relation_type = r.relation_type
+          AND s.relation_subtype IS NOT DISTINCT FROM r.relation_subtype
+          AND s.confidence IS NOT DISTINCT FROM r.confidence)
+"""),
+    ('inserted', f"""
+INSERT INTO text_relations
+       (source_text_id, target_text_id, relation_type, relation_subtype, confidence, source)
+SELECT s.source_text_id, s.target_text_id, s.relation_type, s.relation_subtype, s.confidence, {_SOURCE}
+  FROM stage_relations s
+ WHERE NOT EXISTS (
+       SELECT 1 FROM text_relations r
+        WHERE r.source = {_SOURCE}
+          AND r.source_text_id = s.source_text_id
+          AND r.target_text_id = s.target_text_id
+          AND r.relation_type = s.relation_type
+          AND r.relation_subtype IS NOT DISTINCT FROM s.relation_subtype
+          AND r.confidence IS NOT DISTINCT FROM s.confidence)
+"""),
+]
+
+_RELATIONS_REPLACE = [
+    ('deleted', f"DELETE FROM text_relations WHERE source = {_SOURCE}"),
+    ('inserted', f"""
+INSERT INTO text_relations
+       (source_text_id, target_text_id, relation_type, relation_subtype, confidence, source)
+SELECT source_text_id, target_text_id, relation_type, relation_subtype, confidence, {_SOURCE}
+  FROM stage_relations
+"""),
+]
+
+_TRANSLATIONS_STAGE = """
+CREATE TEMP TABLE stage_translations (
+    base_title text NOT NULL,
+    text_id varchar(32) NOT NULL,
+    sort_order integer NOT NULL
+) ON COMMIT DROP
+"""
+
+_TRANSLATIONS_PREPARE = [
+    ('skipped', """
+DELETE FROM stage_translations s
+ WHERE NOT EXISTS (SELECT 1 FROM texts t WHERE t.id = s.text_id)
+"""),
+    # 有效经文少于两部的组不载入
+    ('skipped', """
+DELETE FROM stage_translations
+ WHERE base_title IN (SELECT base_title FROM stage_translations GROUP BY base_title HAVING count(*) < 2)
+"""),
+    (None, 'ANALYZE stage_translations'),
+]
+
+_TRANSLATIONS_DIFF = [
+    ('deleted', f"""
+DELETE FROM translation_group_texts gt
+ USING translation_groups g
+ WHERE gt.group_id = g.id
+   AND g.source = {_SOURCE}
+   AND NOT EXISTS (
+       SELECT 1 FROM stage_translations s
+        WHERE s.base_title = g.base_title AND s.text_id = gt.text_id)
+"""),
+    ('groups_deleted', f"""
+DELETE FROM translation_groups g
+ WHERE g.source = {_SOURCE}
+   AND NOT EXISTS (SELECT 1 FROM stage_translations s WHERE s.base_title = g.base_title)
+"""),
+    ('groups_inserted', f"""
+INSERT INTO translation_groups (base_title, source)
+SELECT DISTINCT s.base_title, {_SOURCE}
+  FROM stage_translations s
+ WHERE NOT EXISTS (
+       SELECT 1 FROM translation_groups g
+        WHERE g.source = {_SOURCE} AND g.base_title = s.base_title)
+"""),
+    ('updated', f"""
+UPDATE translation_group_texts gt
+   SET sort_order = s.sort_order
+  FROM translation_groups g, stage_translations s
+ WHERE gt.group_id = g.id
+   AND g.source = {_SOURCE}
+   AND s.base_title = g.base_title
+   AND s.text_id = gt.text_id
+   AND gt.sort_order <> s.sort_order
+"""),
+    ('inserted', f"""
+INSERT INTO translation_group_texts (group_id, text_id, sort_order)
+SELECT g.id, s.text_id, s.sort_order
+  FROM stage_translations s
+  JOIN translation_groups g ON g.source = {_SOURCE} AND g.base_title = s.base_title
+ WHERE NOT EXISTS (
+       SELECT 1 FROM translation_group_texts gt
+        WHERE gt.group_id = g.id AND gt.text_id = s.text_id)
+"""),
+]
+
+_TRANSLATIONS_REPLACE = [
+    ('deleted', f"""
+DELETE FROM translation_group_texts
+ WHERE group_id IN (SELECT id FROM translation_groups WHERE source = {_SOURCE})
+"""),
+    ('groups_deleted', f"DELETE FROM translation_groups WHERE source = {_SOURCE}"),
+    ('groups_inserted', f"""
+INSERT INTO translation_groups (base_title, source)
+SELECT DISTINCT base_title, {_SOURCE} FROM stage_translations
+"""),
+    ('inserted', f"""
+INSERT INTO translation_group_texts (group_id, text_id, sort_order)
+SELECT g.id, s.text_id, s.sort_order
+  FROM stage_translations s
+  JOIN translation_groups g ON g.source = {_SOURCE} AND g.base_title = s.base_title
+"""),
+]
+
+# 表名 → (建暂存表, 暂存表名, 列, 预处理, {模式: 比较语句})
+_TABLES = {
+    'text_relations': (_RELATIONS_STAGE, 'stage_relations', _RELATION_COLUMNS, _RELATIONS_PREPARE,
+                       {'diff': _RELATIONS_DIFF, 'replace': _RELATIONS_REPLACE}),
+    'translation_groups': (_TRANSLATIONS_STAGE, 'stage_translations', _TRANSLATION_COLUMNS,
+                           _TRANSLATIONS_PREPARE,
+                           {'diff': _TRANSLATIONS_DIFF, 'replace': _TRANSLATIONS_REPLACE}),
+}
+
+
+# ---- 行数据 ----
+
+def relation_rows(zhushu_mapping, graph=None):
+    """
+    sutra_zhushu_mapping 的内容 → text_relations 行（经典 → 注疏）
+
+    给出 graph（CommentaryGraph）时按注疏链生成：直接上级为 'commentary'，
+    隔层的上级为 'commentary_chain'（relation_subtype 为层距），查询任意层的
+    注疏或所注经典时不需要递归
+    """
+    if graph is not None:
+        rows = []
+        for ancestor, node, distance in graph.closure_pairs():
+            if distance == 1:
+                rows.append((ancestor, node, 'commentary', graph.suffixes.get(node) or None, None))
+            else:
+                rows.append((ancestor, node, 'commentary_chain', str(distance), None))
+        return rows
+
+    rows = set()
+    for source_id, data in zhushu_mapping.items():
+        for zhushu in data['zhushus']:
+            rows.add((source_id, zhushu['id'], 'commentary', zhushu.get('suffix') or None, None))
+    return sorted(rows, key=lambda row: (row[0], row[1], row[3] or ''))
+
+
+def translation_rows(translation_groups):
+    """sutra_translations 的内容 → (base_title, text_id, sort_order) 行"""
+    rows = []
+    for group in translation_groups.values():
+        seen = set()
+        for order, translation in enumerate(group['translations']):
+            if translation['id'] in seen:
+                continue
+            seen.add(translation['id'])
+            rows.append((group['base_title'], translation['id'], order))
+    return rows
+
+
+def load_commentary_graph(path):
+    """由 commentary_graph.json 重建 CommentaryGraph"""
+    with open(path, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    parents = {text_id: r['parent'] for text_id, r in records.items() if r['parent']}
+    suffixes = {text_id: r['suffix'] for text_id, r in records.items()}
+    # 只需区分未匹配到经典的注疏链顶端
+    text_types = {text_id: 'zhushu' for text_id, r in records.items() if r.get('unresolved')}
+    return CommentaryGraph(parents, suffixes=suffixes, text_types=text_types)
+
+
+def load_analysis_rows(output_dir):
+    """
+    从分析结果目录读取 sutra_zhushu_mapping.json 和 sutra_translations.json，
+    有 commentary_graph.json 时按注疏链生成 text_relations 行
+    """
+    output_dir = Path(output_dir)
+    with open(output_dir / 'sutra_zhushu_mapping.json', 'r', encoding='utf-8') as f:
+        zhushu_mapping = json.load(f)
+    with open(output_dir / 'sutra_translations.json', 'r', encoding='utf-8') as f:
+        translation_groups = json.load(f)
+    graph_file = output_dir / 'commentary_graph.json'
+    graph = load_commentary_graph(graph_file) if graph_file.exists() else None
+    return {
+        'text_relations': relation_rows(zhushu_mapping, graph),
+        'translation_groups': translation_rows(translation_groups),
+    }
+
+
+# ---- 载入 ----
+
+def load_tables(conn, table_rows, mode='diff'):
+    """
+    在已打开的 psycopg 连接上载入各表，每个表一个事务
+    table_rows: {'text_relations': [...], 'translation_groups': [...]}
+    返回: {表名: {统计名称: 行数}}
+    """
+    if mode not in LOAD_MODES:
+        raise ValueError(f"未知的载入模式: {mode}")
+    results = {}
+    for table, rows in table_rows.items():
+        create, stage, columns, prepare, statements = _TABLES[table]
+        stats = {'staged': len(rows)}
+        with conn.transaction():
+            with conn.cursor() as cur:
+                cur.execute(create)
+                with cur.copy(f"COPY {stage} ({', '.join(columns)}) FROM STDIN") as copy:
+                    for row in rows:
+                        copy.write_row(row)
+                for name, sql in prepare + statements[mode]:
+                    cur.execute(sql)
+                    if name is not None:
+                        stats[name] = stats.get(name, 0) + max(cur.rowcount, 0)
+        results[table] = stats
+    return results
+
+
+def load_to_database(table_rows, database_url=DEFAULT_DATABASE_URL, mode='diff'):
+    """连接数据库并载入，返回 load_tables 的统计"""
+    _require_psycopg()
+    # 自动提交模式下每个 conn.transaction() 是独立的事务，暂存表随之删除
+    with psycopg.connect(database_url, autocommit=True) as conn:
+        return load_tables(conn, table_rows, mode)
+
+
+def _copy_text(value):
+    """COPY 文本格式的一个字段"""
+    if value is None:
+        return '\\N'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def write_sql_script(table_rows, path, mode='diff'):
+    """生成与 load_tables 等价的 psql 脚本（COPY 数据内嵌在脚本中）"""
+    if mode not in LOAD_MODES:
+        raise ValueError(f"未知的载入模式: {mode}")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"-- 分析结果载入脚本（模式 {mode}）\n\\set ON_ERROR_STOP on\n\n")
+        for table, rows in table_rows.items():
+            create, stage, columns, prepare, statements = _TABLES[table]
+            f.write(f"-- {table}: {len(rows)} 行\nBEGIN;\n{create.strip()};\n")
+            f.write(f"COPY {stage} ({', '.join(columns)}) FROM STDIN;\n")
+            for row in rows:
+                f.write('\t'.join(_copy_text(v) for v in row) + '\n')
+            f.write('\\.\n')
+            for _, sql in prepare + statements[mode]:
+                f.write(sql.strip() + ';\n')
+            f.write('COMMIT;\n\n')
+
+
+def print_load_stats(results):
+    for table, stats in results.items():
+        print(f"{table}: " + '，'.join(f"{name} {count}" for name, count in stats.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='把分析结果载入后端数据库')
+    parser.add_argument('--output-dir', type=Path, required=True,
+                        help='extract_titles_v2.py 的输出目录')
+    parser.add_argument('--database-url', default=DEFAULT_DATABASE_URL,
+                        help='数据库连接串（默认环境变量 DATABASE_URL）')
+    parser.add_argument('--mode', choices=LOAD_MODES, default='diff',
+                        help='diff 只改写变化的行（默认），replace 全部重新载入')
+    parser.add_argument('--sql-script', type=Path, default=None,
+                        help='不连接数据库，写出等价的 psql 脚本')
+    args = parser.parse_args()
+
+    table_rows = load_analysis_rows(args.output_dir)
+    if args.sql_script:
+        write_sql_script(table_rows, args.sql_script, args.mode)
+        print(f"载入脚本已保存到: {args.sql_script}")
+        return
+
+    start = time.perf_counter()
+    print_load_stats(load_to_database(table_rows, args.database_url, args.mode))
+    print(f"用时 {time.perf_counter() - start:.2f} 秒")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分片的标题分析：各节点处理一部分藏经目录，再合并为完整结果
+
+map     每个分片扫描指定的藏经目录（如 T,X），完成标题分类和多版本分组的
+        标准化，写出可合并的部分结果（JSON）
+reduce  合并全部分片的部分结果，执行与单机运行相同的输出阶段
+
+部分结果的内容:
+    books        经书记录（含相对路径、文本类型、后缀），按 (id, 路径) 排序
+    errors       读取失败的文件
+    type_counts  各文本类型的经书数，合并时用于校验
+    groups       {文本类型: {标准化标题: [books 下标, ...]}}，即分片内的候选分组
+
+合并时按 (id, 路径) 归并各分片的经书列表，得到与单机扫描相同的顺序；
+候选分组按成员在全局列表中的位置合并，与 build_type_groups 的插入顺序一致，
+因此 group_counters 分配的组 ID 与单机运行完全相同。注疏映射和同经异译
+需要跨藏经匹配，在合并后计算（只涉及标题，不再读取语料）。
+
+用法:
+    python shard_analysis.py plan --data-dir data-simplified -n 2
+    python shard_analysis.py map --data-dir data-simplified --canons T,X -o part-1.json
+    python shard_analysis.py reduce part-*.json --output-dir analysis
+"""
+
+import argparse
+import heapq
+import json
+from collections import defaultdict
+from pathlib import Path
+
+from book_store import BookStore, TEXT_TYPES
+from corpus_io import DEFAULT_PREFETCH_DEPTH, corpus_rel_path
+from corpus_scan import list_corpus_files, scan_files
+from output_writers import atomic_open
+from title_classifier import classify_titles
+from title_normalizer import title_forms
+from title_pipeline import (ANALYSIS_STAGES, DEFAULT_DATA_DIR, DEFAULT_OUTPUT_DIR, AnalysisContext,
+                            check_stages, run_stages)
+from zhconv import LOCALES, convert_value, get_converter
+
+PARTIAL_FORMAT = 'cbeta-title-partial'
+PARTIAL_VERSION = 1
+
+# 部分结果中每部经书保存的字段
+BOOK_FIELDS = ('id', 'path', 'title', 'author', 'source', 'text_type', 'suffix')
+
+
+def plan_shards(data_dir, shards):
+    """
+    按文件数把藏经目录分配到 shards 个分片（大目录优先放入最空的分片）
+    返回: [[藏经目录, ...], ...]
+    """
+    sizes = sorted(((len(files), canon) for canon, files in list_corpus_files(data_dir).items()),
+                   reverse=True)
+    heap = [(0, i, []) for i in range(shards)]
+    for size, canon in sizes:
+        total, i, canons = heapq.heappop(heap)
+        canons.append(canon)
+        heapq.heappush(heap, (total + size, i, canons))
+    return [sorted(canons) for _, _, canons in sorted(heap, key=lambda x: x[1])]
+
+
+def build_partial(data_dir, canons, workers=1, prefetch_depth=DEFAULT_PREFETCH_DEPTH, zh_locale=None):
+    """
+    扫描指定藏经目录，返回部分结果（格式见模块说明）
+    zh_locale: 给出时先把标题等字段转换为该字形（见 zhconv.py）
+    """
+    rows = scan_files(list_corpus_files(data_dir, set(canons)), workers,
+                      prefetch_depth=prefetch_depth)
+
+    scanned = []
+    errors = []
+    for row in rows:
+        if row.error is not None:
+            errors.append({'path': str(row.path), 'error': row.error})
+        else:
+            scanned.append((row.info['id'], corpus_rel_path(row.path, data_dir), row.info))
+    if zh_locale:
+        converter = get_converter(zh_locale)
+        scanned = [(book_id, rel_path, convert_value(info, converter))
+                   for book_id, rel_path, info in scanned]
+    scanned.sort(key=lambda x: (x[0], x[1]))
+    errors.sort(key=lambda x: x['path'])
+
+    classes = classify_titles([info['title'] for _, _, info in scanned])
+    books = []
+    type_counts = dict.fromkeys(TEXT_TYPES, 0)
+    groups = {}
+    for i, ((_, rel_path, info), text_class) in enumerate(zip(scanned, classes)):
+        text_type = text_class.text_type
+        books.append([info['id'], rel_path, info['title'], info['author'], info['source'],
+                      text_type, text_class.suffix])
+        type_counts[text_type] += 1
+        norm_title = title_forms(info['title'], text_type).grouping
+        groups.setdefault(text_type, {}).setdefault(norm_title, []).append(i)
+
+    return {
+        'format': PARTIAL_FORMAT,
+        'version': PARTIAL_VERSION,
+        'data_dir': str(data_dir),
+        'canons': sorted(canons),
+        'fields': list(BOOK_FIELDS),
+        'books': books,
+        'errors': errors,
+        'type_counts': type_counts,
+        'groups': groups,
+    }
+
+
+def write_partial(partial, path):
+    with atomic_open(path) as f:
+        json.dump(partial, f, ensure_ascii=False, separators=(',', ':'))
+
+
+def load_partial(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        partial = json.load(f)
+    if partial.get('format') != PARTIAL_FORMAT or partial.get('version') != PARTIAL_VERSION:
+        raise ValueError(f"不是版本 {PARTIAL_VERSION} 的部分结果文件: {path}")
+    return partial
+
+
+def merge_partials(partials):
+    """
+    合并各分片的部分结果
+
+    返回: (all_books, type_groups, errors)
+        all_books:   BookStore，顺序与单机扫描相同
+        type_groups: 与 build_type_groups(all_books) 相同的分组
+        errors:      全部读取失败的文件，按路径排序
+    """
+    seen = {}
+    for partial in partials:
+        for canon in partial['canons']:
+            if canon in seen:
+                raise ValueError(f"藏经目录 {canon} 同时出现在多个分片中")
+            seen[canon] = partial
+        counts = defaultdict(int)
+        for book in partial['books']:
+            counts[book[5]] += 1
+        if any(counts[t] != n for t, n in partial['type_counts'].items()):
+            raise ValueError(f"分片 {','.join(partial['canons'])} 的经书数与 type_counts 不一致")
+
+    # 按 (id, 路径) 归并，记录每个分片内下标对应的全局下标
+    streams = [[(book[0], book[1], n, i) for i, book in enumerate(partial['books'])]
+               for n, partial in enumerate(partials)]
+    positions = [[0] * len(partial['books']) for partial in partials]
+    all_books = BookStore()
+    for _, _, n, i in heapq.merge(*streams):
+        positions[n][i] = len(all_books)
+        book = dict(zip(BOOK_FIELDS, partials[n]['books'][i]))
+        all_books.append(book, book['text_type'], book['suffix'])
+
+    merged = {}
+    for n, partial in enumerate(partials):
+        for text_type, groups in partial['groups'].items():
+            type_merged = merged.setdefault(text_type, {})
+            for norm_title, members in groups.items():
+                type_merged.setdefault(norm_title, []).extend(positions[n][i] for i in members)
+
+    # 类型和分组都按首个成员在全局列表中的位置排列，即单机扫描时的插入顺序
+    type_groups = defaultdict(lambda: defaultdict(list))
+    ordered = []
+    for text_type, groups in merged.items():
+        for members in groups.values():
+            members.sort()
+        first = min(members[0] for members in groups.values())
+        ordered.append((first, text_type))
+    for _, text_type in sorted(ordered):
+        groups = merged[text_type]
+        for norm_title in sorted(groups, key=lambda key: groups[key][0]):
+            type_groups[text_type][norm_title] = all_books.records(groups[norm_title])
+
+    errors = sorted((err for partial in partials for err in partial['errors']),
+                    key=lambda x: x['path'])
+    return all_books, type_groups, errors
+
+
+def reduce_partials(partials, output_dir, stages=None, **options):
+    """合并部分结果并执行输出阶段（默认与 extract_titles_v2.py 相同），返回 AnalysisContext"""
+    stages = check_stages(ANALYSIS_STAGES if stages is None else stages)
+    ctx = AnalysisContext(partials[0]['data_dir'], output_dir, **options)
+    ctx.all_books, ctx.type_groups, ctx.scan_errors = merge_partials(partials)
+    ctx.output_dir.mkdir(parents=True, exist_ok=True)
+
+    print(f"合并 {len(partials)} 个分片，共 {len(ctx.all_books)} 部经书")
+    if ctx.scan_errors:
+        print(f"读取失败 {len(ctx.scan_errors)} 个文件:")
+        for err in ctx.scan_errors:
+            print(f"  - {err['path']}: {err['error']}")
+    print()
+    return run_stages(ctx, stages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='分片的经书标题分析')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    plan = sub.add_parser('plan', help='按文件数把藏经目录分配到各分片')
+    plan.add_argument('--data-dir', type=Path, default=DEFAULT_DATA_DIR, help='JSON 或 TEI XML 语料目录，或 .cbpack 归档')
+    plan.add_argument('-n', '--shards', type=int, default=2, help='分片数（默认 2）')
+
+    map_ = sub.add_parser('map', help='扫描部分藏经目录，写出部分结果')
+    map_.add_argument('--data-dir', type=Path, default=DEFAULT_DATA_DIR, help='JSON 或 TEI XML 语料目录，或 .cbpack 归档')
+    map_.add_argument('--canons', required=True, help='逗号分隔的藏经目录，如 T,X')
+    map_.add_argument('-o', '--output', type=Path, required=True, help='部分结果文件')
+    map_.add_argument('-j', '--workers', type=int, default=1,
+                      help='扫描进程数，1 为串行，0 为使用全部 CPU（默认 1）')
+    map_.add_argument('--prefetch', type=int, default=DEFAULT_PREFETCH_DEPTH, metavar='N',
+                      help=f'每个扫描进程同时预读的文件数（默认 {DEFAULT_PREFETCH_DEPTH}）')
+    map_.add_argument('--zh-locale', choices=sorted(LOCALES), default=None,
+                      help='先把标题等字段转换为指定字形，如用 zh-cn 分析繁体语料 data/')
+
+    reduce_ = sub.add_parser('reduce', help='合并部分结果，写出分析结果')
+    reduce_.add_argument('partials', nargs='+', type=Path, help='各分片的部分结果文件')
+    reduce_.add_argument('--output-dir', type=Path, default=DEFAULT_OUTPUT_DIR, help='分析结果目录')
+    reduce_.add_argument('--stages', default=None,
+                         help=f"逗号分隔的输出阶段（默认 {','.join(ANALYSIS_STAGES)}）")
+    reduce_.add_argument('--formats', default='json', help='键值结果的输出格式，逗号分隔（默认 json）')
+    reduce_.add_argument('--candidates', type=int, default=0, metavar='K',
+                         help='批量计算前 K 个候选匹配（需要 numpy/scipy，默认不计算）')
+
+    args = parser.parse_args()
+    if args.command == 'plan':
+        for i, canons in enumerate(plan_shards(args.data_dir, args.shards), 1):
+            print(f"分片 {i}: {','.join(canons)}")
+    elif args.command == 'map':
+        canons = [c for c in args.canons.split(',') if c]
+        partial = build_partial(args.data_dir, canons, args.workers, args.prefetch, args.zh_locale)
+        write_partial(partial, args.output)
+        print(f"分片 {','.join(canons)}: {len(partial['books'])} 部经书，"
+              f"读取失败 {len(partial['errors'])} 个，已保存到: {args.output}")
+    else:
+        partials = [load_partial(path) for path in args.partials]
+        stages = args.stages.split(',') if args.stages else None
+        reduce_partials(partials, args.output_dir, stages,
+                        formats=args.formats.split(','), candidates=args.candidates)
+
+
+if __name__ == '__main__':
+    main()
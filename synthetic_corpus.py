@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生成与 CBETA 结构相同的合成语料库，用于性能测试
+
+目录结构、文件格式与 batch-convert / simplify-convert 的输出一致：
+    <输出目录>/<藏经>/<藏经+册>/<ID>.json 以及 .file-commits.json
+文件数按 docs/data-design.md 的藏经分布（大正藏 2471 个，其余按卷数比例），
+作者字段按其中的朝代、角色出现次数分布生成。--scale 按倍数放大文件数。
+"""
+
+import argparse
+import json
+import random
+from datetime import datetime, timezone
+from pathlib import Path
+
+# 真实语料的文件数
+BASE_FILE_COUNT = 4996
+TAISHO_FILE_COUNT = 2471
+
+# 藏经代码和卷数（docs/data-design.md 1.2 A），除大正藏外按卷数分配文件数
+CANON_VOLUMES = {
+    'X': 88, 'J': 40, 'N': 70, 'K': 47, 'L': 164, 'P': 200, 'A': 121, 'C': 106,
+    'F': 29, 'G': 84, 'GA': 110, 'GB': 130, 'I': 1, 'B': 36, 'M': 69, 'Q': 37,
+    'S': 6, 'U': 241, 'Y': 44, 'TX': 32, 'YP': 45, 'LC': 8, 'ZS': 1, 'ZW': 12,
+    'D': 64,
+}
+
+# 朝代/地域出现次数（docs/data-design.md 1.2 B，简体）
+DYNASTY_WEIGHTS = {
+    '清': 504, '明': 428, '唐': 390, '宋': 339, '元': 131, '日本': 59, '隋': 50,
+    '民国': 39, '陈': 35, '刘宋': 23, '元魏': 22, '梁': 20, '东晋': 19, '新罗': 17,
+    '姚秦': 14, '西晋': 13, '吴': 13, '后汉': 12, '后秦': 11, '高丽': 10, '北凉': 8,
+    '萧齐': 5, '曹魏': 4, '天竺': 4, '北周': 4, '印度': 3, '乞伏秦': 2, '西秦': 1,
+    '南北朝': 1, '北魏': 1, '前秦': 1, '中天竺': 1,
+}
+
+# 角色出现次数（docs/data-design.md 1.2 C，简体）
+ROLE_WEIGHTS = {
+    '译': 462, '编': 365, '撰': 337, '述': 245, '集': 234, '录': 178, '造': 151,
+    '著': 147, '注': 85, '记': 78, '辑': 76, '解': 43, '疏': 28, '重编': 24,
+    '校': 22, '传': 21, '和': 15, '合': 15, '科': 14, '重译': 2, '同译': 2,
+    '合译': 1, '口译': 1, '传译': 1,
+}
+
+# 失译等不带人名的作者字段所占比例
+UNNAMED_AUTHOR_RATE = 0.01
+
+# 唯一作者字段数（docs/data-design.md 1.1）
+UNIQUE_AUTHOR_COUNT = 2236
+
+SUTRA_STEMS = [
+    '金刚般若波罗蜜', '妙法莲华', '大方广佛华严', '阿弥陀', '无量寿', '观无量寿',
+    '维摩诘所说', '楞伽阿跋多罗宝', '大般涅槃', '金光明', '药师琉璃光如来本愿功德',
+    '地藏菩萨本愿', '般若波罗蜜多心', '大宝积', '大集', '长阿含', '中阿含', '杂阿含',
+    '增一阿含', '梵网', '胜鬘师子吼一乘大方便方广', '解深密', '楞严', '圆觉',
+    '仁王护国般若波罗蜜多', '大日', '金刚顶', '苏悉地羯罗', '文殊师利问', '十地',
+    '佛本行集', '贤愚', '百喻', '法句', '四十二章', '遗教', '八大人觉', '盂兰盆',
+    '优婆塞戒', '大萨遮尼乾子所说', '首楞严三昧', '般舟三昧', '观普贤菩萨行法',
+]
+LUN_STEMS = [
+    '大智度', '中', '百', '十二门', '成唯识', '瑜伽师地', '俱舍', '大乘起信',
+    '摄大乘', '辩中边', '阿毗达磨顺正理', '成实', '十住毗婆沙', '宝性', '佛性',
+    '因明正理门', '大乘庄严经', '显扬圣教', '集量', '唯识二十',
+]
+PREFIXES = ['', '', '', '佛说', '大乘', '新编', '重刊']
+ZHUSHU_SUFFIXES = [
+    '疏', '义疏', '玄义', '述记', '文句', '注', '略疏', '会本', '要解', '义记',
+    '疏钞', '演秘', '科注', '玄义拾遗记', '集注', '直解', '讲义', '贯珠',
+]
+OTHER_TITLES = [
+    '高僧传', '景德传灯录', '佛祖统纪', '释氏要览', '大唐西域记', '弘明集',
+    '广弘明集', '法苑珠林', '宗镜录', '五灯会元', '禅林僧宝传', '比丘尼传',
+    '寺志', '山志', '语录', '年谱', '清规', '忏仪', '行事钞', '羯磨法',
+]
+
+# 文本类型比例（近似值）
+TYPE_WEIGHTS = {'jing': 45, 'zhushu': 25, 'lun': 10, 'other': 12, 'unknown': 8}
+
+# 正文用字
+BODY_CHARS = ('如是我闻一时佛在舍卫国祇树给孤独园与大比丘众千二百五十人俱尔时世尊食时著衣持钵'
+              '入大城乞食于其城中次第乞已还至本处饭食讫收衣钵洗足已敷座而坐须菩提白佛言希有')
+
+NAME_CHARS = '玄奘鸠摩罗什智顗窥基吉藏法藏澄观宗密智旭德清袾宏真可元贤道宣义净不空善无畏实叉难陀'
+
+
+def canon_file_counts(scale=1.0):
+    """各藏经的文件数"""
+    total = max(int(round(BASE_FILE_COUNT * scale)), 1)
+    taisho = int(round(total * TAISHO_FILE_COUNT / BASE_FILE_COUNT))
+    rest = total - taisho
+    volumes = sum(CANON_VOLUMES.values())
+    counts = {'T': taisho}
+    for canon, vol in CANON_VOLUMES.items():
+        counts[canon] = rest * vol // volumes
+    # 余数补给大正藏，保证总数准确
+    counts['T'] += total - sum(counts.values())
+    return counts
+
+
+def _weighted(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def make_author_pool(rng, size=UNIQUE_AUTHOR_COUNT):
+    """生成作者字段池，如 '唐 玄奘译'、'后秦 鸠摩罗什共佛陀耶舍译'"""
+    pool = []
+    for _ in range(size):
+        if rng.random() < UNNAMED_AUTHOR_RATE:
+            pool.append('失译')
+            continue
+        dynasty = _weighted(rng, DYNASTY_WEIGHTS)
+        name = ''.join(rng.choices(NAME_CHARS, k=rng.choice([2, 2, 3, 4])))
+        role = _weighted(rng, ROLE_WEIGHTS)
+        if rng.random() < 0.08:
+            partner = ''.join(rng.choices(NAME_CHARS, k=2))
+            pool.append(f"{dynasty} {name}共{partner}{role}")
+        else:
+            pool.append(f"{dynasty} {name}{role}")
+    return pool
+
+
+def make_title(rng, text_type):
+    """按文本类型生成标题"""
+    if text_type == 'jing':
+        return rng.choice(PREFIXES) + rng.choice(SUTRA_STEMS) + '经'
+    if text_type == 'lun':
+        return rng.choice(LUN_STEMS) + '论'
+    if text_type == 'zhushu':
+        if rng.random() < 0.7:
+            base = rng.choice(SUTRA_STEMS) + rng.choice(['经', ''])
+        else:
+            base = rng.choice(LUN_STEMS) + '论'
+        return base + rng.choice(ZHUSHU_SUFFIXES)
+    if text_type == 'other':
+        return rng.choice(OTHER_TITLES)
+    return rng.choice(SUTRA_STEMS) + rng.choice(['第一', '卷上', '拾遗', '杂集偈'])
+
+
+def _paragraph(rng, length):
+    start = rng.randrange(len(BODY_CHARS))
+    text = (BODY_CHARS * (length // len(BODY_CHARS) + 2))[start:start + length]
+    return {'tag': 'p', 'ns': 'tei', 'attrs': {}, 'children': [
+        {'tag': 'lb', 'ns': 'tei', 'attrs': {'n': '0001a01'}, 'children': []},
+        text,
+    ]}
+
+
+def make_body(rng, target_bytes):
+    """生成约 target_bytes 大小（缩进 JSON 后）的正文"""
+    body = []
+    # 每个段落缩进后约占 3 字节/字 + 固定开销
+    size = 0
+    while size < target_bytes:
+        length = rng.randint(50, 400)
+        body.append(_paragraph(rng, length))
+        size += length * 3 + 400
+    return body
+
+
+def generate_corpus(output_dir, scale=1.0, body_kb=1800, seed=0):
+    """
+    生成合成语料库
+    body_kb: 平均正文大小（KB），实际大小在 0.2~1.8 倍之间浮动
+    返回生成的文件数
+    """
+    rng = random.Random(seed)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    authors = make_author_pool(rng)
+    parsed_at = datetime.now(timezone.utc).isoformat()
+
+    commits = {}
+    count = 0
+    for canon, n_files in canon_file_counts(scale).items():
+        for no in range(1, n_files + 1):
+            volume = no // 50 + 1
+            text_id = f"{canon}{volume:02d}n{no:04d}"
+            rel_dir = Path(canon) / f"{canon}{volume:02d}"
+            text_type = _weighted(rng, TYPE_WEIGHTS)
+
+            header = {'title': make_title(rng, text_type), 'source': '大正新脩大藏经'}
+            if rng.random() < 0.95:
+                header['author'] = rng.choice(authors)
+
+            target = int(body_kb * 1024 * rng.uniform(0.2, 1.8))
+            doc = {
+                'id': text_id,
+                'header': header,
+                'body': make_body(rng, target),
+                'meta': {
+                    'parsedAt': parsed_at,
+                    'sourceFile': f"xml-p5a/{rel_dir}/{text_id}.xml"
+                }
+            }
+
+            (output_dir / rel_dir).mkdir(parents=True, exist_ok=True)
+            with open(output_dir / rel_dir / f"{text_id}.json", 'w', encoding='utf-8') as f:
+                json.dump(doc, f, ensure_ascii=False, indent=2)
+
+            commits[f"{rel_dir.as_posix()}/{text_id}.xml"] = {
+                'commit': f"{rng.getrandbits(160):040x}",
+                'processedAt': parsed_at
+            }
+            count += 1
+
+    with open(output_dir / '.file-commits.json', 'w', encoding='utf-8') as f:
+        json.dump(commits, f, ensure_ascii=False, indent=2)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成 CBETA 结构的合成语料库')
+    parser.add_argument('output_dir', type=Path, help='输出目录')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='文件数倍数，1 约为 5000 个文件（默认 1）')
+    parser.add_argument('--body-kb', type=int, default=1800,
+                        help='平均正文大小 KB（默认 1800，与真实语料接近）')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子（默认 0）')
+    args = parser.parse_args()
+
+    count = generate_corpus(args.output_dir, args.scale, args.body_kb, args.seed)
+    print(f"已生成 {count} 个文件到: {args.output_dir}")
+
+
+if __name__ == '__main__':
+    main()
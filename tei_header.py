@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+直接从 CBETA TEI P5a XML 读取 teiHeader，不经过 XML → JSON 转换
+
+新版本语料发布时，batch-convert 需要很长时间才能把全部 XML 转换为 JSON。
+标题分析只需要 id、title、author、source：这里用增量的 pull 解析器
+读取 XML，fileDesc 结束（最迟遇到 <text>）时立即停止，正文不会被读取。
+提取规则与 packages/scripts/src/parser.ts 的 extractHeader 相同，
+返回的结构与 header_reader.read_header 读取 JSON 得到的相同:
+
+    {'id': 'T08n0235', 'header': {'title': '金剛般若波羅蜜經', 'author': ..., 'source': ...}}
+
+XML 是繁体原文，需要与简体语料的分析结果对照时，配合 --zh-locale zh-cn
+（见 zhconv.py）使用。
+"""
+
+import re
+import xml.etree.ElementTree as ET
+
+from corpus_io import open_corpus_file
+
+XML_SUFFIX = '.xml'
+
+# 每次交给解析器的字节数；fileDesc 通常在文件开头几 KB 内
+READ_SIZE = 16 * 1024
+
+_XML_NS = '{http://www.w3.org/XML/1998/namespace}'
+_SPACES = re.compile(r'\s+')
+
+
+def _local(tag):
+    """去掉命名空间后的标签名（与 parser.ts 按 key === tag 或 endsWith(':tag') 匹配相同）"""
+    if not isinstance(tag, str):
+        return None
+    return tag.rsplit('}', 1)[-1]
+
+
+def _first(element, name):
+    for child in element:
+        if _local(child.tag) == name:
+            return child
+    return None
+
+
+def _descendants(element, name):
+    """element 的所有后代中（不含自身）指定名称的元素，按文档顺序"""
+    return [e for e in element.iter() if e is not element and _local(e.tag) == name]
+
+
+def _text(element):
+    return _SPACES.sub(' ', ''.join(element.itertext())).strip()
+
+
+def _lang(element):
+    return element.get(_XML_NS + 'lang') or element.get('lang') or ''
+
+
+def _pick_title(titles, level):
+    """按 level 和中文优先选择标题，同 pickTitleFromNodes / pickSeriesTitleFromNodes"""
+    candidates = [(_text(t), t.get('level') or '', _lang(t)) for t in titles]
+    candidates = [c for c in candidates if c[0]]
+    is_zh = [c for c in candidates if c[2].lower().startswith('zh')]
+    if level == 'm':
+        groups = ([c for c in is_zh if c[1] == 'm'], [c for c in candidates if c[1] == 'm'],
+                  is_zh, candidates)
+    else:
+        groups = ([c for c in is_zh if c[1] == level], [c for c in candidates if c[1] == level])
+    for group in groups:
+        if group:
+            return group[0][0]
+    return ''
+
+
+def _join_unique(texts):
+    unique = []
+    for text in texts:
+        text = text.strip()
+        if text and text not in unique:
+            unique.append(text)
+    return '; '.join(unique)
+
+
+def _author(title_stmt):
+    """titleStmt 中的 author；没有时取 respStmt 中的 name / persName"""
+    author = _join_unique(_text(e) for e in _descendants(title_stmt, 'author'))
+    if author:
+        return author
+    names = []
+    for resp in _descendants(title_stmt, 'respStmt'):
+        names += [_text(e) for e in _descendants(resp, 'name')]
+        names += [_text(e) for e in _descendants(resp, 'persName')]
+    return _join_unique(names)
+
+
+def header_from_file_desc(file_desc):
+    """由 fileDesc 元素提取 {'title', 'author', 'source'}，空值省略（与转换出的 JSON 相同）"""
+    header = {'title': ''}
+    if file_desc is None:
+        return header
+
+    title_stmt = _first(file_desc, 'titleStmt')
+    titles = _descendants(title_stmt, 'title') if title_stmt is not None else []
+    header['title'] = _pick_title(titles, 'm')
+    author = _author(title_stmt) if title_stmt is not None else ''
+
+    source_desc = _first(file_desc, 'sourceDesc')
+    source = _text(source_desc) if source_desc is not None else ''
+    if not source and titles:
+        source = _pick_title(titles, 's')
+
+    if author:
+        header['author'] = author
+    if source:
+        header['source'] = source
+    return header
+
+
+def read_tei_header(xml_path, stats=None, prefetched=None):
+    """
+    读取 TEI XML 的 id 和 header，读到 fileDesc 结束即停止
+
+    例如: read_tei_header('T/T08/T08n0235.xml')
+          -> {'id': 'T08n0235', 'header': {'title': '金剛般若波羅蜜經', ...}}
+
+    stats: 可选字典，写入 bytes_read 和 fallback（始终为 False），同 read_header
+    prefetched: 可选，corpus_io.prefetch 预先读取的开头数据
+    """
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    doc_id = None
+    in_header = False
+    file_desc = None
+
+    with open_corpus_file(xml_path, prefetched) as f:
+        done = False
+        while not done:
+            chunk = f.read(READ_SIZE)
+            if not chunk:
+                parser.close()
+                break
+            parser.feed(chunk)
+            for event, element in parser.read_events():
+                name = _local(element.tag)
+                if event == 'start':
+                    if name == 'TEI' and doc_id is None:
+                        doc_id = element.get(_XML_NS + 'id') or 'unknown'
+                    elif name == 'teiHeader':
+                        in_header = True
+                    elif name == 'text':
+                        done = True
+                        break
+                elif name == 'fileDesc' and in_header:
+                    file_desc = element
+                    done = True
+                    break
+                elif name == 'teiHeader':
+                    done = True
+                    break
+        if stats is not None:
+            stats['bytes_read'] = f.raw_bytes
+            stats['fallback'] = False
+
+    if doc_id is None:
+        raise ValueError('不是 CBETA TEI XML：缺少 TEI 根元素')
+    return {'id': doc_id, 'header': header_from_file_desc(file_desc)}
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基于反向后缀字典树的标题分类器
+
+所有后缀规则（注疏/论/经/其他，以及提取被注经名时剥离的后缀）
+在模块加载时一次性构建成一棵反向字典树。对标题从末尾逐字查找一遍，
+即可同时得到文本类型、命中的后缀和去掉最长注疏后缀后的经名部分。
+"""
+
+from collections import namedtuple
+
+# 注疏类后缀（按优先级排列，靠前的先命中）
+ZHUSHU_SUFFIXES = [
+    '疏', '释', '记', '钞', '述记', '演秘', '注', '注疏', '注解', '释论', '义疏',
+    '科文', '科注', '科疏', '大意', '论疏', '述', '序', '后记',
+    '玄义', '义记', '解义', '解', '解疏', '会疏', '义', '略',
+    '传', '撰', '集', '要钞', '要解', '要义', '手诀', '抉择',
+    '分章', '科判', '别传', '本传', '内传',
+    '旁通', '问难', '问答', '辨', '辨惑', '析疑', '发微', '探微', '微旨',
+    '指归', '指要', '指掌',
+    '决疑', '决择', '决科', '钞义', '疏记', '疏钞', '疏略', '疏科',
+    '注说', '注记', '注略', '别注', '重注', '新注', '详注', '集注',
+    '合注', '音义', '音注', '音释', '略释', '略解', '略注', '略钞',
+]
+
+# 以这些后缀结尾的标题不算注疏（如"金刚般若波罗蜜经论"既是经也是论）
+ZHUSHU_EXCLUDED_SUFFIXES = ['经论']
+
+# 标题中任意位置出现即视为注疏，值为返回的后缀
+ZHUSHU_INFIXES = {'论释': '论释', '论疏': '论释'}
+
+# 论类后缀（独立的论著）
+LUN_SUFFIXES = ['论', '颂', '偈颂']
+
+# 经典类（主要是佛经原文的翻译）
+JING_SUFFIXES = ['经', '咒', '陀罗尼']
+
+# 其他类型
+OTHER_SUFFIXES = ['传', '录', '史', '谱', '志', '表', '目', '要', '法', '规', '仪', '轨']
+
+# 提取被注经名时剥离的后缀，总是剥离最长的一个
+SOURCE_SUFFIXES = [
+    '述记', '演秘', '注疏', '科文', '科注', '科疏', '义疏', '论疏', '论释',
+    '玄义', '义记', '解义', '解疏', '会疏', '要钞', '要解', '要义', '手诀', '抉择',
+    '分章', '科判', '疏记', '疏钞', '疏略', '疏科', '钞义',
+    '注说', '注记', '注略', '别注', '重注', '新注', '详注', '集注', '合注',
+    '音义', '音注', '音释', '略释', '略解', '略注', '略钞',
+    '疏', '释', '记', '钞', '注', '解', '述', '序', '后记', '义', '略', '撰', '集',
+]
+
+# 后缀类型的优先级：注疏 > 论 > 经 > 其他
+TYPE_RULES = [
+    ('zhushu', ZHUSHU_SUFFIXES),
+    ('lun', LUN_SUFFIXES),
+    ('jing', JING_SUFFIXES),
+    ('other', OTHER_SUFFIXES),
+]
+
+# 分类结果：文本类型、命中的后缀、去掉最长注疏后缀后的部分（无则为 None）
+TitleClass = namedtuple('TitleClass', ['text_type', 'suffix', 'stem'])
+
+_UNKNOWN = ('unknown', '')
+
+
+class _Terminal:
+    """字典树终止节点上的规则"""
+    __slots__ = ('rule', 'strip', 'exclude_zhushu')
+
+    def __init__(self):
+        self.rule = None            # (类型优先级, 列表内优先级, 类型, 后缀)
+        self.strip = False          # 是否为 SOURCE_SUFFIXES 中的后缀
+        self.exclude_zhushu = False  # 是否为 ZHUSHU_EXCLUDED_SUFFIXES 中的后缀
+
+
+class TitleClassifier:
+    """反向后缀字典树：一次查找得到类型、后缀和经名部分"""
+
+    def __init__(self, type_rules=TYPE_RULES, source_suffixes=SOURCE_SUFFIXES,
+                 excluded_suffixes=ZHUSHU_EXCLUDED_SUFFIXES, infixes=ZHUSHU_INFIXES):
+        self.root = {}
+        self.infixes = dict(infixes)
+        self._cache = {}
+
+        for rank, (text_type, suffixes) in enumerate(type_rules):
+            for priority, suffix in enumerate(suffixes):
+                terminal = self._insert(suffix)
+                # 重复的后缀只保留最先出现的规则
+                if terminal.rule is None:
+                    terminal.rule = (rank, priority, text_type, suffix)
+        for suffix in source_suffixes:
+            self._insert(suffix).strip = True
+        for suffix in excluded_suffixes:
+            self._insert(suffix).exclude_zhushu = True
+
+    def _insert(self, suffix):
+        node = self.root
+        for char in reversed(suffix):
+            node = node.setdefault(char, {})
+        terminal = node.get(None)
+        if terminal is None:
+            terminal = node[None] = _Terminal()
+        return terminal
+
+    def classify(self, title):
+        """对单个标题分类，返回 TitleClass"""
+        cached = self._cache.get(title)
+        if cached is not None:
+            return cached
+
+        node = self.root
+        best = None
+        strip_len = 0
+        excluded = False
+        length = len(title)
+
+        for depth in range(1, length + 1):
+            node = node.get(title[length - depth])
+            if node is None:
+                break
+            terminal = node.get(None)
+            if terminal is None:
+                continue
+            if terminal.strip:
+                strip_len = depth
+            if terminal.exclude_zhushu:
+                excluded = True
+            if terminal.rule is not None and (best is None or terminal.rule < best):
+                best = terminal.rule
+
+        if best is not None and best[2] == 'zhushu' and excluded:
+            # 被排除的注疏后缀：重新查找时跳过注疏规则
+            best = self._best_non_zhushu(title)
+
+        if best is not None and best[2] == 'zhushu':
+            text_type, suffix = 'zhushu', best[3]
+        else:
+            infix = next((v for k, v in self.infixes.items() if k in title), None)
+            if infix is not None:
+                text_type, suffix = 'zhushu', infix
+            elif best is not None:
+                text_type, suffix = best[2], best[3]
+            else:
+                text_type, suffix = _UNKNOWN
+
+        stem = title[:-strip_len] if strip_len else None
+        result = TitleClass(text_type, suffix, stem)
+        self._cache[title] = result
+        return result
+
+    def _best_non_zhushu(self, title):
+        node = self.root
+        best = None
+        length = len(title)
+        for depth in range(1, length + 1):
+            node = node.get(title[length - depth])
+            if node is None:
+                break
+            terminal = node.get(None)
+            if terminal is None or terminal.rule is None or terminal.rule[2] == 'zhushu':
+                continue
+            if best is None or terminal.rule < best:
+                best = terminal.rule
+        return best
+
+    def classify_many(self, titles):
+        """批量分类，返回与输入顺序一致的 TitleClass 列表"""
+        classify = self.classify
+        return [classify(title) for title in titles]
+
+
+_default_classifier = TitleClassifier()
+
+
+def classify_title(title):
+    """使用默认规则对单个标题分类"""
+    return _default_classifier.classify(title)
+
+
+def classify_titles(titles):
+    """使用默认规则批量分类整个标题列表"""
+    return _default_classifier.classify_many(titles)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+注疏 → 被注经典 的索引化模糊匹配
+
+与 extract_titles_v2.find_best_match 的规则和打分完全一致（包括平分时取
+最先出现的标题），但不再对全部经/论标题做线性扫描：
+1. 精确匹配、补全后缀匹配：哈希表
+2. 前缀匹配（经名比 source 长不超过 6 个字）：预先登记每个标题的
+   最后 7 个前缀长度，查一次哈希表
+3. 相似度打分：字符倒排索引 + 前缀过滤，只对可能得分 >= 0.5 的候选打分
+"""
+
+from collections import defaultdict
+
+# 前缀匹配允许经名比 source 多出的字数
+MAX_PREFIX_EXTRA = 6
+
+# 相似度打分的最低分数
+MIN_SCORE = 0.5
+
+# 按共同字符打分时要求的最少共同字符数
+MIN_COMMON_CHARS = 3
+
+# 尝试补全的常见后缀
+COMMON_SUFFIXES = ['经', '论']
+
+
+def similarity_score(source, source_title):
+    """计算 source 与经名的相似度分数（与 find_best_match 第 4 步一致）"""
+    if source in source_title:
+        return len(source) / len(source_title)  # 子串得分
+    if source_title in source:
+        return len(source_title) / len(source)  # 超串得分
+    # 包含共同字符
+    common = len(set(source) & set(source_title))
+    if common >= MIN_COMMON_CHARS:
+        return common / max(len(source), len(source_title))
+    return 0
+
+
+class TitleMatchIndex:
+    """经/论标题的匹配索引，查询结果与线性扫描一致"""
+
+    def __init__(self, source_texts):
+        """source_texts: {标题: 经书信息}，字典顺序决定平分时的优先级"""
+        self.source_texts = source_texts
+        self.titles = list(source_texts)
+        self.books = [source_texts[title] for title in self.titles]
+        self.orders = {title: order for order, title in enumerate(self.titles)}
+
+        # 前缀 → 最先出现的标题序号
+        self.prefixes = {}
+        # 字符 → 含该字符的标题序号（升序）
+        self.char_postings = defaultdict(list)
+        self.char_sets = []
+
+        for order, title in enumerate(self.titles):
+            for length in range(max(len(title) - MAX_PREFIX_EXTRA, 0), len(title) + 1):
+                self.prefixes.setdefault(title[:length], order)
+            chars = frozenset(title)
+            self.char_sets.append(chars)
+            for char in chars:
+                self.char_postings[char].append(order)
+
+    def match(self, source):
+        """查找 source 对应的经书信息，找不到时返回 None"""
+        source_texts = self.source_texts
+
+        # 1. 精确匹配
+        if source in source_texts:
+            return source_texts[source]
+
+        # 2. 尝试添加常见后缀进行匹配
+        for suffix in COMMON_SUFFIXES:
+            if not source.endswith(suffix):
+                candidates = [source + suffix]
+                # 也尝试"波罗蜜经"类
+                if suffix == '经' and not source.endswith('波罗蜜'):
+                    candidates.append(source + '波罗蜜经')
+                for cand in candidates:
+                    if cand in source_texts:
+                        return source_texts[cand]
+
+        # 3. 前缀匹配：source 是经书名的前缀
+        order = self.prefixes.get(source)
+        if order is not None:
+            return self.books[order]
+
+        # 4. 子串/相似度匹配：只对候选标题打分，按原顺序取最高分
+        best_match = None
+        best_score = 0
+        for order in sorted(self._score_candidates(source)):
+            score = similarity_score(source, self.titles[order])
+            if score > best_score and score >= MIN_SCORE:
+                best_score = score
+                best_match = self.books[order]
+
+        return best_match
+
+    def _score_candidates(self, source):
+        """
+        可能得分 >= 0.5 的候选标题序号：
+        - 经名是 source 的子串：枚举 source 中足够长的子串查表
+        - source 是经名的子串，或共同字符 >= 3：经名至少含有 source 中
+          k = min(3, 不同字符数) 个字符，因此必然含有 source 中最稀有的
+          (不同字符数 - k + 1) 个字符之一（前缀过滤）
+        """
+        candidates = set()
+
+        min_len = (len(source) + 1) // 2
+        for start in range(len(source)):
+            for end in range(start + max(min_len, 1), len(source) + 1):
+                order = self.orders.get(source[start:end])
+                if order is not None:
+                    candidates.add(order)
+
+        chars = set(source)
+        need = min(MIN_COMMON_CHARS, len(chars))
+        if need == 0:
+            return candidates
+
+        postings = self.char_postings
+        rare_chars = sorted(chars, key=lambda c: len(postings.get(c, ())))
+        char_sets = self.char_sets
+        for char in rare_chars[:len(chars) - need + 1]:
+            for order in postings.get(char, ()):
+                if order not in candidates and len(chars & char_sets[order]) >= need:
+                    candidates.add(order)
+
+        return candidates
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+标题标准化：一次计算全部标准化形式
+
+normalize_sutra_title、normalize_title_for_grouping、extract_source_text
+过去各自对同一标题执行一串 re.sub 和前缀循环，同一标题在分组、异译、
+注疏匹配中会被处理多次。这里把三种形式放在一次计算中完成：
+正则预先编译，前缀剥离改为按表顺序的单个正则，只有包含「卷」或括号的
+标题才执行对应的替换；结果按 (标题, 文本类型) 缓存在有界 LRU 中。
+
+各步骤的执行顺序与原实现相同，输出逐字一致。
+"""
+
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from title_classifier import classify_title
+
+# LRU 缓存容量（语料约 5000 个标题）
+CACHE_SIZE = 1 << 16
+
+# normalize_sutra_title 去掉的前缀，按顺序各尝试一次
+SUTRA_PREFIXES = [
+    '佛说', '大方广', '大乘', '新编', '重刊', '校正',
+    '大明', '大宋', '唐', '宋', '元', '明', '清'
+]
+
+# extract_source_text 去掉的前缀，只去掉一个
+SOURCE_PREFIXES = ['新编', '重刊', '校正', '大明', '大宋', '唐', '宋', '元', '明', '清']
+
+# 依次尝试每个前缀，等价于按表顺序的 startswith 循环
+_SUTRA_PREFIX_RE = re.compile('^' + ''.join(f'(?:{re.escape(p)})?' for p in SUTRA_PREFIXES))
+_SOURCE_PREFIX_RE = re.compile('^(?:' + '|'.join(re.escape(p) for p in SOURCE_PREFIXES) + ')')
+
+# 卷号标注，按顺序替换（前一步的结果可能产生新的匹配）
+_VOLUME_RANGE_RE = re.compile(r'\(第?\d*[-至]\d*卷\)')
+_SUTRA_VOLUME_RES = [
+    _VOLUME_RANGE_RE,
+    re.compile(r'\([^)]*卷\)'),
+    re.compile(r'卷\d+'),
+    re.compile(r'第[一二三四五六七八九十]+卷'),
+]
+_PARENS_RE = re.compile(r'\([^)]*\)')
+
+# 同一标题的全部标准化形式
+TitleForms = namedtuple('TitleForms', [
+    'sutra',     # normalize_sutra_title：识别同经异译
+    'grouping',  # normalize_title_for_grouping：多版本分组
+    'source',    # extract_source_text：注疏对应的经典名称，非注疏为 None
+])
+
+
+def _sutra_form(title):
+    normalized = title
+    if '卷' in normalized:
+        for pattern in _SUTRA_VOLUME_RES:
+            normalized = pattern.sub('', normalized)
+
+    normalized = _SUTRA_PREFIX_RE.sub('', normalized, count=1)
+    normalized = normalized.strip()
+
+    # 如果太短（小于3个字），可能是不完整的
+    if len(normalized) < 3:
+        return title.strip()
+    return normalized
+
+
+def _grouping_form(title, text_type):
+    normalized = title
+    if text_type == 'jing':
+        # 经典类：去除卷号等标识
+        if '(' in normalized:
+            normalized = _VOLUME_RANGE_RE.sub('', normalized)
+            normalized = _PARENS_RE.sub('', normalized)
+    elif text_type == 'zhushu':
+        # 注疏类：「论释」「论疏」去掉末字
+        if normalized.endswith(('论释', '论疏')):
+            normalized = normalized[:-2]
+    return normalized.strip()
+
+
+def _source_form(title, text_type):
+    if text_type != 'zhushu':
+        return None
+    source = classify_title(title).stem
+    if source is None:
+        return None
+    source = _SOURCE_PREFIX_RE.sub('', source, count=1).strip()
+    return source if source else None
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def title_forms(title, text_type=None):
+    """
+    计算标题的全部标准化形式
+    text_type 省略时由 classify_title 判断
+    """
+    if text_type is None:
+        text_type = classify_title(title).text_type
+    return TitleForms(_sutra_form(title), _grouping_form(title, text_type),
+                      _source_form(title, text_type))
+
+
+def clear_cache():
+    title_forms.cache_clear()
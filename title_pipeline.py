@@ -0,0 +1,577 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+经书标题分析流水线
+
+一次扫描语料库，所有输出共用同一份经书列表和中间结果：
+    titles        all_titles.txt
+    groups        sutra_groups_v2.json
+    zhushu        sutra_zhushu_mapping.json
+    chains        commentary_graph.json（注疏链及其传递闭包）
+    content       content_pairs.json（需 --content-threshold）
+    translations  sutra_translations.json
+    persons       persons.json（对应后端 persons / text_persons 表）
+    database      载入后端 text_relations / translation_groups 表（需 psycopg，只在 --stages 中指定时执行）
+    candidates    zhushu_candidates.json / translation_candidates.json（需 --candidates）
+    zhushu_report zhushu_summary.txt
+    report        sutra_groups_v2_report.txt
+
+每个文件只读取一次；分组、注疏映射等中间结果在第一次使用时构建，
+之后各输出阶段共用。输入输出路径可通过命令行或环境变量配置。
+--metrics 记录各阶段的耗时、吞吐量和内存，见 instrumentation.py。
+"""
+
+import argparse
+import json
+import os
+from functools import cached_property
+from pathlib import Path
+
+from author_parser import build_person_records
+from book_store import BookStore
+from commentary_graph import build_commentary_graph
+from content_similarity import find_similar_texts
+from corpus_io import DEFAULT_PREFETCH_DEPTH
+from extract_titles_v2 import (
+    assign_group_ids,
+    build_sutra_zhushu_mapping,
+    build_translation_candidates,
+    build_translation_groups,
+    build_type_groups,
+    build_zhushu_candidates,
+    find_multi_version_groups,
+)
+from header_catalog import load_books
+from instrumentation import RunMetrics, metrics_path_from_env
+from output_writers import FORMAT_SUFFIXES, atomic_open, write_records
+from pg_loader import (DEFAULT_DATABASE_URL, LOAD_MODES, load_to_database, print_load_stats,
+                       relation_rows, translation_rows)
+from title_classifier import classify_titles
+from zhconv import LOCALES, convert_records
+
+REPO_ROOT = Path(__file__).resolve().parent
+
+# 默认路径，可用环境变量覆盖
+DEFAULT_DATA_DIR = Path(os.environ.get('CBETA_DATA_DIR', REPO_ROOT / 'data-simplified'))
+DEFAULT_OUTPUT_DIR = Path(os.environ.get('CBETA_ANALYSIS_DIR', REPO_ROOT / 'analysis'))
+DEFAULT_TITLES_FILE = Path(os.environ.get('CBETA_TITLES_FILE', REPO_ROOT / 'all_titles.txt'))
+
+CATALOG_FILE = '.header-catalog.sqlite'
+
+
+class AnalysisContext:
+    """一次分析运行的输入、配置和共享中间结果"""
+
+    def __init__(self, data_dir, output_dir, titles_file=None, catalog_path=None,
+                 workers=1, candidates=0, formats=('json',), metrics=None, content_threshold=0,
+                 prefetch_depth=DEFAULT_PREFETCH_DEPTH, database_url=DEFAULT_DATABASE_URL,
+                 load_mode='diff', zh_locale=None):
+        self.data_dir = Path(data_dir)
+        self.output_dir = Path(output_dir)
+        self.titles_file = Path(titles_file) if titles_file else DEFAULT_TITLES_FILE
+        self.catalog_path = catalog_path
+        self.workers = workers
+        self.prefetch_depth = prefetch_depth
+        self.candidates = candidates
+        self.formats = tuple(formats)
+        self.content_threshold = content_threshold
+        self.database_url = database_url
+        self.load_mode = load_mode
+        # 给出时先把标题等字段转换为该字形再分析（如直接分析繁体语料 data/）
+        self.zh_locale = zh_locale
+        self.metrics = metrics or RunMetrics()
+        self.all_books = BookStore()
+        self.scan_errors = []
+        # 上一次的 sutra_groups 结果；给出时沿用未变化分组的组ID（见 assign_group_ids）
+        self.previous_groups = None
+
+    def scan(self):
+        """扫描语料库（每个文件只读取一次）并分类全部标题"""
+        print("正在扫描经书...")
+        with self.metrics.stage('scan'):
+            books, self.scan_errors = load_books(
+                self.data_dir, self.catalog_path, workers=self.workers,
+                observer=self.metrics.observe_scan if self.metrics.enabled else None,
+                prefetch_depth=self.prefetch_depth)
+        if self.zh_locale:
+            with self.metrics.stage('zhconv'):
+                books = convert_records(books, self.zh_locale)
+        self.set_books(books, self.scan_errors)
+        del books
+
+        print(f"共找到 {len(self.all_books)} 部经书")
+        if self.scan_errors:
+            print(f"读取失败 {len(self.scan_errors)} 个文件:")
+            for err in self.scan_errors:
+                print(f"  - {err['path']}: {err['error']}")
+        print()
+
+    def set_books(self, books, errors=()):
+        """载入扫描得到的经书列表，并清除之前构建的中间结果"""
+        # 一次批量分类全部标题，结果存入列式存储，扫描得到的 dict 可随即释放
+        with self.metrics.stage('classify'):
+            classes = classify_titles([info['title'] for info in books])
+            self.all_books = BookStore.from_books(books, classes)
+        self.scan_errors = list(errors)
+        for name, attr in type(self).__dict__.items():
+            if isinstance(attr, cached_property):
+                self.__dict__.pop(name, None)
+
+    @cached_property
+    def type_groups(self):
+        return build_type_groups(self.all_books)
+
+    @cached_property
+    def multi_version_groups(self):
+        return find_multi_version_groups(self.type_groups)
+
+    @cached_property
+    def sutra_groups(self):
+        return assign_group_ids(self.all_books, self.multi_version_groups, self.previous_groups)
+
+    @cached_property
+    def zhushu_mapping(self):
+        return build_sutra_zhushu_mapping(self.all_books)
+
+    @cached_property
+    def commentary_graph(self):
+        return build_commentary_graph(self.all_books, self.zhushu_mapping)
+
+    @cached_property
+    def content_pairs(self):
+        """正文相似的经书对；未设置 content_threshold 时为 None"""
+        if self.content_threshold <= 0:
+            return None
+        pairs, errors = find_similar_texts(
+            self.data_dir, self.content_threshold, workers=self.workers,
+            ids={book['id'] for book in self.all_books})
+        for err in errors:
+            print(f"  - {err['path']}: {err['error']}")
+        return pairs
+
+    @cached_property
+    def translation_groups(self):
+        return build_translation_groups(self.all_books, self.content_pairs)
+
+    def type_count(self, text_type):
+        return sum(len(g) for g in self.type_groups[text_type].values())
+
+    def print_summary(self):
+        """打印各类型数量和多版本组统计"""
+        print("文本类型统计:")
+        print(f"- 经典(jing): {self.type_count('jing')}")
+        print(f"- 论著(lun): {self.type_count('lun')}")
+        print(f"- 注疏(zhushu): {self.type_count('zhushu')}")
+        print(f"- 其他(other): {self.type_count('other')}")
+        print(f"- 未知(unknown): {self.type_count('unknown')}")
+        print()
+
+        print(f"多版本组统计:")
+        for text_type in self.multi_version_groups:
+            print(f"- {text_type}: {len(self.multi_version_groups[text_type])} 组")
+        print()
+
+
+def write_json(data, path):
+    """写出列表等非键值结构，只支持 JSON"""
+    with atomic_open(path) as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def write_outputs(ctx, records, name):
+    """
+    按配置的格式写出键值记录，返回写出的文件路径（用于提示）
+    records 通常是已构建好的共用中间结果，逐条序列化写出，不另外复制
+    """
+    paths = write_records(records, ctx.output_dir / name, ctx.formats)
+    return ', '.join(str(p) for p in paths)
+
+
+def write_all_titles(ctx):
+    """all_titles.txt：去重排序后的标题列表"""
+    unique_titles = sorted(set(book['title'] for book in ctx.all_books if book['title']))
+
+    with atomic_open(ctx.titles_file) as f:
+        f.write(f"经书标题列表（共 {len(unique_titles)} 部）\n")
+        f.write("=" * 60 + "\n\n")
+        for i, title in enumerate(unique_titles, 1):
+            f.write(f"{i:4d}. {title}\n")
+
+    print(f"已保存 {len(unique_titles)} 个标题到: {ctx.titles_file}")
+
+
+def write_sutra_groups(ctx):
+    """sutra_groups_v2.json：每部经书的分组"""
+    output_file = write_outputs(ctx, ctx.sutra_groups, 'sutra_groups_v2')
+    print(f"JSON文件已保存到: {output_file}")
+
+
+def write_zhushu_mapping(ctx):
+    """sutra_zhushu_mapping.json：经书-注疏关联"""
+    print("\n正在构建经书-注疏关联关系...")
+
+    zhushu_to_source = ctx.zhushu_mapping
+    total_zhushu_with_source = sum(len(v['zhushus']) for v in zhushu_to_source.values())
+    print(f"注疏总数: {ctx.type_count('zhushu')}")
+    print(f"成功关联到源经典的注疏: {total_zhushu_with_source}")
+    print(f"有注疏的经典数量: {len(zhushu_to_source)}")
+
+    zhushu_mapping_file = write_outputs(ctx, zhushu_to_source, 'sutra_zhushu_mapping')
+    print(f"经书-注疏关联已保存到: {zhushu_mapping_file}")
+
+
+def write_commentary_graph(ctx):
+    """commentary_graph.json：注疏链（上级、所注经典、各层下级注疏）"""
+    print("\n正在构建注疏链...")
+
+    graph = ctx.commentary_graph
+    records = graph.records()
+    # 上级也是注疏：上级链中除所注经典外还有其他节点（unresolved 时链上都是注疏）
+    nested = sum(1 for record in records.values()
+                 if len(record['ancestors']) > (0 if record.get('unresolved') else 1))
+    unresolved = sum(1 for record in records.values() if record.get('unresolved'))
+    print(f"注疏链节点数: {len(records)}，注疏的注疏: {nested}，"
+          f"最大层数: {max((r['depth'] for r in records.values() if r['depth'] is not None), default=0)}，"
+          f"未匹配到经典: {unresolved}")
+    for cycle in graph.cycles:
+        print(f"  - 循环引用: {' → '.join(cycle)}")
+
+    graph_file = write_outputs(ctx, records, 'commentary_graph')
+    print(f"注疏链已保存到: {graph_file}")
+
+
+def write_content_pairs(ctx):
+    """content_pairs.json：正文相似的经书对（MinHash 估计的 Jaccard）"""
+    if ctx.content_threshold <= 0:
+        return
+    print(f"\n正在计算正文相似度（阈值 {ctx.content_threshold}）...")
+
+    pairs_file = ctx.output_dir / 'content_pairs.json'
+    write_json(ctx.content_pairs, pairs_file)
+    print(f"正文相似的经书对: {len(ctx.content_pairs)}")
+    print(f"正文相似度已保存到: {pairs_file}")
+
+
+def write_translations(ctx):
+    """sutra_translations.json：同经异译关联"""
+    print("\n正在构建同经不同翻译版本关联...")
+
+    print(f"有多译本的经书组数: {len(ctx.translation_groups)}")
+
+    translation_mapping_file = write_outputs(ctx, ctx.translation_groups, 'sutra_translations')
+    print(f"同经异译关联已保存到: {translation_mapping_file}")
+
+
+def write_persons(ctx):
+    """persons.json：作者字段解析出的人物及经书-人物关联"""
+    print("\n正在解析作者字段...")
+
+    persons, text_persons = build_person_records(ctx.all_books)
+    print(f"人物数: {len(persons)}，经书-人物关联: {len(text_persons)}")
+
+    persons_file = ctx.output_dir / 'persons.json'
+    with atomic_open(persons_file) as f:
+        json.dump({'persons': persons, 'text_persons': text_persons}, f, ensure_ascii=False, indent=2)
+    print(f"人物信息已保存到: {persons_file}")
+
+
+def load_database(ctx):
+    """把注疏映射和同经异译载入后端数据库（需要 psycopg），见 pg_loader.py"""
+    print(f"\n正在载入数据库（{ctx.load_mode}）...")
+    table_rows = {
+        'text_relations': relation_rows(ctx.zhushu_mapping, ctx.commentary_graph),
+        'translation_groups': translation_rows(ctx.translation_groups),
+    }
+    print_load_stats(load_to_database(table_rows, ctx.database_url, ctx.load_mode))
+
+
+def write_candidates(ctx):
+    """zhushu_candidates.json / translation_candidates.json：批量候选匹配"""
+    if ctx.candidates <= 0:
+        return
+    print(f"\n正在批量计算前 {ctx.candidates} 个候选匹配...")
+
+    candidates = build_zhushu_candidates(ctx.all_books, k=ctx.candidates)
+    candidates_file = write_outputs(ctx, candidates, 'zhushu_candidates')
+    print(f"注疏候选匹配已保存到: {candidates_file}")
+
+    candidates_file = ctx.output_dir / 'translation_candidates.json'
+    write_json(build_translation_candidates(ctx.all_books, k=ctx.candidates), candidates_file)
+    print(f"同经异译候选已保存到: {candidates_file}")
+
+
+def write_zhushu_summary(ctx):
+    """zhushu_summary.txt：注疏类汇总报告"""
+    multi_version_groups = ctx.multi_version_groups
+    zhushu_to_source = ctx.zhushu_mapping
+    translation_groups = ctx.translation_groups
+    total_zhushu = ctx.type_count('zhushu')
+    total_zhushu_with_source = sum(len(v['zhushus']) for v in zhushu_to_source.values())
+
+    zhushu_report = ctx.output_dir / 'zhushu_summary.txt'
+    with atomic_open(zhushu_report) as f:
+        f.write("注疏类经书汇总报告\n")
+        f.write("=" * 80 + "\n\n")
+
+        if 'zhushu' in multi_version_groups:
+            f.write(f"注疏类多版本组数: {len(multi_version_groups['zhushu'])}\n\n")
+
+            for group in sorted(multi_version_groups['zhushu'],
+                           key=lambda x: x['norm_title']):
+                f.write(f"【注疏】: {group['norm_title']}\n")
+                f.write(f"【版本数】: {group['count']}\n")
+                f.write(f"【版本列表】:\n")
+                for book in sorted(group['books'], key=lambda x: x['id']):
+                    f.write(f"  - ID: {book['id']:<15} 标题: {book['title']:<50} 作者: {book['author']}\n")
+                f.write("\n")
+
+        # 添加经书-注疏关联报告
+        f.write("\n" + "=" * 80 + "\n")
+        f.write("经书-注疏关联关系\n")
+        f.write("=" * 80 + "\n\n")
+
+        f.write(f"注疏总数: {total_zhushu}\n")
+        f.write(f"成功关联到源经典的注疏: {total_zhushu_with_source}\n")
+        f.write(f"有注疏的经典数量: {len(zhushu_to_source)}\n\n")
+
+        # 按注疏数量排序
+        sorted_sources = sorted(zhushu_to_source.items(),
+                               key=lambda x: len(x[1]['zhushus']),
+                               reverse=True)
+
+        for source_id, data in sorted_sources[:100]:  # 只输出前100个
+            f.write(f"【经典】: {data['title']} ({source_id})\n")
+            f.write(f"【类型】: {data['source_type']}\n")
+            f.write(f"【注疏数量】: {len(data['zhushus'])}\n")
+            f.write(f"【注疏列表】:\n")
+            for zhushu in sorted(data['zhushus'], key=lambda x: x['id']):
+                f.write(f"  - ID: {zhushu['id']:<15} 标题: {zhushu['title']:<40} 作者: {zhushu['author']}\n")
+            f.write("\n")
+
+        if len(sorted_sources) > 100:
+            f.write(f"\n... 还有 {len(sorted_sources) - 100} 部经典有注疏（只显示前100个）\n")
+
+        # 添加同经不同翻译版本报告
+        f.write("\n" + "=" * 80 + "\n")
+        f.write("同经不同翻译版本关联\n")
+        f.write("=" * 80 + "\n\n")
+
+        f.write(f"有多译本的经书组数: {len(translation_groups)}\n\n")
+
+        # 按译本数量排序
+        sorted_translations = sorted(translation_groups.items(),
+                                     key=lambda x: x[1]['total_versions'],
+                                     reverse=True)
+
+        for base_title, group in sorted_translations[:50]:
+            f.write(f"【经典】: {base_title}\n")
+            f.write(f"【译本数】: {group['total_versions']}\n")
+            f.write(f"【译本列表】:\n")
+            for t in group['translations']:
+                f.write(f"  - ID: {t['id']:<15} 标题: {t['title']:<45} 译者: {t['author']}\n")
+            f.write("\n")
+
+        if len(sorted_translations) > 50:
+            f.write(f"\n... 还有 {len(sorted_translations) - 50} 部经书有多个译本（只显示前50个）\n")
+
+    print(f"注疏汇总报告已保存到: {zhushu_report}")
+
+
+def write_groups_report(ctx):
+    """sutra_groups_v2_report.txt：完整的分组统计报告"""
+    multi_version_groups = ctx.multi_version_groups
+
+    report_file = ctx.output_dir / 'sutra_groups_v2_report.txt'
+    with atomic_open(report_file) as f:
+        f.write("CBETA 经书版本关联分析报告 (修正版)\n")
+        f.write("=" * 80 + "\n\n")
+        f.write(f"扫描目录: {ctx.data_dir}\n")
+        f.write(f"经书总数: {len(ctx.all_books)}\n\n")
+        if ctx.scan_errors:
+            f.write(f"读取失败: {len(ctx.scan_errors)}\n")
+            for err in ctx.scan_errors:
+                f.write(f"  - {err['path']}: {err['error']}\n")
+            f.write("\n")
+
+        # 各类型统计
+        for text_type in ['jing', 'lun', 'zhushu', 'other', 'unknown']:
+            type_name = {
+                'jing': '经典(jing)',
+                'lun': '论著(lun)',
+                'zhushu': '注疏(zhushu)',
+                'other': '其他(other)',
+                'unknown': '未知(unknown)'
+            }[text_type]
+
+            total = ctx.type_count(text_type)
+            multi_count = len(multi_version_groups.get(text_type, []))
+            multi_books = sum(g['count'] for g in multi_version_groups.get(text_type, []))
+
+            f.write(f"\n{type_name}:\n")
+            f.write(f"  总数: {total}\n")
+            f.write(f"  多版本组数: {multi_count}\n")
+            f.write(f"  多版本经书数: {multi_books}\n")
+            f.write(f"  单版本经书数: {total - multi_books}\n")
+
+        # 详细的多版本列表
+        f.write("\n" + "=" * 80 + "\n")
+        f.write("多版本经书详细列表\n")
+        f.write("=" * 80 + "\n\n")
+
+        all_multi = []
+        for text_type in multi_version_groups:
+            for group in multi_version_groups[text_type]:
+                all_multi.append({
+                    'text_type': text_type,
+                    'norm_title': group['norm_title'],
+                    'count': group['count'],
+                    'books': group['books']
+                })
+
+        # 按版本数排序
+        all_multi.sort(key=lambda x: x['count'], reverse=True)
+
+        for group in all_multi:
+            type_mapping = {
+                'jing': '经典',
+                'lun': '论著',
+                'zhushu': '注疏',
+                'other': '其他',
+                'unknown': '未知'
+            }
+            type_name = type_mapping.get(group['text_type'], group['text_type'])
+
+            f.write(f"【{type_name}】: {group['norm_title']}\n")
+            f.write(f"【版本数】: {group['count']}\n")
+            f.write(f"【版本列表】:\n")
+            for book in sorted(group['books'], key=lambda x: x['id']):
+                f.write(f"  - ID: {book['id']:<15} 标题: {book['title']:<50} 作者: {book['author']}\n")
+            f.write("\n")
+
+    print(f"完整报告已保存到: {report_file}")
+
+
+# 输出阶段，按此顺序执行
+STAGES = {
+    'titles': write_all_titles,
+    'groups': write_sutra_groups,
+    'zhushu': write_zhushu_mapping,
+    'chains': write_commentary_graph,
+    'content': write_content_pairs,
+    'translations': write_translations,
+    'persons': write_persons,
+    'database': load_database,
+    'candidates': write_candidates,
+    'zhushu_report': write_zhushu_summary,
+    'report': write_groups_report,
+}
+
+# 不指定 --stages 时执行的阶段；database 会改写数据库，只在明确指定时执行
+DEFAULT_STAGES = [name for name in STAGES if name != 'database']
+
+# extract_titles_v2.py 的输出阶段
+ANALYSIS_STAGES = ['groups', 'zhushu', 'content', 'translations', 'candidates', 'zhushu_report', 'report']
+
+
+def check_stages(stages):
+    """检查阶段名称，返回阶段列表（None 表示 DEFAULT_STAGES）"""
+    stages = list(DEFAULT_STAGES) if stages is None else stages
+    unknown = [name for name in stages if name not in STAGES]
+    if unknown:
+        raise ValueError(f"未知的输出阶段: {', '.join(unknown)}")
+    return stages
+
+
+def run_pipeline(ctx, stages=None):
+    """扫描一次语料库，依次执行指定的输出阶段（默认 DEFAULT_STAGES）"""
+    stages = check_stages(stages)
+    ctx.output_dir.mkdir(parents=True, exist_ok=True)
+    ctx.scan()
+    return run_stages(ctx, stages)
+
+
+def run_stages(ctx, stages):
+    """对已载入经书列表的 ctx 依次执行输出阶段"""
+    if any(name != 'titles' for name in stages):
+        with ctx.metrics.stage('summary'):
+            ctx.print_summary()
+
+    for name in STAGES:
+        if name in stages:
+            with ctx.metrics.stage(name):
+                STAGES[name](ctx)
+    ctx.metrics.write()
+    return ctx
+
+
+def build_arg_parser(description='经书标题分析流水线'):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--data-dir', type=Path, default=DEFAULT_DATA_DIR,
+                        help=f'JSON 或 TEI XML 语料目录，或 .cbpack 归档（默认 {DEFAULT_DATA_DIR}，环境变量 CBETA_DATA_DIR）')
+    parser.add_argument('--output-dir', type=Path, default=DEFAULT_OUTPUT_DIR,
+                        help=f'分析结果目录（默认 {DEFAULT_OUTPUT_DIR}，环境变量 CBETA_ANALYSIS_DIR）')
+    parser.add_argument('--titles-file', type=Path, default=DEFAULT_TITLES_FILE,
+                        help=f'标题列表文件（默认 {DEFAULT_TITLES_FILE}，环境变量 CBETA_TITLES_FILE）')
+    parser.add_argument('--stages', default=None,
+                        help=f"逗号分隔的输出阶段（默认除 database 外全部）: {','.join(STAGES)}")
+    parser.add_argument('--zh-locale', choices=sorted(LOCALES), default=None,
+                        help='先把标题、作者等字段转换为指定字形再分析，如用 zh-cn 直接分析繁体语料 data/'
+                             '（需要 zhcdict.json，见 zhconv.py）')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help='扫描进程数，1 为串行，0 为使用全部 CPU（默认 1）')
+    parser.add_argument('--prefetch', type=int, default=DEFAULT_PREFETCH_DEPTH, metavar='N',
+                        help=f'每个扫描进程同时预读的文件数，0 为不预读（默认 {DEFAULT_PREFETCH_DEPTH}）')
+    parser.add_argument('--catalog', type=Path, default=None,
+                        help=f'标题目录文件路径（默认 输出目录/{CATALOG_FILE}）')
+    parser.add_argument('--no-catalog', action='store_true',
+                        help='不使用标题目录，完整扫描全部文件')
+    parser.add_argument('--candidates', type=int, default=0, metavar='K',
+                        help='批量计算前 K 个候选匹配（需要 numpy/scipy，默认不计算）')
+    parser.add_argument('--formats', default='json',
+                        help=f"键值结果的输出格式，逗号分隔（默认 json）: {','.join(FORMAT_SUFFIXES)}")
+    parser.add_argument('--content-threshold', type=float, default=0, metavar='J',
+                        help='按正文 MinHash 相似度（Jaccard ≥ J）补充同经异译分组（需要 numpy，默认不计算）')
+    parser.add_argument('--metrics', type=Path, default=None, metavar='PATH',
+                        help='记录各阶段度量并写入 PATH（环境变量 CBETA_METRICS，1 为输出目录下的 run_metrics.json）')
+    parser.add_argument('--profile-stage', default=None, metavar='NAME',
+                        help='对指定阶段做 cProfile，结果写在度量文件旁')
+    parser.add_argument('--trace-memory-stage', default=None, metavar='NAME',
+                        help='对指定阶段用 tracemalloc 记录主要内存分配')
+    parser.add_argument('--database-url', default=DEFAULT_DATABASE_URL,
+                        help='database 阶段的数据库连接串（默认环境变量 DATABASE_URL）')
+    parser.add_argument('--load-mode', choices=LOAD_MODES, default='diff',
+                        help='database 阶段的载入模式: diff 只改写变化的行（默认），replace 全部重新载入')
+    return parser
+
+
+def context_from_args(args):
+    catalog_path = None
+    if not args.no_catalog:
+        catalog_path = args.catalog or args.output_dir / CATALOG_FILE
+    metrics = RunMetrics(args.metrics or metrics_path_from_env(args.output_dir),
+                         args.profile_stage, args.trace_memory_stage)
+    return AnalysisContext(
+        data_dir=args.data_dir,
+        output_dir=args.output_dir,
+        titles_file=args.titles_file,
+        catalog_path=catalog_path,
+        workers=args.workers,
+        prefetch_depth=args.prefetch,
+        candidates=args.candidates,
+        formats=args.formats.split(','),
+        metrics=metrics,
+        content_threshold=args.content_threshold,
+        database_url=args.database_url,
+        load_mode=args.load_mode,
+        zh_locale=args.zh_locale,
+    )
+
+
+def main(default_stages=None, description='经书标题分析流水线'):
+    args = build_arg_parser(description).parse_args()
+    stages = args.stages.split(',') if args.stages else default_stages
+    run_pipeline(context_from_args(args), stages)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,508 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分析结果的内存索引与查询服务
+
+前端和后端常用的几类查询——某部经的异译本、某部经的注疏、某个组的全部
+经书、以某几个字开头的标题——过去要整份读取 sutra_groups_v2.json、
+sutra_zhushu_mapping.json、sutra_translations.json 或重新查询数据库。
+TitleIndex 在载入时把这些结果建成哈希索引（经书ID、组ID、异译组）和
+按标题排序的前缀索引，单次查询只是几次字典查找或一次二分查找。
+
+输出目录中的结果可以是任一输出格式（json / ndjson / indexed），
+commentary_graph.json 存在时注疏查询可以返回各层下级注疏。
+
+服务模式（HTTP/JSON 或 Unix socket）:
+
+    python title_query.py serve --output-dir analysis --port 8765
+    python title_query.py serve --output-dir analysis --socket /tmp/titles.sock
+
+    GET /text?id=T08n0235              经书信息（组ID、分组名、类型等）
+    GET /translations?id=T08n0235      同经异译
+    GET /commentaries?id=T08n0235      注疏（all=1 时包括注疏的注疏）
+    GET /source?id=X14n0014            注疏所注的上级和最终的经典
+    GET /group?id=1001                 组内全部经书
+    GET /prefix?q=金刚&limit=20         标题前缀查询
+    GET /stats                         索引规模和载入时间
+
+Unix socket 每行一个 JSON 请求，如 {"op": "translations", "id": "T08n0235"}，
+每行返回一个 JSON 响应。
+
+热重载：后台线程定时检查结果文件的大小和修改时间，变化稳定后在旁边建好
+新索引再整体替换引用，正在处理的请求继续使用旧索引，服务不中断；
+新结果读取失败时保留旧索引。也可以发送 SIGHUP 立即重新载入。
+
+命令行直接查询:
+
+    python title_query.py query --output-dir analysis translations T08n0235
+"""
+
+import argparse
+import bisect
+import json
+import os
+import signal
+import socketserver
+import sys
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from output_writers import find_records, read_records
+from title_pipeline import DEFAULT_OUTPUT_DIR
+from title_normalizer import title_forms
+
+# 索引使用的分析结果（不含扩展名）
+RESULT_NAMES = ('sutra_groups_v2', 'sutra_zhushu_mapping', 'sutra_translations',
+                'commentary_graph')
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# 检查结果文件变化的间隔（秒）
+DEFAULT_RELOAD_INTERVAL = 2.0
+
+# 前缀查询默认和最多返回的条数
+DEFAULT_PREFIX_LIMIT = 20
+MAX_PREFIX_LIMIT = 1000
+
+
+class QueryError(ValueError):
+    """请求参数错误或查询的对象不存在"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _text_entry(text_id, record):
+    return {'id': text_id, 'title': record['title'], 'author': record['author'],
+            'text_type': record['text_type']}
+
+
+class TitleIndex:
+    """由一次分析结果建立的只读索引，建好后不再修改，可在多个线程间共享"""
+
+    def __init__(self, groups, zhushu_mapping, translation_groups, graph_records=None):
+        self.texts = groups
+        self.zhushu_mapping = zhushu_mapping
+        self.translation_groups = translation_groups
+        self.graph = graph_records or {}
+        self.loaded_at = time.time()
+
+        # 组ID → 经书ID（按 sutra_groups_v2.json 中的顺序）
+        self.group_members = defaultdict(list)
+        for text_id, record in groups.items():
+            self.group_members[record['group_id']].append(text_id)
+
+        # 经书ID → 所在异译组的 base_title
+        self.translation_of = {}
+        for base_title, data in translation_groups.items():
+            for translation in data['translations']:
+                self.translation_of.setdefault(translation['id'], base_title)
+
+        # 注疏ID → 所注经典/论著ID（注疏链存在时取直接上级）
+        self.commentary_parent = {}
+        for source_id, data in zhushu_mapping.items():
+            for zhushu in data['zhushus']:
+                self.commentary_parent[zhushu['id']] = source_id
+        for text_id, record in self.graph.items():
+            if record['parent']:
+                self.commentary_parent[text_id] = record['parent']
+
+        # 前缀索引：(标题, 经书ID) 排序；去掉「佛说」等前缀后的形式也收录
+        keys = set()
+        for text_id, record in groups.items():
+            title = record['title']
+            if not title:
+                continue
+            keys.add((title, text_id))
+            sutra_form = title_forms(title, record['text_type']).sutra
+            if sutra_form != title:
+                keys.add((sutra_form, text_id))
+        self._prefix_keys = sorted(keys)
+        self._prefix_titles = [key for key, _ in self._prefix_keys]
+
+    @classmethod
+    def load(cls, output_dir):
+        """读取输出目录中的分析结果；缺少必需结果时抛出 FileNotFoundError"""
+        output_dir = Path(output_dir)
+        results = {}
+        for name in RESULT_NAMES:
+            path = find_records(output_dir / name)
+            if path is None:
+                if name == 'commentary_graph':
+                    results[name] = None
+                    continue
+                raise FileNotFoundError(f"找不到分析结果 {name}（.json/.ndjson/.cbrx）: {output_dir}")
+            results[name] = read_records(path)
+        return cls(results['sutra_groups_v2'], results['sutra_zhushu_mapping'],
+                   results['sutra_translations'], results['commentary_graph'])
+
+    # ---- 查询 ----
+
+    def _record(self, text_id):
+        record = self.texts.get(text_id)
+        if record is None:
+            raise QueryError(f"未知的经书ID: {text_id}", status=404)
+        return record
+
+    def text(self, text_id):
+        """经书信息及其所在组、异译组、注疏上级"""
+        record = self._record(text_id)
+        result = {'id': text_id, **record}
+        result['translation_group'] = self.translation_of.get(text_id)
+        result['commentary_of'] = self.commentary_parent.get(text_id)
+        return result
+
+    def translations(self, text_id):
+        """同经异译：{'base_title', 'translations', 'total_versions'}，没有异译时 translations 为空"""
+        self._record(text_id)
+        base_title = self.translation_of.get(text_id)
+        if base_title is None:
+            return {'id': text_id, 'base_title': None, 'translations': [], 'total_versions': 0}
+        return {'id': text_id, **self.translation_groups[base_title]}
+
+    def commentaries(self, text_id, all_levels=False):
+        """
+        注疏：直接注释该经书的注疏；all_levels 时包括注疏的注疏
+        （需要 commentary_graph.json，每条记录的 depth 为相隔层数）
+        """
+        self._record(text_id)
+        if not self.graph:
+            data = self.zhushu_mapping.get(text_id)
+            return {'id': text_id, 'commentaries': data['zhushus'] if data else []}
+
+        node = self.graph.get(text_id, {})
+        items = []
+        for child_id in node.get('descendants', []):
+            child = self.graph[child_id]
+            if not all_levels and child['parent'] != text_id:
+                continue
+            entry = {'id': child_id, 'title': child['title']}
+            if child_id in self.texts:
+                entry = _text_entry(child_id, self.texts[child_id])
+            entry['suffix'] = child['suffix']
+            if all_levels:
+                entry['parent'] = child['parent']
+                # 相隔层数；链顶端未匹配到经典时 depth 为 None，按上级链中的位置计算
+                entry['depth'] = child['ancestors'].index(text_id) + 1
+            items.append(entry)
+        return {'id': text_id, 'commentaries': items}
+
+    def source(self, text_id):
+        """
+        注疏所注的直接上级和最终的经典；不是注疏时 parent 为 None，
+        注疏链的顶端没有匹配到经典时 root 为 None
+        """
+        self._record(text_id)
+        record = self.graph.get(text_id)
+        if record is not None:
+            return {'id': text_id, 'parent': record['parent'], 'root': record['root'],
+                    'ancestors': record['ancestors']}
+        parent = self.commentary_parent.get(text_id)
+        return {'id': text_id, 'parent': parent, 'root': parent,
+                'ancestors': [parent] if parent else []}
+
+    def group(self, group_id):
+        """组内全部经书"""
+        try:
+            group_id = int(group_id)
+        except (TypeError, ValueError):
+            raise QueryError(f"组ID必须是整数: {group_id}")
+        members = self.group_members.get(group_id)
+        if not members:
+            raise QueryError(f"未知的组ID: {group_id}", status=404)
+        return {
+            'group_id': group_id,
+            'group_name': self.texts[members[0]]['group_name'],
+            'texts': [_text_entry(text_id, self.texts[text_id]) for text_id in members],
+        }
+
+    def prefix(self, prefix, limit=DEFAULT_PREFIX_LIMIT):
+        """标题（或去掉「佛说」等前缀后的标题）以 prefix 开头的经书，按标题排序"""
+        if not prefix:
+            raise QueryError('缺少前缀参数 q')
+        if not isinstance(prefix, str):
+            raise QueryError(f"前缀参数 q 必须是字符串: {prefix!r}")
+        try:
+            limit = max(1, min(int(limit), MAX_PREFIX_LIMIT))
+        except (TypeError, ValueError):
+            raise QueryError(f"limit 必须是整数: {limit!r}")
+        items = []
+        seen = set()
+        i = bisect.bisect_left(self._prefix_titles, prefix)
+        while i < len(self._prefix_keys) and len(items) < limit:
+            title, text_id = self._prefix_keys[i]
+            if not title.startswith(prefix):
+                break
+            if text_id not in seen:
+                seen.add(text_id)
+                items.append(_text_entry(text_id, self.texts[text_id]))
+            i += 1
+        return {'prefix': prefix, 'texts': items}
+
+    def stats(self):
+        return {
+            'texts': len(self.texts),
+            'groups': len(self.group_members),
+            'translation_groups': len(self.translation_groups),
+            'commentary_sources': len(self.zhushu_mapping),
+            'commentary_graph': len(self.graph),
+            'prefix_keys': len(self._prefix_keys),
+            'loaded_at': self.loaded_at,
+        }
+
+    def query(self, op, params):
+        """按操作名分派查询，HTTP 和 Unix socket 共用；params 为参数字典"""
+        text_id = params.get('id')
+        if op in ('text', 'translations', 'commentaries', 'source', 'group') and not text_id:
+            raise QueryError('缺少参数 id')
+        if text_id is not None and not isinstance(text_id, (str, int)):
+            raise QueryError(f"参数 id 必须是字符串: {text_id!r}")
+        if op == 'text':
+            return self.text(text_id)
+        if op == 'translations':
+            return self.translations(text_id)
+        if op == 'commentaries':
+            return self.commentaries(text_id, str(params.get('all', '')) in ('1', 'true', 'True'))
+        if op == 'source':
+            return self.source(text_id)
+        if op == 'group':
+            return self.group(text_id)
+        if op == 'prefix':
+            return self.prefix(params.get('q', ''), params.get('limit', DEFAULT_PREFIX_LIMIT))
+        if op == 'stats':
+            return self.stats()
+        raise QueryError(f"未知的查询: {op}", status=404)
+
+
+def result_signature(output_dir):
+    """输出目录中各结果文件的 (路径, 大小, 修改时间)，用于判断是否需要重新载入"""
+    signature = []
+    for name in RESULT_NAMES:
+        path = find_records(Path(output_dir) / name)
+        if path is not None:
+            st = path.stat()
+            signature.append((str(path), st.st_size, st.st_mtime_ns, st.st_ino))
+    return tuple(signature)
+
+
+class IndexStore:
+    """
+    持有当前索引，结果文件变化时在后台重建并整体替换
+
+    请求处理时先取 store.index 的引用再查询，替换只是一次属性赋值，
+    同一请求不会看到新旧两份结果混在一起。
+    """
+
+    def __init__(self, output_dir, interval=DEFAULT_RELOAD_INTERVAL):
+        self.output_dir = Path(output_dir)
+        self.interval = interval
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._reload_now = threading.Event()
+        self._stopped = threading.Event()
+        self._signature = result_signature(self.output_dir)
+        self.index = TitleIndex.load(self.output_dir)
+        self.generation = 1
+
+    def reload(self):
+        """重新载入；失败时保留旧索引并返回 False"""
+        with self._lock:
+            # 读取失败的同一批文件不再重试，等它们再次变化
+            self._signature = result_signature(self.output_dir)
+            start = time.perf_counter()
+            try:
+                index = TitleIndex.load(self.output_dir)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"重新载入失败，继续使用旧索引: {e}", file=sys.stderr)
+                return False
+            self.index = index
+            self.generation += 1
+            print(f"已重新载入分析结果（第 {self.generation} 版，{len(index.texts)} 部经书，"
+                  f"{time.perf_counter() - start:.2f}s）", file=sys.stderr)
+            return True
+
+    def request_reload(self):
+        self._reload_now.set()
+
+    def watch(self):
+        """后台循环：文件变化并在一个检查间隔内不再变化后重新载入"""
+        while not self._stopped.is_set():
+            forced = self._reload_now.wait(self.interval)
+            if self._stopped.is_set():
+                break
+            self._reload_now.clear()
+            signature = result_signature(self.output_dir)
+            if not forced and signature == self._signature:
+                continue
+            # 分析会依次替换多个结果文件，等到一个检查间隔内不再变化
+            while not forced and not self._stopped.wait(self.interval):
+                latest = result_signature(self.output_dir)
+                if latest == signature:
+                    break
+                signature = latest
+            if not self._stopped.is_set():
+                self.reload()
+
+    def start(self):
+        thread = threading.Thread(target=self.watch, name='index-reload', daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stopped.set()
+        self._reload_now.set()
+
+    def query(self, op, params):
+        index = self.index
+        if op == 'stats':
+            return {**index.stats(), 'generation': self.generation}
+        return index.query(op, params)
+
+
+# ---- HTTP ----
+
+class QueryHTTPHandler(BaseHTTPRequestHandler):
+    """GET /<op>?参数，返回 JSON；保持连接（HTTP/1.1）便于压测复用"""
+
+    protocol_version = 'HTTP/1.1'
+    # 响应头和正文先写入缓冲区，由 handle_one_request 一次发出；关闭 Nagle，
+    # 避免保持连接时小包与延迟确认叠加产生约 40ms 的等待
+    wbufsize = 1 << 16
+    disable_nagle_algorithm = True
+    store = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            status, result = 200, self.store.query(url.path.strip('/'), params)
+        except QueryError as e:
+            status, result = e.status, {'error': str(e)}
+        body = json.dumps(result, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 压测时每个请求一行访问日志会成为瓶颈，不输出
+        pass
+
+
+def make_http_server(store, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    handler = type('Handler', (QueryHTTPHandler,), {'store': store})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+# ---- Unix socket ----
+
+class QueryStreamHandler(socketserver.StreamRequestHandler):
+    """每行一个 JSON 请求 {"op": ..., 其余为参数}，每行一个 JSON 响应"""
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise QueryError('请求必须是 JSON 对象')
+                result = self.server.store.query(request.get('op', ''), request)
+            except QueryError as e:
+                result = {'error': str(e), 'status': e.status}
+            except json.JSONDecodeError as e:
+                result = {'error': f"请求不是有效的 JSON: {e}", 'status': 400}
+            data = json.dumps(result, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            self.wfile.write(data + b'\n')
+            self.wfile.flush()
+
+
+class QueryUnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, store):
+        self.store = store
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, QueryStreamHandler)
+
+
+# ---- 命令行 ----
+
+def serve(args):
+    store = IndexStore(args.output_dir, args.reload_interval)
+    print(f"已载入 {len(store.index.texts)} 部经书: {args.output_dir}")
+    if args.socket:
+        server = QueryUnixServer(str(args.socket), store)
+        where = f"unix:{args.socket}"
+    else:
+        server = make_http_server(store, args.host, args.port)
+        where = f"http://{args.host}:{server.server_address[1]}"
+
+    if args.reload_interval > 0:
+        store.start()
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, lambda signum, frame: store.request_reload())
+    print(f"查询服务: {where}（Ctrl+C 退出）", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print()
+    finally:
+        store.stop()
+        server.server_close()
+        if args.socket:
+            Path(args.socket).unlink(missing_ok=True)
+
+
+def query_once(args):
+    index = TitleIndex.load(args.output_dir)
+    params = {'id': args.value, 'q': args.value, 'all': '1' if args.all else '',
+              'limit': args.limit}
+    try:
+        result = index.query(args.op, params)
+    except QueryError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='分析结果的内存索引查询服务')
+    parser.add_argument('--output-dir', type=Path, default=DEFAULT_OUTPUT_DIR,
+                        help=f'分析结果目录（默认 {DEFAULT_OUTPUT_DIR}，环境变量 CBETA_ANALYSIS_DIR）')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = sub.add_parser('serve', help='启动 HTTP 或 Unix socket 查询服务')
+    serve_parser.add_argument('--host', default=DEFAULT_HOST, help=f'监听地址（默认 {DEFAULT_HOST}）')
+    serve_parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                              help=f'HTTP 端口（默认 {DEFAULT_PORT}，0 为随机端口）')
+    serve_parser.add_argument('--socket', type=Path, help='改为监听 Unix socket')
+    serve_parser.add_argument('--reload-interval', type=float, default=DEFAULT_RELOAD_INTERVAL,
+                              metavar='SEC',
+                              help=f'检查结果文件变化的间隔（默认 {DEFAULT_RELOAD_INTERVAL} 秒，0 为不检查）')
+
+    query_parser = sub.add_parser('query', help='直接查询一次并输出 JSON')
+    query_parser.add_argument('op', choices=['text', 'translations', 'commentaries', 'source',
+                                             'group', 'prefix', 'stats'])
+    query_parser.add_argument('value', nargs='?', default='', help='经书ID、组ID或标题前缀')
+    query_parser.add_argument('--all', action='store_true', help='commentaries: 包括注疏的注疏')
+    query_parser.add_argument('--limit', type=int, default=DEFAULT_PREFIX_LIMIT,
+                              help=f'prefix: 最多返回条数（默认 {DEFAULT_PREFIX_LIMIT}）')
+
+    args = parser.parse_args()
+    if args.command == 'serve':
+        serve(args)
+    else:
+        query_once(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基于字符 n-gram 稀疏矩阵的批量标题相似度
+
+把所有标题一次性编码为字符一元/二元组的 TF-IDF 向量（L2 归一化），
+用稀疏矩阵乘法一次算出全部 查询×候选 的余弦相似度，并返回每个查询
+的前 k 个候选及分数。用于批量查看注疏匹配和同经异译的候选，
+包括 find_best_match 因低于 0.5 而丢弃的近似匹配。
+
+依赖 numpy 和 scipy（可选依赖，只有使用本模块时才需要安装）。
+"""
+
+import math
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # 可选依赖
+    np = None
+    sparse = None
+
+# 每次计算相似度的查询行数，限制稠密结果块的内存
+DEFAULT_BLOCK_ROWS = 1024
+
+
+def _require_numpy():
+    if np is None or sparse is None:
+        raise ImportError('批量标题相似度需要 numpy 和 scipy: pip install numpy scipy')
+
+
+def char_ngrams(title):
+    """标题的字符一元组和二元组"""
+    grams = list(title)
+    grams.extend(title[i:i + 2] for i in range(len(title) - 1))
+    return grams
+
+
+class TitleVectorizer:
+    """字符 n-gram TF-IDF 编码器"""
+
+    def __init__(self):
+        _require_numpy()
+        self.vocab = {}
+        self.idf = None
+
+    def fit(self, titles):
+        """根据标题集合建立词表和 IDF"""
+        df = {}
+        count = 0
+        for title in titles:
+            count += 1
+            for gram in set(char_ngrams(title)):
+                df[gram] = df.get(gram, 0) + 1
+
+        self.vocab = {gram: i for i, gram in enumerate(sorted(df))}
+        idf = np.empty(len(self.vocab), dtype=np.float32)
+        for gram, i in self.vocab.items():
+            idf[i] = math.log((1 + count) / (1 + df[gram])) + 1
+        self.idf = idf
+        return self
+
+    def transform(self, titles):
+        """把标题列表编码为 L2 归一化的 CSR 矩阵，词表外的 n-gram 忽略"""
+        vocab = self.vocab
+        indptr = [0]
+        indices = []
+        data = []
+        for title in titles:
+            counts = {}
+            for gram in char_ngrams(title):
+                i = vocab.get(gram)
+                if i is not None:
+                    counts[i] = counts.get(i, 0) + 1
+            indices.extend(counts)
+            data.extend(counts.values())
+            indptr.append(len(indices))
+
+        matrix = sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float32),
+             np.asarray(indices, dtype=np.int32),
+             np.asarray(indptr, dtype=np.int64)),
+            shape=(len(indptr) - 1, len(vocab)))
+        matrix = matrix.multiply(self.idf).tocsr()
+
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return sparse.diags(1 / norms).dot(matrix).tocsr()
+
+
+def top_k_similar(queries, candidates, k=5, min_score=0.0, exclude_self=False,
+                  block_rows=DEFAULT_BLOCK_ROWS):
+    """
+    计算每个查询标题与全部候选标题的相似度，返回前 k 个
+
+    exclude_self: 查询和候选是同一列表时，跳过自身
+    返回: (indices, scores)，形状均为 (查询数, k)；
+          不足 k 个或低于 min_score 的位置 index 为 -1
+    """
+    _require_numpy()
+    vectorizer = TitleVectorizer().fit(list(queries) + list(candidates))
+    q = vectorizer.transform(queries)
+    c = vectorizer.transform(candidates).T.tocsc()
+
+    n_queries, n_candidates = q.shape[0], c.shape[1]
+    k = min(k, n_candidates)
+    indices = np.full((n_queries, k), -1, dtype=np.int64)
+    scores = np.zeros((n_queries, k), dtype=np.float32)
+    if k == 0:
+        return indices, scores
+
+    for start in range(0, n_queries, block_rows):
+        block = q[start:start + block_rows].dot(c).toarray()
+        if exclude_self:
+            rows = np.arange(block.shape[0])
+            cols = rows + start
+            valid = cols < n_candidates
+            block[rows[valid], cols[valid]] = -1
+
+        # 先取出前 k 个，再按 (分数降序, 候选序号升序) 排序，保证结果确定；
+        # 与第 k 名同分的候选按序号取最小的几个，不依赖 argpartition 的选择
+        if k < n_candidates:
+            kth = -np.partition(-block, k - 1, axis=1)[:, k - 1:k]
+            above = block > kth
+            tied = block == kth
+            need = k - above.sum(axis=1, keepdims=True)
+            selected = above | (tied & (np.cumsum(tied, axis=1) <= need))
+            part = np.nonzero(selected)[1].reshape(block.shape[0], k)
+        else:
+            part = np.tile(np.arange(n_candidates), (block.shape[0], 1))
+        part_scores = np.take_along_axis(block, part, axis=1)
+        order = np.lexsort((part, -part_scores), axis=1)
+        part = np.take_along_axis(part, order, axis=1)
+        part_scores = np.take_along_axis(part_scores, order, axis=1)
+
+        part[part_scores < max(min_score, 1e-9)] = -1
+        part_scores[part == -1] = 0
+        indices[start:start + block.shape[0]] = part
+        scores[start:start + block.shape[0]] = part_scores
+
+    return indices, scores
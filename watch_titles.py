@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+监视语料目录，文件变化时增量更新分析结果
+
+转换器会持续改写 data-simplified/ 下的 JSON 文件。监视模式常驻运行：
+Linux 上使用 inotify（通过 ctypes 调用 libc，不需要额外依赖），
+其他平台或语料为 .cbpack 归档时退回到定时比较文件大小和修改时间。
+
+收到变化后先等待 --debounce 秒内不再有新的变化（最长 --max-delay 秒），
+再一起处理：标题目录只重新读取变化的文件、删除已不存在的文件；
+分组、注疏映射和同经异译在内存中由全部标题重新计算（只涉及标题，
+不再读取语料）。组ID沿用上一次的结果，只有新出现的组分配新ID，
+未受影响的经书组ID保持不变。输出仍按原子替换的方式写出。
+
+inotify 队列溢出、.file-commits.json 变化、目录被删除或归档被替换时，
+改为与整个语料库同步（仍只读取指纹变化的文件）。
+"""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import sys
+import time
+from collections import namedtuple
+from pathlib import Path
+
+from corpus_io import COMMITS_FILE, corpus_file_stat, corpus_suffix, is_archive
+from corpus_scan import list_corpus_files
+from header_catalog import HeaderCatalog
+from title_pipeline import (ANALYSIS_STAGES, CATALOG_FILE, build_arg_parser, check_stages,
+                            context_from_args, run_stages)
+
+# 等待变化停止的时间（秒）
+DEFAULT_DEBOUNCE = 2.0
+
+# 持续有变化时，最长等待多久也要处理一次（秒）
+DEFAULT_MAX_DELAY = 30.0
+
+# 轮询间隔（秒）
+DEFAULT_POLL_INTERVAL = 5.0
+
+# inotify 事件（<sys/inotify.h>）
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+_EVENT = struct.Struct('iIII')  # wd, mask, cookie, len
+_READ_SIZE = 64 * 1024
+
+# 一批变化：paths 为变化的语料文件，full 表示需要与整个语料库同步
+Changes = namedtuple('Changes', ['paths', 'full'])
+
+
+def merge_changes(a, b):
+    return Changes(a.paths | b.paths, a.full or b.full)
+
+
+def _is_corpus_name(rel_parts):
+    return corpus_suffix(rel_parts[-1]) is not None and not any(p.startswith('.') for p in rel_parts)
+
+
+class InotifyWatcher:
+    """基于 inotify 的目录树监视，新建的子目录会自动加入监视"""
+
+    def __init__(self, data_dir):
+        libc_name = ctypes.util.find_library('c')
+        if not sys.platform.startswith('linux') or libc_name is None:
+            raise OSError('inotify 不可用')
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.data_dir = Path(data_dir)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 失败')
+        self.dirs = {}
+        try:
+            self._watch_tree(self.data_dir)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def _watch_tree(self, root):
+        """监视 root 及其下的全部目录，返回其中已有的语料文件"""
+        found = set()
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(dirpath), WATCH_MASK)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f'无法监视目录: {dirpath}')
+            self.dirs[wd] = Path(dirpath)
+            for name in filenames:
+                path = Path(dirpath) / name
+                if _is_corpus_name(path.relative_to(self.data_dir).parts):
+                    found.add(str(path))
+        return found
+
+    def wait(self, timeout=None):
+        """等待变化，超时返回 None"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return None
+        try:
+            data = os.read(self.fd, _READ_SIZE)
+        except BlockingIOError:
+            return None
+        return self._parse(data)
+
+    def _parse(self, data):
+        paths = set()
+        full = False
+        pos = 0
+        while pos < len(data):
+            wd, mask, _, name_len = _EVENT.unpack_from(data, pos)
+            pos += _EVENT.size
+            name = os.fsdecode(data[pos:pos + name_len].rstrip(b'\0'))
+            pos += name_len
+
+            if mask & IN_Q_OVERFLOW:
+                full = True
+                continue
+            if mask & IN_IGNORED:
+                self.dirs.pop(wd, None)
+                continue
+            directory = self.dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = directory / name
+
+            if mask & IN_ISDIR:
+                if name.startswith('.'):
+                    continue
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # 新目录中在加入监视之前就已写入的文件
+                    paths |= self._watch_tree(path)
+                else:
+                    # 目录被删除或移走，其中的文件只能通过完整同步发现
+                    full = True
+                continue
+
+            rel_parts = path.relative_to(self.data_dir).parts
+            if rel_parts == (COMMITS_FILE,):
+                full = True
+            elif _is_corpus_name(rel_parts):
+                paths.add(str(path))
+        return Changes(paths, full)
+
+
+class PollingWatcher:
+    """定时比较文件大小和修改时间；语料为归档时只检查归档本身"""
+
+    def __init__(self, data_dir, interval=DEFAULT_POLL_INTERVAL):
+        self.data_dir = Path(data_dir)
+        self.interval = interval
+        self.snapshot = self._snapshot()
+
+    def close(self):
+        pass
+
+    def _snapshot(self):
+        if is_archive(self.data_dir):
+            return {None: corpus_file_stat(self.data_dir)}
+        snapshot = {}
+        commits_file = self.data_dir / COMMITS_FILE
+        if commits_file.exists():
+            snapshot[None] = corpus_file_stat(commits_file)
+        for files in list_corpus_files(self.data_dir).values():
+            for path in files:
+                try:
+                    snapshot[str(path)] = corpus_file_stat(path)
+                except OSError:
+                    pass
+        return snapshot
+
+    def wait(self, timeout=None):
+        """等待变化，超时返回 None"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            delay = self.interval
+            if deadline is not None:
+                delay = min(delay, deadline - time.monotonic())
+                if delay <= 0:
+                    return None
+            time.sleep(delay)
+
+            snapshot = self._snapshot()
+            old = self.snapshot
+            self.snapshot = snapshot
+            changed = {path for path, stat in snapshot.items() if old.get(path) != stat}
+            changed |= old.keys() - snapshot.keys()
+            if changed:
+                full = None in changed
+                changed.discard(None)
+                return Changes(changed, full)
+
+
+def make_watcher(data_dir, poll_interval=DEFAULT_POLL_INTERVAL, force_polling=False):
+    """优先使用 inotify，不可用时退回轮询"""
+    if not force_polling and not is_archive(data_dir):
+        try:
+            return InotifyWatcher(data_dir)
+        except OSError as e:
+            print(f"inotify 不可用（{e}），改为每 {poll_interval} 秒轮询")
+    return PollingWatcher(data_dir, poll_interval)
+
+
+class TitleWatcher:
+    """常驻的增量分析：同步标题目录并重写输出"""
+
+    def __init__(self, ctx, stages, watcher, debounce=DEFAULT_DEBOUNCE, max_delay=DEFAULT_MAX_DELAY):
+        self.ctx = ctx
+        self.stages = stages
+        self.watcher = watcher
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.catalog = HeaderCatalog(ctx.catalog_path or ctx.output_dir / CATALOG_FILE)
+        self.errors = {}
+
+    def close(self):
+        self.catalog.close()
+        self.watcher.close()
+
+    def load_previous_groups(self):
+        """读取上一次运行写出的 sutra_groups_v2.json，用于沿用组ID"""
+        groups_file = self.ctx.output_dir / 'sutra_groups_v2.json'
+        if 'json' not in self.ctx.formats or not groups_file.exists():
+            return None
+        try:
+            with open(groups_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def sync(self, changes):
+        """按一批变化更新标题目录和输出，返回是否有变化"""
+        ctx = self.ctx
+        start = time.perf_counter()
+        if changes.full:
+            errors, stats = self.catalog.refresh(ctx.data_dir, ctx.workers,
+                                                 prefetch_depth=ctx.prefetch_depth)
+            self.errors = {}
+        else:
+            errors, stats = self.catalog.update(ctx.data_dir, changes.paths, ctx.workers,
+                                                prefetch_depth=ctx.prefetch_depth)
+            for path in changes.paths:
+                self.errors.pop(str(path), None)
+        for err in errors:
+            self.errors[str(err['path'])] = err
+
+        if not (stats['added'] or stats['changed'] or stats['deleted'] or errors):
+            return False
+
+        # 沿用上一次计算出的组ID
+        previous = ctx.__dict__.get('sutra_groups')
+        if previous is not None:
+            ctx.previous_groups = previous
+        ctx.set_books(self.catalog.books(), sorted(self.errors.values(), key=lambda x: x['path']))
+        run_stages(ctx, self.stages)
+        print(f"\n已更新: 新增 {stats['added']}，变化 {stats['changed']}，删除 {stats['deleted']}，"
+              f"读取失败 {len(errors)}，用时 {time.perf_counter() - start:.2f} 秒\n")
+        return True
+
+    def next_changes(self):
+        """等待下一批变化：变化停止 debounce 秒后返回，持续变化时最多等待 max_delay 秒"""
+        changes = None
+        while changes is None:
+            changes = self.watcher.wait()
+        started = time.monotonic()
+        while time.monotonic() - started < self.max_delay:
+            more = self.watcher.wait(self.debounce)
+            if more is None:
+                break
+            changes = merge_changes(changes, more)
+        return changes
+
+    def run(self):
+        self.ctx.output_dir.mkdir(parents=True, exist_ok=True)
+        self.ctx.previous_groups = self.load_previous_groups()
+        print(f"正在同步: {self.ctx.data_dir}")
+        if not self.sync(Changes(set(), True)):
+            # 目录没有变化也要写出一次完整输出
+            self.ctx.set_books(self.catalog.books(), [])
+            run_stages(self.ctx, self.stages)
+        print(f"正在监视: {self.ctx.data_dir}（Ctrl-C 退出）")
+        while True:
+            self.sync(self.next_changes())
+
+
+def main():
+    parser = build_arg_parser('监视语料目录并增量更新分析结果')
+    parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE, metavar='SEC',
+                        help=f'变化停止多少秒后更新（默认 {DEFAULT_DEBOUNCE}）')
+    parser.add_argument('--max-delay', type=float, default=DEFAULT_MAX_DELAY, metavar='SEC',
+                        help=f'持续有变化时最长等待秒数（默认 {DEFAULT_MAX_DELAY}）')
+    parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL, metavar='SEC',
+                        help=f'轮询间隔（默认 {DEFAULT_POLL_INTERVAL}）')
+    parser.add_argument('--poll', action='store_true', help='不使用 inotify，始终轮询')
+    args = parser.parse_args()
+    # 监视模式依赖标题目录做增量读取
+    args.no_catalog = False
+    stages = check_stages(args.stages.split(',') if args.stages else ANALYSIS_STAGES)
+
+    ctx = context_from_args(args)
+    watcher = make_watcher(ctx.data_dir, args.poll_interval, args.poll)
+    title_watcher = TitleWatcher(ctx, stages, watcher, args.debounce, args.max_delay)
+    try:
+        title_watcher.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        title_watcher.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+简繁中文转换（Python 版），与 packages/scripts/src/zhconv.ts 使用同一份
+zhcdict.json 和相同的最大正向匹配规则，转换结果一致
+
+单字映射用 str.translate 批量转换；多字词条存入前缀树，只在首字和次字
+都可能构成词条的位置（由一个零宽正则在 C 层找出）查找最长词条，其余
+文本整段交给 translate。结果与逐字做最大正向匹配相同：每个位置取以该
+位置开头的最长词条，没有多字词条时按单字转换。
+
+另提供繁体语料（data/）与简体语料（data-simplified/）的一致性检查：
+逐文件把繁体 JSON 中的字符串转换为简体，与对应的简体文件比较，
+只报告不一致的字段。
+
+用法:
+    python zhconv.py convert zh-cn < input.txt
+    python zhconv.py check --trad data --simp data-simplified -j 8
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:  # 可选依赖，只用于加速长文本
+    np = None
+
+from corpus_io import corpus_rel_path, json_name, read_corpus_bytes
+from corpus_scan import DEFAULT_CHUNK_FILES, list_corpus_files
+
+REPO_ROOT = Path(__file__).resolve().parent
+
+DEFAULT_DICT = Path(os.environ.get('CBETA_ZHCDICT', REPO_ROOT / 'packages/scripts/src/zhcdict.json'))
+
+# Locale 回退顺序（与 zhconv.ts 相同）
+LOCALES = {
+    'zh-cn': ['zh-cn', 'zh-hans', 'zh-sg', 'zh'],
+    'zh-hk': ['zh-hk', 'zh-hant', 'zh-tw', 'zh'],
+    'zh-tw': ['zh-tw', 'zh-hant', 'zh-hk', 'zh'],
+    'zh-sg': ['zh-sg', 'zh-hans', 'zh-cn', 'zh'],
+    'zh-my': ['zh-my', 'zh-sg', 'zh-hans', 'zh-cn', 'zh'],
+    'zh-mo': ['zh-mo', 'zh-hk', 'zh-hant', 'zh-tw', 'zh'],
+    'zh-hant': ['zh-hant', 'zh-tw', 'zh-hk', 'zh'],
+    'zh-hans': ['zh-hans', 'zh-cn', 'zh-sg', 'zh'],
+    'zh': ['zh'],
+}
+
+# 各 locale 的转换表由哪些字典合并而成（后者覆盖前者）
+_LOCALE_TABLES = {
+    'zh-cn': ('zh2Hans', 'zh2CN'),
+    'zh-tw': ('zh2Hant', 'zh2TW'),
+    'zh-hk': ('zh2Hant', 'zh2HK'),
+    'zh-mo': ('zh2Hant', 'zh2HK'),
+    'zh-sg': ('zh2Hans', 'zh2SG'),
+    'zh-my': ('zh2Hans', 'zh2SG'),
+    'zh-hans': ('zh2Hans',),
+    'zh-hant': ('zh2Hant',),
+}
+
+# 不短于此长度的文本用 numpy 整段查表（需要 numpy），较短的文本逐段 translate
+ARRAY_MIN_CHARS = 4096
+
+_MAX_CODE = 0x110000
+
+_dicts = {}
+_converters = {}
+
+
+def load_dict(path=None):
+    """读取 zhcdict.json（每个进程只读取一次）"""
+    path = Path(path or DEFAULT_DICT)
+    if path not in _dicts:
+        if not path.exists():
+            raise FileNotFoundError(
+                f"找不到转换字典 {path}（与 zhconv.ts 使用同一份 zhcdict.json，"
+                f"可用环境变量 CBETA_ZHCDICT 指定）")
+        with open(path, 'r', encoding='utf-8') as f:
+            _dicts[path] = json.load(f)
+    return _dicts[path]
+
+
+def _build_trie(words):
+    """多字词条的前缀树: {字: 子节点}，完整词条的节点含键 ''"""
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = True
+    return trie
+
+
+def _char_class(chars):
+    return '[' + ''.join(re.escape(ch) for ch in sorted(chars)) + ']'
+
+
+class Converter:
+    """一个转换表的编译结果"""
+
+    def __init__(self, mapping):
+        self.table = str.maketrans({k: v for k, v in mapping.items() if len(k) == 1})
+        self.phrases = {k: v for k, v in mapping.items() if len(k) > 1}
+        self.trie = _build_trie(self.phrases)
+        self._lookup = None
+        # 多字词条只可能从「首字在词条首字集合、次字在次字集合」的位置开始，
+        # 用零宽正则找出这些位置，其余文本整段交给 translate
+        self.candidates = None
+        if self.phrases:
+            self.candidates = re.compile('(?=' + _char_class({w[0] for w in self.phrases}) +
+                                         _char_class({w[1] for w in self.phrases}) + ')')
+
+    def match(self, s, i):
+        """以位置 i 开头的最长多字词条的结束位置，没有时返回 -1"""
+        node = self.trie
+        end = -1
+        n = len(s)
+        while i < n:
+            node = node.get(s[i])
+            if node is None:
+                break
+            i += 1
+            if '' in node:
+                end = i
+        return end
+
+    def convert(self, s):
+        if np is not None and len(s) >= ARRAY_MIN_CHARS:
+            return self._convert_array(s)
+        if self.candidates is None:
+            return s.translate(self.table)
+        table = self.table
+        parts = []
+        pos = 0
+        for m in self.candidates.finditer(s):
+            pos = self._replace_phrase(s, m.start(), pos, parts, table)
+        if pos == 0:
+            return s.translate(table)
+        parts.append(s[pos:].translate(table))
+        return ''.join(parts)
+
+    def _replace_phrase(self, s, start, pos, parts, table=None, mapped=None):
+        """
+        若 start 处有多字词条，把 pos..start 的单字转换结果和词条的转换结果
+        追加到 parts，返回新的 pos；mapped 为已按单字整段转换的 s（见 _convert_array）
+        """
+        # 已被前面的词条覆盖
+        if start < pos:
+            return pos
+        end = self.match(s, start)
+        if end < 0:
+            return pos
+        if start > pos:
+            parts.append(mapped[pos:start] if mapped is not None else s[pos:start].translate(table))
+        parts.append(self.phrases[s[start:end]])
+        return end
+
+    def _arrays(self):
+        """numpy 查找表: (单字映射, 首字标记, 次字标记, 排序后的词条前两字编码)"""
+        if self._lookup is None:
+            lut = np.arange(_MAX_CODE, dtype=np.uint32)
+            for code, value in self.table.items():
+                lut[code] = ord(value)
+            first = np.zeros(_MAX_CODE, dtype=bool)
+            second = np.zeros(_MAX_CODE, dtype=bool)
+            bigrams = set()
+            for word in self.phrases:
+                first[ord(word[0])] = True
+                second[ord(word[1])] = True
+                bigrams.add((ord(word[0]) << 21) | ord(word[1]))
+            self._lookup = (lut, first, second, np.array(sorted(bigrams), dtype=np.uint64))
+        return self._lookup
+
+    def _convert_array(self, s):
+        """整段查表转换单字（单字映射都是一对一），再替换多字词条"""
+        lut, first, second, bigrams = self._arrays()
+        codes = np.frombuffer(s.encode('utf-32-le', 'surrogatepass'), dtype='<u4')
+        mapped = lut[codes].tobytes().decode('utf-32-le', 'surrogatepass')
+        if not len(bigrams):
+            return mapped
+
+        # 首字、次字都可能构成词条的位置，再按前两字精确筛选
+        starts = np.flatnonzero(first[codes[:-1]] & second[codes[1:]])
+        keys = (codes[starts].astype(np.uint64) << 21) | codes[starts + 1]
+        found = np.searchsorted(bigrams, keys)
+        found[found == len(bigrams)] = 0
+        starts = starts[bigrams[found] == keys]
+
+        parts = []
+        pos = 0
+        for start in starts.tolist():
+            pos = self._replace_phrase(s, start, pos, parts, mapped=mapped)
+        if pos == 0:
+            return mapped
+        parts.append(mapped[pos:])
+        return ''.join(parts)
+
+
+def get_converter(locale, dict_path=None):
+    """取得指定 locale 的 Converter（按 locale 缓存）"""
+    key = (locale, dict_path)
+    if key not in _converters:
+        _converters[key] = Converter(locale_mapping(locale, dict_path))
+    return _converters[key]
+
+
+def locale_mapping(locale, dict_path=None):
+    """合并得到指定 locale 的转换表 {原文: 转换结果}"""
+    zhcdicts = load_dict(dict_path)
+    mapping = {}
+    for name in _LOCALE_TABLES.get(locale, ()):
+        mapping.update(zhcdicts[name])
+    return mapping
+
+
+def convert(s, locale, update=None):
+    """
+    转换文本
+
+    locale: 目标语言，如 'zh-cn', 'zh-tw', 'zh-hk', 'zh-hans', 'zh-hant'
+    update: 可选的自定义转换规则（优先于字典）
+
+    >>> convert('我幹什麼不干你事。', 'zh-cn')
+    '我干什么不干你事。'
+    """
+    if locale == 'zh' or locale not in LOCALES:
+        return s
+    if update:
+        converter = Converter({**locale_mapping(locale), **update})
+    else:
+        converter = get_converter(locale)
+    return converter.convert(s)
+
+
+def is_simplified(s, full=False):
+    """
+    检测文本是简体还是繁体
+    full: 是否统计所有字符（默认遇到第一个可判断的字即返回）
+    返回: True=简体, False=繁体, None=无法判断
+    """
+    zhcdicts = load_dict()
+    simp_only = set(zhcdicts['SIMPONLY'])
+    trad_only = set(zhcdicts['TRADONLY'])
+    simp = trad = 0
+    for ch in s:
+        if ch in simp_only:
+            if not full:
+                return True
+            simp += 1
+        elif ch in trad_only:
+            if not full:
+                return False
+            trad += 1
+    if simp == trad:
+        return None
+    return simp > trad
+
+
+def to_simplified(s):
+    return convert(s, 'zh-cn')
+
+
+def to_traditional(s):
+    return convert(s, 'zh-tw')
+
+
+def convert_value(value, converter):
+    """递归转换 JSON 值中的所有字符串（与 simplify-convert.ts 的 simplifyValue 相同）"""
+    if isinstance(value, str):
+        return converter.convert(value)
+    if isinstance(value, list):
+        return [convert_value(v, converter) for v in value]
+    if isinstance(value, dict):
+        return {k: convert_value(v, converter) for k, v in value.items()}
+    return value
+
+
+def convert_records(records, locale):
+    """转换记录（如扫描得到的标题信息）中的全部字符串，返回新列表"""
+    converter = get_converter(locale)
+    return [convert_value(record, converter) for record in records]
+
+
+# ---- 繁简语料一致性检查 ----
+
+def diff_values(expected, actual, path=''):
+    """逐字段比较两个 JSON 值，产生 (字段路径, 期望值, 实际值)"""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        for key in list(expected) + [k for k in actual if k not in expected]:
+            sub = f'{path}.{key}' if path else key
+            if key not in actual or key not in expected:
+                yield sub, expected.get(key), actual.get(key)
+            else:
+                yield from diff_values(expected[key], actual[key], sub)
+    elif isinstance(expected, list) and isinstance(actual, list):
+        for i in range(max(len(expected), len(actual))):
+            sub = f'{path}[{i}]'
+            if i >= len(expected) or i >= len(actual):
+                yield sub, expected[i] if i < len(expected) else None, actual[i] if i < len(actual) else None
+            else:
+                yield from diff_values(expected[i], actual[i], sub)
+    elif expected != actual:
+        yield path, expected, actual
+
+
+def check_file(trad_path, simp_path, locale='zh-cn', max_diffs=20):
+    """
+    检查一对文件，返回 (繁体路径, 简体路径, 不一致字段列表, 错误)
+    不一致字段: [(字段路径, 转换繁体得到的值, 简体文件中的值), ...]，最多 max_diffs 个
+    """
+    try:
+        converter = get_converter(locale)
+        expected = convert_value(json.loads(read_corpus_bytes(trad_path)), converter)
+        actual = json.loads(read_corpus_bytes(simp_path))
+        diffs = []
+        for diff in diff_values(expected, actual):
+            diffs.append(diff)
+            if len(diffs) >= max_diffs:
+                break
+        return trad_path, simp_path, diffs, None
+    except Exception as e:
+        return trad_path, simp_path, [], f"{type(e).__name__}: {e}"
+
+
+def _check_chunk(args):
+    pairs, locale, max_diffs = args
+    return [check_file(trad, simp, locale, max_diffs) for trad, simp in pairs]
+
+
+def pair_corpus_files(trad_dir, simp_dir):
+    """
+    按相对路径配对两个语料库的文件（压缩后缀可以不同）
+    返回: ({藏经目录: [(繁体路径, 简体路径), ...]}, 缺少简体的繁体路径, 缺少繁体的简体路径)
+    """
+    simp_files = {}
+    for files in list_corpus_files(simp_dir).values():
+        for path in files:
+            simp_files.setdefault(json_name(corpus_rel_path(path, simp_dir)), path)
+
+    pairs = {}
+    missing = []
+    for canon, files in list_corpus_files(trad_dir).items():
+        for path in files:
+            simp = simp_files.pop(json_name(corpus_rel_path(path, trad_dir)), None)
+            if simp is None:
+                missing.append(path)
+            else:
+                pairs.setdefault(canon, []).append((path, simp))
+    return pairs, missing, sorted(simp_files.values())
+
+
+def check_corpus(trad_dir, simp_dir, locale='zh-cn', workers=1, chunk_files=DEFAULT_CHUNK_FILES,
+                 max_diffs=20):
+    """
+    逐文件检查繁体语料转换后是否与简体语料一致，按输入顺序逐个产生结果
+    产生: (繁体路径, 简体路径或 None, 不一致字段列表, 错误)；只产生有差异或出错的文件
+    """
+    if not workers:
+        workers = os.cpu_count() or 1
+    load_dict()  # 字典不存在时尽早报错
+
+    pairs, missing, extra = pair_corpus_files(trad_dir, simp_dir)
+    for path in missing:
+        yield path, None, [], '缺少对应的简体文件'
+    for path in extra:
+        yield None, path, [], '缺少对应的繁体文件'
+
+    tasks = [(chunk, locale, max_diffs) for chunk in _make_pair_chunks(pairs, chunk_files)]
+    if workers == 1 or len(tasks) <= 1:
+        for results in map(_check_chunk, tasks):
+            yield from (result for result in results if result[2] or result[3])
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for results in executor.map(_check_chunk, tasks):
+            yield from (result for result in results if result[2] or result[3])
+
+
+def _make_pair_chunks(pairs, chunk_files):
+    """与 corpus_scan._make_chunks 相同，只是元素为 (繁体, 简体) 路径对"""
+    chunks = []
+    for files in pairs.values():
+        for i in range(0, len(files), chunk_files):
+            chunks.append([(str(a), str(b)) for a, b in files[i:i + chunk_files]])
+    return chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description='简繁中文转换及繁简语料一致性检查')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    conv = sub.add_parser('convert', help='转换标准输入，写到标准输出')
+    conv.add_argument('locale', choices=sorted(LOCALES), help='目标语言')
+
+    check = sub.add_parser('check', help='检查繁体语料转换后是否与简体语料一致')
+    check.add_argument('--trad', type=Path, default=REPO_ROOT / 'data', help='繁体 JSON 语料目录或 .cbpack 归档')
+    check.add_argument('--simp', type=Path, default=REPO_ROOT / 'data-simplified',
+                       help='简体 JSON 语料目录或 .cbpack 归档')
+    check.add_argument('--locale', default='zh-cn', choices=sorted(LOCALES), help='转换目标（默认 zh-cn）')
+    check.add_argument('-j', '--workers', type=int, default=1,
+                       help='检查进程数，1 为串行，0 为使用全部 CPU（默认 1）')
+    check.add_argument('--max-diffs', type=int, default=20, help='每个文件最多报告的不一致字段数（默认 20）')
+
+    args = parser.parse_args()
+    if args.command == 'convert':
+        converter = get_converter(args.locale)
+        for line in sys.stdin:
+            sys.stdout.write(converter.convert(line))
+        return
+
+    files = mismatched = 0
+    for trad, simp, diffs, error in check_corpus(args.trad, args.simp, args.locale, args.workers,
+                                                 max_diffs=args.max_diffs):
+        files += 1
+        if error:
+            print(f"{trad or simp}: {error}")
+            continue
+        mismatched += 1
+        print(f"{trad} ↔ {simp}:")
+        for field, expected, actual in diffs:
+            print(f"  {field}")
+            print(f"    转换: {expected!r}")
+            print(f"    简体: {actual!r}")
+    print(f"\n不一致或出错的文件: {files}（字段不一致 {mismatched}）")
+    if files:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()